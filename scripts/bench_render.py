@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/bench_render.py
+
+Бенчмарк final-рендера offers: последовательно vs CS_RENDER_WORKERS=N.
+
+Что делает:
+- поднимает OfferOut из уже собранных docs/raw/<supplier>.yml;
+- прогоняет prepare + to_xml последовательно и через process pool;
+- сверяет, что XML совпадает байт-в-байт, и печатает время/ускорение.
+
+Что не делает:
+- не пишет docs/*.yml и отчёты;
+- не ходит к поставщикам в сеть.
+
+Запуск:
+    python scripts/bench_render.py --workers 4 vtt alstyle
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime
+from pathlib import Path
+
+from cs.core import OfferOut, _split_offers_for_final
+from cs.writer import iter_cs_feed_xml
+from cs.meta import now_almaty
+
+ROOT = Path(__file__).resolve().parents[1]
+RAW_DIR = ROOT / "docs" / "raw"
+SUPPLIERS_DEFAULT = ("vtt", "alstyle")
+
+
+def _load_raw_offers(path: Path) -> list[OfferOut]:
+    root = ET.parse(path).getroot()
+    out: list[OfferOut] = []
+    for node in root.iter("offer"):
+        price_raw = (node.findtext("price") or "").strip()
+        out.append(
+            OfferOut(
+                oid=node.get("id") or "",
+                available=(node.get("available") or "").strip().lower() == "true",
+                name=node.findtext("name") or "",
+                price=int(price_raw) if price_raw.isdigit() and int(price_raw) > 0 else None,
+                pictures=[p.text or "" for p in node.findall("picture")],
+                vendor=node.findtext("vendor") or "",
+                params=[(p.get("name") or "", p.text or "") for p in node.findall("param")],
+                native_desc=node.findtext("description") or "",
+                category_id=(node.findtext("categoryId") or "").strip(),
+            )
+        )
+    return out
+
+
+def _render(offers: list[OfferOut], *, supplier: str, workers: int, build_time: datetime) -> tuple[str, float]:
+    os.environ["CS_RENDER_WORKERS"] = str(workers)
+    started = time.perf_counter()
+    prepared, _ = _split_offers_for_final(offers, supplier=supplier, public_vendor="CS")
+    xml = "".join(
+        iter_cs_feed_xml(
+            prepared,
+            supplier=supplier,
+            supplier_url="",
+            build_time=build_time,
+            next_run=build_time,
+            before=len(offers),
+        )
+    )
+    return xml, time.perf_counter() - started
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("suppliers", nargs="*", default=list(SUPPLIERS_DEFAULT))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    args = parser.parse_args(argv)
+
+    workers = max(2, int(args.workers))
+    print(f"[bench_render] cpu={os.cpu_count()} | workers={workers}")
+    for supplier in args.suppliers:
+        path = RAW_DIR / f"{supplier}.yml"
+        if not path.exists():
+            print(f"[bench_render] {supplier}: нет {path.as_posix()}, пропуск")
+            continue
+        offers = _load_raw_offers(path)
+        build_time = now_almaty()
+        xml_serial, t_serial = _render(offers, supplier=supplier, workers=0, build_time=build_time)
+        xml_parallel, t_parallel = _render(offers, supplier=supplier, workers=workers, build_time=build_time)
+        same = xml_serial == xml_parallel
+        speedup = t_serial / t_parallel if t_parallel > 0 else 0.0
+        print(
+            f"[bench_render] {supplier} | offers={len(offers)} | serial={t_serial:.2f}s | "
+            f"parallel={t_parallel:.2f}s | speedup=x{speedup:.2f} | identical={'yes' if same else 'NO'}"
+        )
+        if not same:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
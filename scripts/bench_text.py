@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/bench_text.py
+
+Микро-бенчмарк text-ядра cs.util: norm_ws и fix_mixed_cyr_lat.
+
+Что делает:
+- собирает реальные строки (name/vendor/param/description) из docs/raw/<supplier>.yml;
+- гоняет прежнюю reference-реализацию и текущую из cs.util;
+- сверяет результат строка-в-строку и печатает время/ускорение/hit-rate LRU.
+
+Что не делает:
+- не пишет docs/*.yml и отчёты;
+- не ходит к поставщикам в сеть.
+
+Запуск:
+    python scripts/bench_text.py --rounds 3 vtt alstyle
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import time
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Callable
+
+from cs import util
+
+ROOT = Path(__file__).resolve().parents[1]
+RAW_DIR = ROOT / "docs" / "raw"
+SUPPLIERS_DEFAULT = ("akcent", "alstyle", "comportal", "copyline", "vtt")
+
+# --- reference: реализация до fast-path/translate/LRU (эталон для сверки) ---
+
+_RE_WS = re.compile(r"\s+")
+_RE_CYR = re.compile(r"[А-Яа-яЁё]")
+_RE_LAT = re.compile(r"[A-Za-z]")
+_RE_MIXED_TOKEN = re.compile(r"[A-Za-zА-Яа-яЁё]{2,}")
+
+
+def _ref_fix_mixed_cyr_lat(s: str) -> str:
+    if not s:
+        return s
+
+    def _fix_token(m: re.Match[str]) -> str:
+        tok = m.group(0)
+        if not (_RE_CYR.search(tok) and _RE_LAT.search(tok)):
+            return tok
+        lat_cnt = sum(("A" <= ch <= "Z") or ("a" <= ch <= "z") for ch in tok)
+        cyr_cnt = sum(bool(_RE_CYR.match(ch)) for ch in tok)
+        if lat_cnt >= cyr_cnt:
+            return "".join(util._CYR_TO_LAT.get(ch, ch) for ch in tok)
+        return "".join(util._LAT_TO_CYR.get(ch, ch) for ch in tok)
+
+    return _RE_MIXED_TOKEN.sub(_fix_token, s)
+
+
+def _ref_norm_ws(s: str) -> str:
+    text = (s or "").replace(" ", " ").strip()
+    text = _RE_WS.sub(" ", text).strip()
+    return _ref_fix_mixed_cyr_lat(text)
+
+
+def _load_strings(path: Path) -> list[str]:
+    root = ET.parse(path).getroot()
+    out: list[str] = []
+    for node in root.iter("offer"):
+        out.append(node.findtext("name") or "")
+        out.append(node.findtext("vendor") or "")
+        out.append(node.findtext("description") or "")
+        for p in node.findall("param"):
+            out.append(p.get("name") or "")
+            out.append(p.text or "")
+    return out
+
+
+def _run(fn: Callable[[str], str], strings: list[str], rounds: int) -> tuple[list[str], float]:
+    started = time.perf_counter()
+    out: list[str] = []
+    for _ in range(rounds):
+        out = [fn(s) for s in strings]
+    return out, time.perf_counter() - started
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("suppliers", nargs="*", default=list(SUPPLIERS_DEFAULT))
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    rounds = max(1, int(args.rounds))
+    strings: list[str] = []
+    for supplier in args.suppliers:
+        path = RAW_DIR / f"{supplier}.yml"
+        if not path.exists():
+            print(f"[bench_text] {supplier}: нет {path.as_posix()}, пропуск")
+            continue
+        strings.extend(_load_strings(path))
+    if not strings:
+        print("[bench_text] нет строк для прогона")
+        return 0
+
+    rc = 0
+    cases = (
+        ("fix_mixed_cyr_lat", _ref_fix_mixed_cyr_lat, util.fix_mixed_cyr_lat),
+        ("norm_ws", _ref_norm_ws, util.norm_ws),
+    )
+    for label, ref_fn, new_fn in cases:
+        util._norm_ws_cached.cache_clear()
+        ref_out, t_ref = _run(ref_fn, strings, rounds)
+        new_out, t_new = _run(new_fn, strings, rounds)
+        same = ref_out == new_out
+        speedup = t_ref / t_new if t_new > 0 else 0.0
+        print(
+            f"[bench_text] {label} | strings={len(strings)} x{rounds} | ref={t_ref:.3f}s | "
+            f"new={t_new:.3f}s | speedup=x{speedup:.2f} | identical={'yes' if same else 'NO'}"
+        )
+        if not same:
+            rc = 1
+    info = util._norm_ws_cached.cache_info()
+    total = info.hits + info.misses
+    hit_rate = (100.0 * info.hits / total) if total else 0.0
+    print(f"[bench_text] norm_ws LRU | hits={info.hits} | misses={info.misses} | hit_rate={hit_rate:.1f}%")
+    return rc
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
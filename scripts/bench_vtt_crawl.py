@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/bench_vtt_crawl.py
+
+Бенчмарк AIMD-crawl карточек VTT (suppliers/vtt/crawler.py + page_cache.py) против локального stand-in.
+
+Что делает:
+- поднимает HTTP stand-in с N карточками, задержкой ответа и лимитом одновременных запросов:
+  сверх лимита отвечает 429 + Retry-After, на If-None-Match с текущим ETag — 304;
+- на первый запрос каждой --stale-every карточки отдаёт 304 без валидаторов (как кривой прокси):
+  PageCache.resolve бросает StaleNotModified, crawler повторяет запрос и должен получить тело;
+- гоняет два прохода через один PageCache: холодный (пустой кэш) и тёплый (условные запросы → 304);
+- печатает CrawlStats, статистику кэша и сервера; код возврата 1, если проход потерял карточки,
+  тёплый проход разошёлся с холодным или 304 в тёплом проходе не было.
+
+Что не делает:
+- не ходит к поставщику в сеть и не логинится;
+- не разбирает реальный HTML карточек (parse_page — заглушка по <h1>);
+- не пишет docs/debug/vtt_page_cache и фиды (кэш во временном каталоге).
+
+Запуск:
+    python scripts/bench_vtt_crawl.py
+    python scripts/bench_vtt_crawl.py --pages 500 --cap 4 --retry-after 1 --latency-ms 60 --stale-every 7
+    VTT_AIMD_MAX=12 python scripts/bench_vtt_crawl.py --initial 2
+"""
+from __future__ import annotations
+
+import argparse
+import re
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from suppliers.vtt.crawler import AimdCrawler, AimdSettings, FetchNetworkError, FetchResponse
+from suppliers.vtt.page_cache import PageCache
+
+_H1_RE = re.compile(r"<h1>(.*?)</h1>", re.S)
+
+
+@dataclass(slots=True)
+class ServerStats:
+    requests: int = 0
+    ok: int = 0
+    not_modified: int = 0
+    stale_not_modified: int = 0
+    rate_limited: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+
+    def describe(self) -> str:
+        return (
+            f"requests={self.requests} 200={self.ok} 304={self.not_modified} "
+            f"stale304={self.stale_not_modified} 429={self.rate_limited} peak_in_flight={self.peak_in_flight}"
+        )
+
+
+def _serve(pages: int, cap: int, retry_after: int, latency_ms: int, stale_every: int) -> tuple[ThreadingHTTPServer, ServerStats]:
+    stats = ServerStats()
+    lock = threading.Lock()
+    stale_sent: set[int] = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def _reply(self, status: int, headers: dict[str, str], body: bytes = b"") -> None:
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            if body:
+                self.wfile.write(body)
+
+        def do_GET(self) -> None:
+            with lock:
+                stats.requests += 1
+                stats.in_flight += 1
+                stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+                over = stats.in_flight > cap
+                if over:
+                    stats.rate_limited += 1
+            try:
+                if over:
+                    self._reply(429, {"Retry-After": str(retry_after)})
+                    return
+                # Ответ медленнее под нагрузкой: AIMD видит рост латентности раньше 429
+                time.sleep((latency_ms + 5 * stats.in_flight) / 1000.0)
+                m = re.fullmatch(r"/product/(\d+)", self.path)
+                idx = int(m.group(1)) if m else -1
+                if not 0 <= idx < pages:
+                    self._reply(404, {})
+                    return
+                etag = f'"p{idx}-v1"'
+                with lock:
+                    stale = stale_every > 0 and idx % stale_every == 0 and idx not in stale_sent
+                    if stale:
+                        stale_sent.add(idx)
+                        stats.stale_not_modified += 1
+                if stale or self.headers.get("If-None-Match") == etag:
+                    with lock:
+                        stats.not_modified += 1
+                    self._reply(304, {"ETag": etag})
+                    return
+                with lock:
+                    stats.ok += 1
+                body = f"<html><h1>Товар {idx}</h1>{'<p>описание</p>' * 50}</html>".encode("utf-8")
+                self._reply(200, {"ETag": etag, "Content-Type": "text/html; charset=utf-8"}, body)
+            finally:
+                with lock:
+                    stats.in_flight -= 1
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, stats
+
+
+def _make_fetch(cache: PageCache):
+    """urllib-аналог source.make_page_fetcher: условные заголовки из кэша, HTTP-ошибки — как FetchResponse."""
+
+    def fetch(url: str) -> FetchResponse:
+        req = urllib.request.Request(url, headers=cache.conditional_headers(url))
+        try:
+            with urllib.request.urlopen(req, timeout=10) as resp:
+                return FetchResponse(resp.status, resp.geturl(), resp.read().decode("utf-8"), resp.headers)
+        except urllib.error.HTTPError as exc:
+            # urllib считает ошибкой и 304, и 429
+            return FetchResponse(exc.code, url, "", exc.headers)
+        except OSError as exc:
+            raise FetchNetworkError(str(exc)) from exc
+
+    return fetch
+
+
+def _parse_page(url: str, html: str) -> dict[str, Any]:
+    m = _H1_RE.search(html)
+    return {"name": m.group(1) if m else "", "params": []}
+
+
+def _crawl_pass(label: str, base: str, pages: int, cache: PageCache, settings: AimdSettings) -> dict[str, Any]:
+    got: dict[str, Any] = {}
+    errors: list[str] = []
+    crawler = AimdCrawler(_make_fetch(cache), settings=settings)
+    stats = crawler.crawl(
+        [{"url": f"{base}/product/{i}"} for i in range(pages)],
+        url_of=lambda item: item["url"],
+        parse=lambda item, resp: cache.resolve(item["url"], resp, _parse_page),
+        on_result=lambda item, page: got.__setitem__(item["url"], page),
+        on_error=lambda item, exc: errors.append(f"{item['url']}: {exc}"),
+    )
+    print(f"[bench_vtt_crawl] {label} | {stats.describe()}")
+    print(f"[bench_vtt_crawl] {label} | cache {cache.stats.describe()}")
+    for line in errors[:5]:
+        print(f"[bench_vtt_crawl] {label} | failed {line}")
+    return got
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--cap", type=int, default=5, help="сколько одновременных запросов stand-in терпит до 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--latency-ms", type=int, default=40)
+    parser.add_argument("--stale-every", type=int, default=10, help="каждой K-й карточке первый ответ — 304 без валидаторов")
+    parser.add_argument("--initial", type=int, default=4, help="стартовое окно AIMD (VTT_AIMD_* из env учитываются)")
+    args = parser.parse_args(argv)
+
+    pages = max(1, int(args.pages))
+    server, server_stats = _serve(
+        pages, max(1, int(args.cap)), max(0, int(args.retry_after)), max(0, int(args.latency_ms)), max(0, int(args.stale_every))
+    )
+    base = f"http://127.0.0.1:{server.server_port}"
+    settings = AimdSettings.from_env(initial=max(1, int(args.initial)))
+    print(
+        f"[bench_vtt_crawl] pages={pages} cap={args.cap} retry_after={args.retry_after}s latency={args.latency_ms}ms "
+        f"stale_every={args.stale_every} | aimd window={settings.initial} min={settings.minimum} max={settings.maximum}"
+    )
+    rc = 0
+    try:
+        with tempfile.TemporaryDirectory(prefix="bench_vtt_crawl_") as tmp:
+            db = Path(tmp) / "pages.sqlite"
+            results = []
+            for label in ("cold", "warm"):
+                cache = PageCache(db)
+                try:
+                    results.append(_crawl_pass(label, base, pages, cache, settings))
+                finally:
+                    cache.close()
+                if len(results[-1]) != pages or not all(results[-1].values()):
+                    print(f"[bench_vtt_crawl] {label}: got {len(results[-1])}/{pages} карточек")
+                    rc = 1
+                if label == "warm" and cache.stats.not_modified == 0:
+                    print("[bench_vtt_crawl] warm: ни одного 304 — условные запросы не сработали")
+                    rc = 1
+            if results[0] != results[1]:
+                print("[bench_vtt_crawl] warm-проход разошёлся с cold")
+                rc = 1
+    finally:
+        server.shutdown()
+    print(f"[bench_vtt_crawl] server | {server_stats.describe()}")
+    return rc
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
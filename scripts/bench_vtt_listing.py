@@ -0,0 +1,289 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/bench_vtt_listing.py
+
+Бенчмарк разбора VTT listing-страниц: прежние два regex-прохода vs suppliers/vtt/listing.py.
+
+Что делает:
+- берёт сохранённые listing-страницы (VTT_LISTING_FIXTURES_DIR при сборке index пишет их вместе
+  с manifest.jsonl) или генерирует синтетический каталог (--synthetic N);
+- гоняет reference-разбор (_ANCHOR_RE + _HREF_RE, unescape/urljoin/urlparse/parse_qs на каждый href)
+  и scan_listing, сверяет найденные карточки/listing-ссылки и печатает listings/s;
+- с --crawl поднимает локальный HTTP stand-in с задержкой ответа и прогоняет collect_product_index
+  с разным VTT_LISTING_WORKERS.
+
+Что не делает:
+- не ходит к поставщику в сеть;
+- не пишет docs/debug/vtt_shards и фиды.
+
+Запуск:
+    python scripts/bench_vtt_listing.py --rounds 3 docs/debug/vtt_listing_fixtures
+    python scripts/bench_vtt_listing.py --synthetic 300 --crawl --latency-ms 80 --workers 1,4,8
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from html import unescape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urljoin, urlparse
+
+from suppliers.vtt import listing
+from suppliers.vtt.filtering import normalize_listing_title, normalize_listing_url, product_path_re
+
+ROOT = Path(__file__).resolve().parents[1]
+FIXTURES_DIR_DEFAULT = ROOT / "docs" / "debug" / "vtt_listing_fixtures"
+BASE_URL = "https://b2b.vtt.ru/"
+
+# --- reference: разбор из collect_product_index до listing.py (эталон для сверки) ---
+
+_REF_HREF_RE = re.compile(r'''href=["\']([^"\']+)["\']''', re.I)
+_REF_ANCHOR_RE = re.compile(r'''<a\b[^>]*href=["\']([^"\']+)["\'][^>]*>(.*?)</a>''', re.I | re.S)
+
+
+def _ref_scan(page_url: str, html: str, base_netloc: str) -> tuple[set[str], set[str], dict[str, set[str]]]:
+    products: set[str] = set()
+    listings: set[str] = set()
+    titles: dict[str, set[str]] = {}
+    for href, inner in _REF_ANCHOR_RE.findall(html):
+        href = unescape((href or "").strip())
+        if not href or href.startswith("#") or href.startswith("javascript:"):
+            continue
+        abs_url = urljoin(page_url, href)
+        parsed = urlparse(abs_url)
+        if parsed.netloc != base_netloc:
+            continue
+        if parsed.path.lower().startswith("/catalog/") and not parsed.query and product_path_re(parsed.path):
+            products.add(abs_url)
+            title_text = normalize_listing_title(inner)
+            if title_text:
+                titles.setdefault(abs_url, set()).add(title_text)
+            continue
+        if parsed.path.lower().startswith("/catalog"):
+            qs = parse_qs(parsed.query)
+            if {x.strip() for x in qs.get("category", []) if x.strip()}:
+                listings.add(normalize_listing_url(abs_url))
+    for href in _REF_HREF_RE.findall(html):
+        href = unescape((href or "").strip())
+        if not href or href.startswith("#") or href.startswith("javascript:"):
+            continue
+        abs_url = urljoin(page_url, href)
+        parsed = urlparse(abs_url)
+        if parsed.netloc != base_netloc:
+            continue
+        if parsed.path.lower().startswith("/catalog/") and not parsed.query and product_path_re(parsed.path):
+            products.add(abs_url)
+    return products, listings, titles
+
+
+def _new_scan(page_url: str, html: str, base_netloc: str) -> tuple[set[str], set[str], dict[str, set[str]]]:
+    page = listing.scan_listing(page_url, html, base_netloc)
+    titles: dict[str, set[str]] = {}
+    for url, title in page.products:
+        if title:
+            titles.setdefault(url, set()).add(title)
+    return {url for url, _title in page.products}, {url for url, _cats in page.listings}, titles
+
+
+# --- fixtures ---
+
+
+def _load_fixtures(path: Path) -> list[tuple[str, str]]:
+    manifest = path / "manifest.jsonl"
+    pages: dict[str, str] = {}
+    if manifest.exists():
+        for line in manifest.read_text(encoding="utf-8").splitlines():
+            try:
+                row = json.loads(line)
+                pages[str(row["url"])] = (path / row["file"]).read_text(encoding="utf-8")
+            except (ValueError, KeyError, OSError):
+                continue
+    else:
+        for html_file in sorted(path.glob("*.html")):
+            pages[urljoin(BASE_URL, f"/catalog/?category={html_file.stem}")] = html_file.read_text(encoding="utf-8")
+    return list(pages.items())
+
+
+def _synthetic_fixtures(count: int, *, categories: int = 4, products_per_page: int = 40) -> list[tuple[str, str]]:
+    """Каталог по мотивам VTT: меню категорий, пагинация, карточки в <a> с вложенной разметкой."""
+    cats = [f"CAT{i}" for i in range(categories)]
+    per_cat = max(1, count // categories)
+    menu = "".join(f'<li><a class="menu" href="/catalog/?category={c}">Раздел {c}</a></li>' for c in cats)
+    pages: list[tuple[str, str]] = []
+    for c in cats:
+        for n in range(1, per_cat + 1):
+            url = normalize_listing_url(urljoin(BASE_URL, f"/catalog/?category={c}&page={n}" if n > 1 else f"/catalog/?category={c}"))
+            pager = "".join(
+                f'<a href="/catalog/?page={k}&amp;category={c}">{k}</a>' if k > 1 else f'<a href="/catalog/?category={c}">1</a>'
+                for k in range(max(1, n - 3), min(per_cat, n + 3) + 1)
+            )
+            cards = []
+            for i in range(products_per_page):
+                slug = f"{c.lower()}-p{n}-i{i}"
+                title = f"Картридж HP CF{n:03d}{i:02d}A"
+                inner = f"<span class=\"t\">{title}</span>" if i % 3 == 0 else title
+                cards.append(
+                    f'<div class="card"><a href="/catalog/{slug}/"><img src="/img/{slug}.jpg"></a>'
+                    f'<a class="name" href="/catalog/{slug}/">{inner}</a>'
+                    f'<button data-href="/catalog/{slug}/">В корзину</button></div>'
+                )
+            html = (
+                "<!DOCTYPE html><html><head>"
+                f'<link rel="canonical" href="{url}"><link rel="stylesheet" href="/css/app.css">'
+                "</head><body>"
+                f'<ul class="nav">{menu}</ul><a href="#top">вверх</a><a href="javascript:void(0)">x</a>'
+                '<a href="https://vk.com/vtt">vk</a>'
+                f'<div class="cards">{"".join(cards)}</div><div class="pager">{pager}</div>'
+                "</body></html>"
+            )
+            pages.append((url, html))
+    return pages[:count] if count < len(pages) else pages
+
+
+# --- runs ---
+
+
+def _bench_parse(pages: list[tuple[str, str]], rounds: int) -> int:
+    base_netloc = urlparse(BASE_URL).netloc
+    rc = 0
+    results = {}
+    for label, fn in (("reference", _ref_scan), ("scan_listing", _new_scan)):
+        listing.classify_href.cache_clear()
+        started = time.perf_counter()
+        out = []
+        for _ in range(rounds):
+            out = [fn(url, html, base_netloc) for url, html in pages]
+        elapsed = time.perf_counter() - started
+        results[label] = out
+        rate = (len(pages) * rounds / elapsed) if elapsed > 0 else 0.0
+        print(f"[bench_vtt_listing] {label} | pages={len(pages)} x{rounds} | {elapsed:.3f}s | {rate:.1f} listings/s")
+
+    print(f"[bench_vtt_listing] extractor={'lxml' if listing.lxml_html is not None else 'regex'} | {listing.url_cache_info()}")
+    same_products = all(r[0] == n[0] for r, n in zip(results["reference"], results["scan_listing"]))
+    same_listings = all(r[1] == n[1] for r, n in zip(results["reference"], results["scan_listing"]))
+    # Заголовки из lxml — текст <a> без вложенных тегов, reference брал inner HTML как есть
+    title_diff = sum(
+        1
+        for r, n in zip(results["reference"], results["scan_listing"])
+        for url in r[0]
+        if r[2].get(url, set()) != n[2].get(url, set())
+    )
+    print(
+        f"[bench_vtt_listing] products identical={'yes' if same_products else 'NO'} | "
+        f"listings identical={'yes' if same_listings else 'NO'} | titles differ={title_diff}"
+    )
+    if not (same_products and same_listings):
+        rc = 1
+    return rc
+
+
+def _serve(pages: list[tuple[str, str]], latency_ms: int) -> ThreadingHTTPServer:
+    by_key = {}
+    for url, html in pages:
+        p = urlparse(normalize_listing_url(url))
+        by_key[(p.path, p.query)] = html.encode("utf-8")
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args) -> None:
+            pass
+
+        def do_GET(self) -> None:
+            time.sleep(latency_ms / 1000.0)
+            p = urlparse(normalize_listing_url(urljoin(BASE_URL, self.path)))
+            body = by_key.get((p.path, p.query))
+            if body is None:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def _bench_crawl(pages: list[tuple[str, str]], latency_ms: int, workers_list: list[int]) -> int:
+    # requests нужен только этому режиму
+    from suppliers.vtt.models import VTTConfig
+    from suppliers.vtt.source import collect_product_index, make_session
+
+    server = _serve(pages, latency_ms)
+    base = f"http://127.0.0.1:{server.server_port}/"
+    # На stand-in ссылки "/catalog/..." резолвятся в его адрес; BASE_URL нужен только для ключей
+    categories = sorted({c for url, _html in pages for c in listing.page_categories(url)})
+    os.environ["VTT_REQUEST_JITTER_MS"] = "0"
+    rc = 0
+    reference: list[dict] | None = None
+    try:
+        for workers in workers_list:
+            os.environ["VTT_LISTING_WORKERS"] = str(workers)
+            cfg = VTTConfig(
+                base_url=base,
+                start_url=base + "catalog/",
+                login_url=base + "validateLogin",
+                login="",
+                password="",
+                timeout_s=10,
+                listing_request_delay_ms=0,
+                categories=categories,
+            )
+            listing.classify_href.cache_clear()
+            started = time.perf_counter()
+            index = collect_product_index(make_session(cfg), cfg, categories, datetime.utcnow() + timedelta(minutes=30))
+            elapsed = time.perf_counter() - started
+            rate = (len(pages) / elapsed) if elapsed > 0 else 0.0
+            print(
+                f"[bench_vtt_listing] crawl workers={workers} | latency={latency_ms}ms | products={len(index)} | "
+                f"{elapsed:.2f}s | {rate:.1f} listings/s"
+            )
+            if reference is None:
+                reference = index
+            elif index != reference:
+                print(f"[bench_vtt_listing] crawl workers={workers}: index differs from workers={workers_list[0]}")
+                rc = 1
+    finally:
+        server.shutdown()
+    return rc
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("fixtures", nargs="?", default=str(FIXTURES_DIR_DEFAULT))
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--synthetic", type=int, default=0, help="сгенерировать N listing-страниц вместо fixtures")
+    parser.add_argument("--crawl", action="store_true", help="прогнать collect_product_index против stand-in")
+    parser.add_argument("--latency-ms", type=int, default=80)
+    parser.add_argument("--workers", default="1,4,8")
+    args = parser.parse_args(argv)
+
+    if args.synthetic > 0:
+        pages = _synthetic_fixtures(args.synthetic)
+    else:
+        path = Path(args.fixtures)
+        if not path.is_dir():
+            print(f"[bench_vtt_listing] нет {path.as_posix()} (собери index с VTT_LISTING_FIXTURES_DIR или --synthetic N)")
+            return 0
+        pages = _load_fixtures(path)
+    if not pages:
+        print("[bench_vtt_listing] нет listing-страниц для прогона")
+        return 0
+
+    rc = _bench_parse(pages, max(1, int(args.rounds)))
+    if args.crawl:
+        workers_list = [max(1, int(x)) for x in args.workers.split(",") if x.strip()]
+        rc = max(rc, _bench_crawl(pages, max(0, int(args.latency_ms)), workers_list))
+    return rc
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
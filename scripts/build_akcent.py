@@ -16,11 +16,11 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Sequence
 
 import yaml
 
-from cs.core import get_public_vendor, write_cs_feed, write_cs_feed_raw
+from cs.core import OfferOut, get_public_vendor, write_cs_feed, write_cs_feed_raw
 from cs.meta import next_run_at_time, now_almaty
 from cs.qg_report import QualityGateResult, make_quality_gate_result
 from suppliers.akcent.builder import build_offers
@@ -122,7 +122,13 @@ def _call_builder(filtered_offers: list[Any], *, schema_cfg: dict[str, Any], pol
 
 # ------------------------------ qg helpers --------------------------------
 
-def _run_quality_gate(*, out_file: str, raw_out_file: str, policy_cfg: dict[str, Any]) -> QualityGateResult:
+def _run_quality_gate(
+    *,
+    out_file: str,
+    raw_out_file: str,
+    policy_cfg: dict[str, Any],
+    offers: Sequence[OfferOut] | None = None,
+) -> QualityGateResult:
     qg_cfg = policy_cfg.get("quality_gate") or {}
     if not bool(qg_cfg.get("enabled", True)):
         return make_quality_gate_result(ok=True, summary="[AkCent quality_gate] PASS | disabled")
@@ -172,6 +178,7 @@ def _run_quality_gate(*, out_file: str, raw_out_file: str, policy_cfg: dict[str,
         max_new_cosmetic_issues=max_cosmetic_issues,
         enforce=enforce,
         freeze_current_as_baseline=freeze_current,
+        offers=offers,
     )
     if result.summary:
         print(result.summary)
@@ -249,7 +256,7 @@ def main() -> int:
         out_file=out_file,
         raw_out_file=raw_out_file,
     )
-    _run_quality_gate(out_file=out_file, raw_out_file=raw_out_file, policy_cfg=policy_cfg)
+    _run_quality_gate(out_file=out_file, raw_out_file=raw_out_file, policy_cfg=policy_cfg, offers=out_offers)
     return 0
 
 
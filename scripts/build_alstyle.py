@@ -16,11 +16,11 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Sequence
 
 import yaml
 
-from cs.core import write_cs_feed, write_cs_feed_raw
+from cs.core import OfferOut, write_cs_feed, write_cs_feed_raw
 from cs.meta import next_run_at_time, now_almaty
 from cs.qg_report import QualityGateResult, coerce_quality_gate_result
 
@@ -136,7 +136,12 @@ def _resolve_quality_gate(policy_cfg: dict[str, Any]) -> dict[str, Any]:
         or _env_truthy("ALSTYLE_QUALITY_FREEZE_BASELINE"),
     }
 
-def _run_quality_gate(*, raw_out_file: str, qg: dict[str, Any]) -> QualityGateResult:
+def _run_quality_gate(
+    *,
+    raw_out_file: str,
+    qg: dict[str, Any],
+    offers: Sequence[OfferOut] | None = None,
+) -> QualityGateResult:
     if not qg.get("enabled", True):
         return QualityGateResult(ok=True)
 
@@ -148,6 +153,7 @@ def _run_quality_gate(*, raw_out_file: str, qg: dict[str, Any]) -> QualityGateRe
         max_new_cosmetic_issues=_safe_int(qg.get("max_cosmetic_issues"), 5),
         enforce=bool(qg.get("enforce", True)),
         freeze_current_as_baseline=bool(qg.get("freeze_current_as_baseline", False)),
+        offers=offers,
     ),
         report_path=str(qg.get("report_path") or QUALITY_REPORT_DEFAULT),
         baseline_path=str(qg.get("baseline_path") or QUALITY_BASELINE_DEFAULT),
@@ -245,13 +251,13 @@ def main() -> int:
         currency_id="KZT",
     )
 
-    _run_quality_gate(raw_out_file=raw_out_file, qg=qg)
+    _run_quality_gate(raw_out_file=raw_out_file, qg=qg, offers=out_offers)
 
     print(
         f"[build_alstyle] OK | version={BUILD_ALSTYLE_VERSION} | "
         f"offers_in={before} | offers_out={after} | "
         f"in_true={in_true} | in_false={in_false} | "
-        f"changed={'yes' if changed else 'no'} | file={out_file}"
+        f"changed={'yes' if changed else 'no'} | status={changed.status} | file={out_file}"
     )
     return 0
 
@@ -16,11 +16,11 @@ from __future__ import annotations
 
 import os
 from pathlib import Path
-from typing import Any
+from typing import Any, Sequence
 
 import yaml
 
-from cs.core import write_cs_feed, write_cs_feed_raw
+from cs.core import OfferOut, write_cs_feed, write_cs_feed_raw
 from cs.meta import next_run_at_time, now_almaty
 from cs.qg_report import QualityGateResult, coerce_quality_gate_result, make_quality_gate_result
 from suppliers.comportal.builder import build_offers
@@ -171,7 +171,13 @@ def _resolve_watch_ids() -> set[str]:
         return set(COMPORTAL_WATCH_OIDS)
     return {item for item in (chunk.strip() for chunk in raw.replace(";", ",").split(",")) if item}
 
-def _run_quality_gate(*, raw_out_file: str, cfg_dir: Path, qg: dict[str, Any]) -> QualityGateResult:
+def _run_quality_gate(
+    *,
+    raw_out_file: str,
+    cfg_dir: Path,
+    qg: dict[str, Any],
+    offers: Sequence[OfferOut] | None = None,
+) -> QualityGateResult:
     """Запустить supplier-side quality gate или вернуть пустой успешный результат."""
     if not qg.get("enabled", True):
         return make_quality_gate_result(
@@ -191,6 +197,7 @@ def _run_quality_gate(*, raw_out_file: str, cfg_dir: Path, qg: dict[str, Any]) -
         max_new_cosmetic_offers=_safe_int(qg.get("max_new_cosmetic_offers"), 5),
         max_new_cosmetic_issues=_safe_int(qg.get("max_new_cosmetic_issues"), 5),
         freeze_current_as_baseline=bool(qg.get("freeze_current_as_baseline", False)),
+        offers=offers,
     ),
         report_path=str(qg.get("report_path") or qg.get("report_file") or QUALITY_REPORT_DEFAULT),
         baseline_path=str(qg.get("baseline_path") or qg.get("baseline_file") or QUALITY_BASELINE_DEFAULT),
@@ -282,7 +289,7 @@ def main() -> int:
         currency_id=currency_id,
     )
 
-    qg_result = _run_quality_gate(raw_out_file=raw_out_file, cfg_dir=cfg_dir, qg=qg)
+    qg_result = _run_quality_gate(raw_out_file=raw_out_file, cfg_dir=cfg_dir, qg=qg, offers=out_offers)
 
     src_summary = summarize_source_offers(source_offers)
     out_summary = summarize_offer_outs(out_offers)
@@ -293,7 +300,7 @@ def main() -> int:
         f"offers_in={before} | offers_out={after} | "
         f"in_true={out_summary.get('available_true', 0)} | "
         f"in_false={out_summary.get('available_false', 0)} | "
-        f"changed={'yes' if changed else 'no'} | file={out_file}"
+        f"changed={'yes' if changed else 'no'} | status={changed.status} | file={out_file}"
     )
     print(
         f"[build_comportal] source: with_vendor={src_summary.get('with_vendor', 0)} "
@@ -192,6 +192,7 @@ def main() -> int:
             or qg_cfg.get("report_path")
             or COPYLINE_QG_REPORT_DEFAULT
         ),
+        offers=out_offers,
     )
 
     print_build_summary(
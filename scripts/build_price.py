@@ -8,14 +8,21 @@ Path: scripts/build_price.py
 
 from __future__ import annotations
 
+import hashlib
+import json
+import os
+import pickle
 import re
+import shutil
 import sys
+import time
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from pathlib import Path
-import xml.etree.ElementTree as ET
-from typing import Any
+from xml.parsers import expat
+from typing import Any, Iterable, Iterator
 from zoneinfo import ZoneInfo
 
 try:
@@ -23,6 +30,11 @@ try:
 except Exception as exc:  # pragma: no cover
     raise SystemExit(f"Не установлен PyYAML: {exc}")
 
+try:
+    from cs.offer_index import OfferIndexBuilder, offer_index_enabled, read_offer_index
+except ImportError:  # pragma: no cover - без scripts/ в sys.path (smoke-импорт) работаем через парсер
+    OfferIndexBuilder = offer_index_enabled = read_offer_index = None
+
 SCRIPT_FILE = Path(__file__).resolve()
 SCRIPTS_DIR = SCRIPT_FILE.parent
 BASE_DIR = SCRIPTS_DIR.parent
@@ -47,6 +59,14 @@ PRICE_CATEGORIES_FILE = CONFIG_DIR / 'price_categories.yml'
 SATU_PORTAL_CATEGORIES_FILE = CONFIG_DIR / 'satu_portal_categories.yml'
 PRICE_PORTAL_MAP_FILE = CONFIG_DIR / 'price_portal_map.yml'
 PRICE_PORTAL_OVERRIDES_FILE = CONFIG_DIR / 'price_portal_overrides.yml'
+# Скомпилированный снапшот реестра Satu: YAML ~46k строк парсится секундами, pickle — миллисекундами.
+# Пересобирается сам, если satu_portal_categories.yml изменился (mtime/size, затем sha256).
+PORTAL_REGISTRY_SNAPSHOT_FILE = DOCS_DIR / 'debug' / 'satu_portal_categories.pickle'
+PORTAL_REGISTRY_SNAPSHOT_VERSION = 1
+# Manifest инкрементальной сборки Price: по каждому фиду — sha256 и уже размеченные offers.
+# Неизменённый фид (и те же конфиги/код) не парсится и не маппится заново.
+PRICE_MANIFEST_FILE = RAW_DOCS_DIR / 'price_manifest.json'
+PRICE_MANIFEST_VERSION = 1
 
 PLACEHOLDER_PICTURE = 'https://placehold.co/800x800/png?text=No+Photo'
 TZ = ZoneInfo('Asia/Almaty')
@@ -75,11 +95,15 @@ class OfferInfo:
     portal_category_id: str | None
 
 
+# C-loader (libyaml) в разы быстрее pure-Python SafeLoader; результат тот же.
+_YAML_LOADER = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
 def _read_yaml(path: Path) -> dict[str, Any]:
     if not path.exists():
         raise FileNotFoundError(f'Не найден файл: {path.as_posix()}')
     with path.open('r', encoding='utf-8') as fh:
-        data = yaml.safe_load(fh) or {}
+        data = yaml.load(fh, Loader=_YAML_LOADER) or {}
     if not isinstance(data, dict):
         raise ValueError(f'Ожидался YAML-словарь: {path.as_posix()}')
     return data
@@ -101,8 +125,11 @@ VALID_CATEGORY_IDS = {cid for cid, _ in TOP_GROUPS} | {cid for cid, _, _ in LEAF
 LEAF_CATEGORY_IDS = {cid for cid, _, _ in LEAF_GROUPS}
 
 
+_RE_WS = re.compile(r'\s+')
+
+
 def _norm(text: str) -> str:
-    return re.sub(r'\s+', ' ', (text or '').strip().lower())
+    return _RE_WS.sub(' ', (text or '').strip().lower())
 
 
 def _find_current_satu_file() -> str:
@@ -117,27 +144,81 @@ def _find_current_satu_file() -> str:
     return files[0].name if files else 'актуальный файл из data/portal/satu/raw/'
 
 
-def _offer_blocks(text: str) -> list[str]:
-    return re.findall(r'(<offer\b.*?</offer>)', text, flags=re.S)
-
-
-def _extract_tag(block: str, tag: str) -> str:
-    m = re.search(fr'<{tag}>(.*?)</{tag}>', block, flags=re.S)
-    return m.group(1) if m else ''
-
-
-def _extract_all_tags(block: str, tag: str) -> list[str]:
-    return re.findall(fr'<{tag}>(.*?)</{tag}>', block, flags=re.S)
-
+# Один проход по фиду: токены <offer ...>, </offer>, нужные теги и param.
+# Значения остаются сырыми (XML-escaped, как в файле): override-правила, отчёты и
+# _inject_portal_category_id работают именно с ними.
+_FEED_TOKEN_RE = re.compile(
+    r'<offer\b[^>]*>'
+    r'|</offer>'
+    r'|<(categoryId|vendorCode|name|price|vendor|picture)>(.*?)</\1>'
+    r'|<param name="([^"]+)">(.*?)</param>',
+    flags=re.S,
+)
+_OFFER_ID_RE = re.compile(r'<offer\b[^>]*id="([^"]+)"')
+_OFFER_AVAILABLE_RE = re.compile(r'<offer\b[^>]*available="([^"]+)"')
+_FEED_SINGLE_TAGS = ('categoryId', 'vendorCode', 'name', 'price', 'vendor')
 
-def _extract_offer_id(block: str) -> str:
-    m = re.search(r'<offer\b[^>]*id="([^"]+)"', block)
-    return m.group(1) if m else ''
 
-
-def _extract_available(block: str) -> bool:
-    m = re.search(r'<offer\b[^>]*available="([^"]+)"', block)
-    return (m.group(1).strip().lower() == 'true') if m else False
+@dataclass
+class FeedOffer:
+    offer_id: str
+    available: bool
+    category_id: str
+    vendor_code: str
+    name: str
+    price: str
+    vendor: str
+    pictures: list[str]
+    params: list[tuple[str, str]]
+    block: str
+    span: tuple[int, int]
+
+
+def _iter_feed_offers(text: str) -> Iterator[FeedOffer]:
+    open_m: re.Match[str] | None = None
+    fields: dict[str, str] = {}
+    pictures: list[str] = []
+    params: list[tuple[str, str]] = []
+    for m in _FEED_TOKEN_RE.finditer(text):
+        token = m.group(0)
+        if token.startswith('<offer'):
+            open_m = m
+            fields = {}
+            pictures = []
+            params = []
+            continue
+        if open_m is None:
+            # теги вне offer (shop/name и т.п.) не интересны
+            continue
+        if token == '</offer>':
+            head = open_m.group(0)
+            id_m = _OFFER_ID_RE.search(head)
+            avail_m = _OFFER_AVAILABLE_RE.search(head)
+            yield FeedOffer(
+                offer_id=id_m.group(1) if id_m else '',
+                available=(avail_m.group(1).strip().lower() == 'true') if avail_m else False,
+                category_id=fields.get('categoryId', '').strip(),
+                vendor_code=fields.get('vendorCode', '').strip(),
+                name=fields.get('name', '').strip(),
+                price=fields.get('price', '').strip(),
+                vendor=fields.get('vendor', '').strip(),
+                pictures=pictures,
+                params=params,
+                block=text[open_m.start():m.end()],
+                span=(open_m.start(), m.end()),
+            )
+            open_m = None
+            continue
+        tag = m.group(1)
+        if tag == 'picture':
+            value = m.group(2).strip()
+            if value:
+                pictures.append(value)
+        elif tag:
+            # как и раньше берём первое вхождение тега в offer
+            fields.setdefault(tag, m.group(2))
+        else:
+            params.append((m.group(3).strip(), m.group(4).strip()))
 
 
 def _extract_feed_meta_body(text: str, source_name: str) -> str:
@@ -157,7 +238,7 @@ def _extract_supplier_summary(meta_body: str) -> dict[str, str]:
     return out
 
 
-def _build_portal_registry() -> dict[str, dict[str, Any]]:
+def _registry_from_yaml() -> dict[str, dict[str, Any]]:
     data = _read_yaml(SATU_PORTAL_CATEGORIES_FILE)
     registry: dict[str, dict[str, Any]] = {}
     for item in data.get('categories', []) or []:
@@ -169,6 +250,66 @@ def _build_portal_registry() -> dict[str, dict[str, Any]]:
     return registry
 
 
+def _file_sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open('rb') as fh:
+        for chunk in iter(lambda: fh.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_registry_snapshot(stat: os.stat_result) -> dict[str, dict[str, Any]] | None:
+    if not PORTAL_REGISTRY_SNAPSHOT_FILE.exists():
+        return None
+    try:
+        with PORTAL_REGISTRY_SNAPSHOT_FILE.open('rb') as fh:
+            snap = pickle.load(fh)
+    except Exception:
+        return None
+    if not isinstance(snap, dict) or snap.get('version') != PORTAL_REGISTRY_SNAPSHOT_VERSION:
+        return None
+    if snap.get('size') != stat.st_size:
+        return None
+    # mtime меняется после git checkout — тогда сверяем содержимое по sha256
+    if snap.get('mtime_ns') != stat.st_mtime_ns and snap.get('sha256') != _file_sha256(SATU_PORTAL_CATEGORIES_FILE):
+        return None
+    registry = snap.get('registry')
+    return registry if isinstance(registry, dict) else None
+
+
+def _write_registry_snapshot(stat: os.stat_result, registry: dict[str, dict[str, Any]]) -> None:
+    snap = {
+        'version': PORTAL_REGISTRY_SNAPSHOT_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha256': _file_sha256(SATU_PORTAL_CATEGORIES_FILE),
+        'registry': registry,
+    }
+    PORTAL_REGISTRY_SNAPSHOT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = PORTAL_REGISTRY_SNAPSHOT_FILE.with_name(PORTAL_REGISTRY_SNAPSHOT_FILE.name + '.tmp')
+    with tmp.open('wb') as fh:
+        pickle.dump(snap, fh, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, PORTAL_REGISTRY_SNAPSHOT_FILE)
+
+
+def _build_portal_registry() -> tuple[dict[str, dict[str, Any]], float, str]:
+    started = time.perf_counter()
+    if not SATU_PORTAL_CATEGORIES_FILE.exists():
+        raise FileNotFoundError(f'Не найден файл: {SATU_PORTAL_CATEGORIES_FILE.as_posix()}')
+    stat = SATU_PORTAL_CATEGORIES_FILE.stat()
+    registry = _read_registry_snapshot(stat)
+    source = 'snapshot'
+    if registry is None:
+        registry = _registry_from_yaml()
+        source = 'yaml'
+        try:
+            _write_registry_snapshot(stat, registry)
+        except OSError as exc:
+            # снапшот — только ускорение, сборку не валим
+            print(f'[PRICE] WARN: не удалось записать снапшот реестра Satu: {exc}')
+    return registry, time.perf_counter() - started, source
+
+
 def _build_default_map(portal_registry: dict[str, dict[str, Any]]) -> dict[str, str]:
     data = _read_yaml(PRICE_PORTAL_MAP_FILE)
     out: dict[str, str] = {}
@@ -199,49 +340,119 @@ def _build_overrides(portal_registry: dict[str, dict[str, Any]]) -> list[dict[st
     return result
 
 
-def _parse_params(block: str) -> list[tuple[str, str]]:
-    return [(name.strip(), value.strip()) for name, value in re.findall(r'<param name="([^"]+)">(.*?)</param>', block, flags=re.S)]
-
-
-def _override_for_offer(*, supplier: str, category_id: str, name: str, vendor: str, params: list[tuple[str, str]], overrides: list[dict[str, Any]]) -> str | None:
-    name_n = _norm(name)
-    vendor_n = _norm(vendor)
-    params_norm = [(_norm(k), _norm(v)) for k, v in params]
-    for rule in overrides:
-        if str(rule.get('cs_category_id', '')).strip() not in {'', category_id}:
-            continue
-        if str(rule.get('supplier', '')).strip() not in {'', supplier}:
-            continue
-        matched = False
-        for needle in rule.get('name_contains', []) or []:
-            needle_n = _norm(str(needle))
-            if needle_n and needle_n in name_n:
-                matched = True
-                break
-        if not matched:
-            for needle in rule.get('vendor_contains', []) or []:
-                needle_n = _norm(str(needle))
-                if needle_n and needle_n in vendor_n:
-                    matched = True
-                    break
-        if not matched:
+@dataclass
+class _CompiledOverride:
+    order: int
+    priority: int
+    cs_category_id: str
+    supplier: str
+    name_needles: tuple[str, ...]
+    vendor_needles: tuple[str, ...]
+    param_conds: tuple[tuple[str, str], ...]
+    portal_id: str | None
+    hits: int = 0
+
+    @property
+    def label(self) -> str:
+        return f'Override priority={self.priority} cs={self.cs_category_id or "*"} supplier={self.supplier or "*"} -> {self.portal_id or "-"}'
+
+
+class _NeedleMatcher:
+    """Все needles bucket-а одним regex-проходом: lookahead даёт самое длинное совпадение
+    в каждой позиции, а needles-префиксы добираются из заранее посчитанного замыкания."""
+
+    def __init__(self, needles: Iterable[str]) -> None:
+        uniq = sorted(set(needles), key=lambda s: (-len(s), s))
+        self._re = re.compile('(?=(' + '|'.join(re.escape(n) for n in uniq) + '))') if uniq else None
+        self._prefixes = {n: frozenset(m for m in uniq if n.startswith(m)) for n in uniq}
+
+    def hits(self, text: str) -> frozenset[str]:
+        if self._re is None or not text:
+            return frozenset()
+        found: set[str] = set()
+        for m in self._re.finditer(text):
+            found |= self._prefixes[m.group(1)]
+        return frozenset(found)
+
+
+class _OverrideBucket:
+    def __init__(self, rules: list[_CompiledOverride]) -> None:
+        self.rules = rules
+        self.name_matcher = _NeedleMatcher(n for r in rules for n in r.name_needles)
+        self.vendor_matcher = _NeedleMatcher(n for r in rules for n in r.vendor_needles)
+        self.has_params = any(r.param_conds for r in rules)
+
+
+class OverrideIndex:
+    """Override-правила, скомпилированные один раз и разложенные по (cs_category_id, supplier).
+
+    Порядок проверки внутри bucket-а = порядок priority из price_portal_overrides.yml,
+    поэтому первое сработавшее правило то же, что и при линейном обходе всех правил.
+    """
+
+    def __init__(self, overrides: list[dict[str, Any]]) -> None:
+        self.rules: list[_CompiledOverride] = []
+        self._by_key: dict[tuple[str, str], list[_CompiledOverride]] = {}
+        self._buckets: dict[tuple[str, str], _OverrideBucket] = {}
+        for order, rule in enumerate(overrides):
+            conds: list[tuple[str, str]] = []
             for cond in rule.get('params', []) or []:
                 if not isinstance(cond, dict):
                     continue
                 target_name = _norm(str(cond.get('name', '')))
                 contains = _norm(str(cond.get('contains', '')))
-                if not target_name or not contains:
-                    continue
-                for pname, pvalue in params_norm:
-                    if pname == target_name and contains in pvalue:
-                        matched = True
-                        break
-                if matched:
-                    break
-        if matched:
-            portal_id = str(rule.get('portal_category_id', '')).strip()
-            return portal_id or None
-    return None
+                if target_name and contains:
+                    conds.append((target_name, contains))
+            compiled = _CompiledOverride(
+                order=order,
+                priority=int(rule.get('priority', 999999)),
+                cs_category_id=str(rule.get('cs_category_id', '')).strip(),
+                supplier=str(rule.get('supplier', '')).strip(),
+                name_needles=tuple(n for n in (_norm(str(x)) for x in rule.get('name_contains', []) or []) if n),
+                vendor_needles=tuple(n for n in (_norm(str(x)) for x in rule.get('vendor_contains', []) or []) if n),
+                param_conds=tuple(conds),
+                portal_id=str(rule.get('portal_category_id', '')).strip() or None,
+            )
+            self.rules.append(compiled)
+            self._by_key.setdefault((compiled.cs_category_id, compiled.supplier), []).append(compiled)
+
+    def _bucket(self, category_id: str, supplier: str) -> _OverrideBucket:
+        key = (category_id, supplier)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            rules: list[_CompiledOverride] = []
+            for cid in {'', category_id}:
+                for sup in {'', supplier}:
+                    rules.extend(self._by_key.get((cid, sup), []))
+            rules.sort(key=lambda r: r.order)
+            bucket = _OverrideBucket(rules)
+            self._buckets[key] = bucket
+        return bucket
+
+    def match(self, *, supplier: str, category_id: str, name: str, vendor: str, params: list[tuple[str, str]]) -> str | None:
+        bucket = self._bucket(category_id, supplier)
+        if not bucket.rules:
+            return None
+        name_hits = bucket.name_matcher.hits(_norm(name))
+        vendor_hits = bucket.vendor_matcher.hits(_norm(vendor))
+        params_norm = [(_norm(k), _norm(v)) for k, v in params] if bucket.has_params else []
+        for rule in bucket.rules:
+            matched = (
+                any(n in name_hits for n in rule.name_needles)
+                or any(n in vendor_hits for n in rule.vendor_needles)
+                or any(
+                    pname == target_name and contains in pvalue
+                    for target_name, contains in rule.param_conds
+                    for pname, pvalue in params_norm
+                )
+            )
+            if matched:
+                rule.hits += 1
+                return rule.portal_id
+        return None
+
+
+_PORTAL_CATEGORY_RE = re.compile(r'<portal_category_id>(.*?)</portal_category_id>', re.S)
 
 
 def _inject_portal_category_id(block: str, portal_category_id: str) -> str:
@@ -250,54 +461,198 @@ def _inject_portal_category_id(block: str, portal_category_id: str) -> str:
     return re.sub(r'(<categoryId>.*?</categoryId>)', r'\1\n      <portal_category_id>' + portal_category_id + '</portal_category_id>', block, count=1, flags=re.S)
 
 
-def _load_offers(default_map: dict[str, str], overrides: list[dict[str, Any]]) -> tuple[list[OfferInfo], list[str], Counter[str], int, int]:
+def _iter_indexed_offers(path: Path, raw: bytes) -> tuple[str, list[FeedOffer]] | None:
+    """Offers из sidecar-индекса write_cs_feed (docs/.offers/<file>.jsonl) — без разбора XML.
+
+    Возвращает (текст шапки, записи) или None, если индекса нет или он не от этого файла.
+    Значения в индексе — в том же XML-escaped виде, что и в фиде, как у _iter_feed_offers.
+    """
+    # span-ы в manifest — символьные по read_text(); с \r (universal newlines) байты и символы расходятся
+    if read_offer_index is None or b'\r' in raw:
+        return None
+    index = read_offer_index(path)
+    if index is None:
+        return None
+    head = raw[:index.base].decode('utf-8')
+    items: list[FeedOffer] = []
+    byte_pos = index.base
+    char_pos = len(head)
+    for rec in index.records:
+        start, end = index.span(rec)
+        char_pos += len(raw[byte_pos:start].decode('utf-8'))
+        block = raw[start:end].decode('utf-8')
+        price = rec.get('price')
+        items.append(FeedOffer(
+            offer_id=str(rec['id']),
+            available=bool(rec['available']),
+            category_id=str(rec['category_id']).strip(),
+            vendor_code=str(rec['vendor_code']).strip(),
+            name=str(rec['name']).strip(),
+            price='' if price is None else str(price),
+            vendor=str(rec['vendor']).strip(),
+            pictures=[p.strip() for p in rec['pictures'] if p.strip()],
+            params=[(k.strip(), v.strip()) for k, v in rec['params']],
+            block=block,
+            span=(char_pos, char_pos + len(block)),
+        ))
+        char_pos += len(block)
+        byte_pos = end
+    return head, items
+
+
+@dataclass
+class SupplierLoad:
+    supplier: str
+    meta_body: str
+    offers: list[OfferInfo]
+    status_counts: Counter[str]
+    ready_to_ship_no_price: int
+    placeholder_count: int
+    override_hits: list[int]
+    seconds: float
+    sha256: str
+    spans: list[tuple[int, int]]
+    source: str = 'parse'
+
+
+def _price_load_workers() -> int:
+    raw = (os.getenv('PRICE_LOAD_WORKERS', '') or '').strip()
+    try:
+        workers = int(raw) if raw else min(len(FINAL_SOURCES), os.cpu_count() or 1)
+    except ValueError:
+        workers = 1
+    return max(1, workers)
+
+
+def _load_supplier(supplier_name: str, path: Path, default_map: dict[str, str], override_index: OverrideIndex) -> SupplierLoad:
+    started = time.perf_counter()
+    hits_before = [rule.hits for rule in override_index.rules]
     offers: list[OfferInfo] = []
-    feed_meta_blocks: list[str] = []
+    spans: list[tuple[int, int]] = []
     status_counts: Counter[str] = Counter()
     ready_to_ship_no_price = 0
     placeholder_count = 0
-    missing_sources: list[str] = []
 
-    for supplier_name, path in FINAL_SOURCES:
-        if not path.exists():
-            missing_sources.append(supplier_name)
-            continue
+    raw = path.read_bytes()
+    indexed = _iter_indexed_offers(path, raw)
+    if indexed is not None:
+        head, items = indexed
+        source = 'index'
+    else:
+        head = raw.decode('utf-8').replace('\r\n', '\n').replace('\r', '\n')
+        items = _iter_feed_offers(head)
+        source = 'parse'
+    meta_body = _extract_feed_meta_body(head, supplier_name)
+    for item in items:
+        offer_id = item.offer_id
+        category_id = item.category_id
+        if category_id not in LEAF_CATEGORY_IDS:
+            raise ValueError(f'[{supplier_name}] [{offer_id}] Неизвестный categoryId={category_id}')
+
+        block = item.block
+        is_ready_to_ship = ' in_stock="true"' in block
+        if not item.price and is_ready_to_ship:
+            ready_to_ship_no_price += 1
+        if any(p == PLACEHOLDER_PICTURE for p in item.pictures):
+            placeholder_count += 1
+
+        portal_category_id = override_index.match(
+            supplier=supplier_name,
+            category_id=category_id,
+            name=item.name,
+            vendor=item.vendor,
+            params=item.params,
+        )
+        if portal_category_id:
+            block = _inject_portal_category_id(block, portal_category_id)
+        elif category_id not in default_map:
+            raise ValueError(f'[{supplier_name}] [{offer_id}] Нет portal_id для categoryId={category_id}')
+
+        offers.append(OfferInfo(
+            supplier=supplier_name,
+            offer_id=offer_id,
+            vendor_code=item.vendor_code,
+            category_id=category_id,
+            name=item.name,
+            available=item.available,
+            price=item.price,
+            pictures=item.pictures,
+            block=block,
+            portal_category_id=portal_category_id,
+        ))
+        spans.append(item.span)
+        status_counts['true' if item.available else 'false'] += 1
+
+    return SupplierLoad(
+        supplier=supplier_name,
+        meta_body=meta_body,
+        offers=offers,
+        status_counts=status_counts,
+        ready_to_ship_no_price=ready_to_ship_no_price,
+        placeholder_count=placeholder_count,
+        override_hits=[rule.hits - before for rule, before in zip(override_index.rules, hits_before)],
+        seconds=time.perf_counter() - started,
+        sha256=hashlib.sha256(raw).hexdigest(),
+        spans=spans,
+        source=source,
+    )
+
+
+def _price_config_key() -> str:
+    # Разметка offers зависит от кода build_price и price-конфигов: их смена сбрасывает manifest
+    h = hashlib.sha256()
+    for path in (SCRIPT_FILE, PRICE_CATEGORIES_FILE, PRICE_PORTAL_MAP_FILE, PRICE_PORTAL_OVERRIDES_FILE):
+        h.update(path.name.encode('utf-8'))
+        h.update(path.read_bytes())
+    return h.hexdigest()
+
+
+def _read_price_manifest(config_key: str) -> dict[str, dict[str, Any]]:
+    if not PRICE_MANIFEST_FILE.exists():
+        return {}
+    try:
+        data = json.loads(PRICE_MANIFEST_FILE.read_text(encoding='utf-8'))
+    except (OSError, ValueError):
+        return {}
+    if not isinstance(data, dict) or data.get('version') != PRICE_MANIFEST_VERSION or data.get('config_key') != config_key:
+        return {}
+    suppliers = data.get('suppliers')
+    return suppliers if isinstance(suppliers, dict) else {}
+
+
+def _write_price_manifest(config_key: str, loads: dict[str, SupplierLoad]) -> None:
+    suppliers: dict[str, Any] = {}
+    for name, load in loads.items():
+        suppliers[name] = {
+            'sha256': load.sha256,
+            'meta_body': load.meta_body,
+            'offers_total': len(load.offers),
+            'status_counts': dict(load.status_counts),
+            'ready_to_ship_no_price': load.ready_to_ship_no_price,
+            'placeholder_count': load.placeholder_count,
+            'override_hits': load.override_hits,
+            'offers': [
+                [o.offer_id, o.vendor_code, o.category_id, o.name, o.available, o.price, o.pictures, o.portal_category_id, start, end]
+                for o, (start, end) in zip(load.offers, load.spans)
+            ],
+        }
+    data = {'version': PRICE_MANIFEST_VERSION, 'config_key': config_key, 'suppliers': suppliers}
+    PRICE_MANIFEST_FILE.parent.mkdir(parents=True, exist_ok=True)
+    tmp = PRICE_MANIFEST_FILE.with_name(PRICE_MANIFEST_FILE.name + '.tmp')
+    tmp.write_text(json.dumps(data, ensure_ascii=False, separators=(',', ':')), encoding='utf-8')
+    os.replace(tmp, PRICE_MANIFEST_FILE)
+
+
+def _supplier_from_manifest(supplier_name: str, path: Path, entry: dict[str, Any], sha256: str) -> SupplierLoad | None:
+    started = time.perf_counter()
+    try:
         text = path.read_text(encoding='utf-8')
-        meta_body = _extract_feed_meta_body(text, supplier_name)
-        feed_meta_blocks.append(meta_body)
-        for block in _offer_blocks(text):
-            offer_id = _extract_offer_id(block)
-            category_id = _extract_tag(block, 'categoryId').strip()
-            if category_id not in LEAF_CATEGORY_IDS:
-                raise ValueError(f'[{supplier_name}] [{offer_id}] Неизвестный categoryId={category_id}')
-
-            vendor_code = _extract_tag(block, 'vendorCode').strip()
-            name = _extract_tag(block, 'name').strip()
-            price = _extract_tag(block, 'price').strip()
-            vendor = _extract_tag(block, 'vendor').strip()
-            pictures = [p.strip() for p in _extract_all_tags(block, 'picture') if p.strip()]
-            params = _parse_params(block)
-            available = _extract_available(block)
-
-            is_ready_to_ship = ' in_stock="true"' in block
-            if not price and is_ready_to_ship:
-                ready_to_ship_no_price += 1
-            if any(p == PLACEHOLDER_PICTURE for p in pictures):
-                placeholder_count += 1
-
-            portal_category_id = _override_for_offer(
-                supplier=supplier_name,
-                category_id=category_id,
-                name=name,
-                vendor=vendor,
-                params=params,
-                overrides=overrides,
-            )
+        offers: list[OfferInfo] = []
+        spans: list[tuple[int, int]] = []
+        for offer_id, vendor_code, category_id, name, available, price, pictures, portal_category_id, start, end in entry['offers']:
+            block = text[start:end]
             if portal_category_id:
                 block = _inject_portal_category_id(block, portal_category_id)
-            elif category_id not in default_map:
-                raise ValueError(f'[{supplier_name}] [{offer_id}] Нет portal_id для categoryId={category_id}')
-
             offers.append(OfferInfo(
                 supplier=supplier_name,
                 offer_id=offer_id,
@@ -306,15 +661,91 @@ def _load_offers(default_map: dict[str, str], overrides: list[dict[str, Any]]) -
                 name=name,
                 available=available,
                 price=price,
-                pictures=pictures,
+                pictures=list(pictures),
                 block=block,
                 portal_category_id=portal_category_id,
             ))
-            status_counts['true' if available else 'false'] += 1
-
+            spans.append((start, end))
+        return SupplierLoad(
+            supplier=supplier_name,
+            meta_body=entry['meta_body'],
+            offers=offers,
+            status_counts=Counter(entry['status_counts']),
+            ready_to_ship_no_price=int(entry['ready_to_ship_no_price']),
+            placeholder_count=int(entry['placeholder_count']),
+            override_hits=[int(x) for x in entry['override_hits']],
+            seconds=time.perf_counter() - started,
+            sha256=sha256,
+            spans=spans,
+            source='manifest',
+        )
+    except (KeyError, TypeError, ValueError):
+        # битая запись manifest — просто парсим фид заново
+        return None
+
+
+def _load_offers(default_map: dict[str, str], override_index: OverrideIndex, *, workers: int = 1) -> tuple[list[OfferInfo], list[str], Counter[str], int, int, dict[str, float], dict[str, str]]:
+    missing_sources = [name for name, path in FINAL_SOURCES if not path.exists()]
     if missing_sources:
         raise FileNotFoundError('Не найдены final-файлы поставщиков: ' + ', '.join(missing_sources))
-    return offers, feed_meta_blocks, status_counts, ready_to_ship_no_price, placeholder_count
+
+    config_key = _price_config_key()
+    manifest = _read_price_manifest(config_key)
+    loads: dict[str, SupplierLoad] = {}
+    pending: list[tuple[str, Path]] = []
+    for name, path in FINAL_SOURCES:
+        entry = manifest.get(name)
+        if isinstance(entry, dict) and entry.get('sha256'):
+            sha256 = _file_sha256(path)
+            if entry['sha256'] == sha256:
+                load = _supplier_from_manifest(name, path, entry, sha256)
+                if load is not None:
+                    loads[name] = load
+                    continue
+        pending.append((name, path))
+
+    if len(pending) > 1 and workers > 1:
+        # Фиды независимы: парсим параллельно, а склеиваем ниже строго в порядке EXPECTED_SUPPLIERS
+        with ProcessPoolExecutor(max_workers=min(workers, len(pending))) as pool:
+            futures = {
+                name: pool.submit(_load_supplier, name, path, default_map, override_index)
+                for name, path in pending
+            }
+            for name, future in futures.items():
+                loads[name] = future.result()
+        in_process: set[str] = set()
+    else:
+        for name, path in pending:
+            loads[name] = _load_supplier(name, path, default_map, override_index)
+        in_process = {name for name, _ in pending}
+    # счётчики override-правил из воркеров и manifest добавляем в индекс (in-process уже там)
+    for name, load in loads.items():
+        if name in in_process:
+            continue
+        for rule, hits in zip(override_index.rules, load.override_hits):
+            rule.hits += hits
+
+    if pending:
+        _write_price_manifest(config_key, loads)
+
+    offers: list[OfferInfo] = []
+    feed_meta_blocks: list[str] = []
+    status_counts: Counter[str] = Counter()
+    ready_to_ship_no_price = 0
+    placeholder_count = 0
+    load_seconds: dict[str, float] = {}
+    load_sources: dict[str, str] = {}
+    for name in EXPECTED_SUPPLIERS:
+        load = loads[name]
+        offers.extend(load.offers)
+        feed_meta_blocks.append(load.meta_body)
+        status_counts.update(load.status_counts)
+        ready_to_ship_no_price += load.ready_to_ship_no_price
+        placeholder_count += load.placeholder_count
+        load_seconds[name] = load.seconds
+        load_sources[name] = load.source
+        print(f'[PRICE] {name}: offers={len(load.offers)} | {load.source} | load={load.seconds:.3f}s')
+    return offers, feed_meta_blocks, status_counts, ready_to_ship_no_price, placeholder_count, load_seconds, load_sources
 
 
 def _build_categories_xml(default_map: dict[str, str]) -> tuple[str, int, int, int]:
@@ -347,7 +778,7 @@ def _write_unmapped_report(unmapped: list[OfferInfo]) -> None:
     UNMAPPED_FILE.write_text('\n'.join(lines) + '\n', encoding='utf-8')
 
 
-def _write_audit_report(*, total_categories: int, leaf_categories: int, mapped_leaf: int, default_mapped: int, override_mapped: int, unmapped_count: int, satu_file_name: str) -> None:
+def _write_audit_report(*, total_categories: int, leaf_categories: int, mapped_leaf: int, default_mapped: int, override_mapped: int, unmapped_count: int, satu_file_name: str, registry_load_seconds: float, registry_source: str, override_rules: list[_CompiledOverride]) -> None:
     AUDIT_FILE.parent.mkdir(parents=True, exist_ok=True)
     now = datetime.now(TZ)
     lines = [
@@ -361,11 +792,16 @@ def _write_audit_report(*, total_categories: int, leaf_categories: int, mapped_l
         f'Сколько товаров получили отдельную категорию Satu   | {override_mapped}',
         f'Сколько товаров без категории Satu         | {unmapped_count}',
         f'Статус привязки к категориям Satu          | {"УСПЕШНО" if unmapped_count == 0 else "НЕУСПЕШНО"}',
+        f'Загрузка реестра категорий Satu (сек)      | {registry_load_seconds:.3f} ({registry_source})',
+        '',
+        'Срабатывания override-правил (price_portal_overrides.yml)',
     ]
+    for rule in override_rules:
+        lines.append(f'{rule.label:<42} | {rule.hits}')
     AUDIT_FILE.write_text('\n'.join(lines) + '\n', encoding='utf-8')
 
 
-def _render_price_feed(*, offers: list[OfferInfo], feed_meta_blocks: list[str], total_categories: int, leaf_categories: int, mapped_leaf: int, status_counts: Counter[str], ready_to_ship_no_price: int, placeholder_count: int, satu_file_name: str, categories_xml: str) -> str:
+def _iter_price_feed(*, offers: list[OfferInfo], feed_meta_blocks: list[str], total_categories: int, leaf_categories: int, mapped_leaf: int, status_counts: Counter[str], ready_to_ship_no_price: int, placeholder_count: int, satu_file_name: str, categories_xml: str, load_seconds: dict[str, float], load_sources: dict[str, str], load_workers: int, offer_index: OfferIndexBuilder | None = None) -> Iterator[str]:
     now = datetime.now(TZ)
     next_run = now.replace(hour=4, minute=30, second=0, microsecond=0)
     if next_run <= now:
@@ -378,6 +814,11 @@ def _render_price_feed(*, offers: list[OfferInfo], feed_meta_blocks: list[str],
         'Расписание (Алматы)                   | ежедневно в 04:30',
         f'Сколько поставщиков в Price           | {len(EXPECTED_SUPPLIERS)}',
         f'Порядок поставщиков                   | {", ".join(EXPECTED_SUPPLIERS)}',
+        f'Загрузка фидов: процессов             | {load_workers}',
+        *(
+            f'{"Загрузка " + name + " (сек)":<38}| {load_seconds.get(name, 0.0):.3f} ({load_sources.get(name, "parse")})'
+            for name in EXPECTED_SUPPLIERS
+        ),
         f'Сколько товаров в Price всего         | {len(offers)}',
         f'Сколько товаров есть в наличии (true) | {status_counts["true"]}',
         f'Сколько товаров нет в наличии (false) | {status_counts["false"]}',
@@ -416,39 +857,116 @@ def _render_price_feed(*, offers: list[OfferInfo], feed_meta_blocks: list[str],
         '',
         '    <offers>',
     ]
+    # Потоково: шапка, затем offers по одному — без общего списка/строки на весь Price
+    head = '\n'.join(lines) + '\n'
+    if offer_index is not None:
+        offer_index.base = len(head.encode('utf-8'))
+    yield head
     for offer in offers:
         block = offer.block.strip('\n')
         indented = '\n'.join('      ' + line if line.strip() else '' for line in block.splitlines())
-        lines.append(indented)
-        lines.append('')
-    lines.extend(['    </offers>', '  </shop>', '</yml_catalog>', ''])
-    return '\n'.join(lines)
+        if offer_index is not None:
+            offer_index.add_block(indented, _price_index_record(offer, block))
+        yield indented + '\n\n'
+    yield '    </offers>\n  </shop>\n</yml_catalog>\n'
+
+
+def _price_index_record(offer: OfferInfo, block: str) -> dict[str, Any]:
+    # Значения как в XML (escaped), чтобы checker мог не парсить Price; portal_category_id — из итогового блока
+    portal = _PORTAL_CATEGORY_RE.search(block) if '<portal_category_id>' in block else None
+    return {
+        'id': offer.offer_id,
+        'supplier': offer.supplier,
+        'vendor_code': offer.vendor_code,
+        'category_id': offer.category_id,
+        'portal_category_id': portal.group(1).strip() if portal else '',
+        'name': offer.name,
+        'price': offer.price,
+        'available': offer.available,
+        'in_stock': ' in_stock="true"' in block,
+        'pictures': offer.pictures,
+    }
+
+
+def _write_price_feed(path: Path, chunks: Iterable[str]) -> str:
+    """Пишет Price.yml во временный файл рядом, валидирует и атомарно подменяет. Возвращает sha256."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + '.tmp')
+    h = hashlib.sha256()
+    try:
+        with tmp.open('w', encoding='utf-8') as fh:
+            for chunk in chunks:
+                fh.write(chunk)
+                h.update(chunk.encode('utf-8'))
+        _validate_output_xml(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
+    return h.hexdigest()
+
+
+def _same_content(path: Path, other: Path, other_sha256: str) -> bool:
+    if not path.exists():
+        return False
+    try:
+        if os.path.samefile(path, other):
+            return True
+    except OSError:
+        return False
+    return path.stat().st_size == other.stat().st_size and _file_sha256(path) == other_sha256
+
+
+def _link_or_copy(src: Path, dst: Path) -> str:
+    """XML-копия без чтения в память: hardlink, иначе потоковое копирование (copy_file_range/sendfile)."""
+    tmp = dst.with_name(dst.name + '.tmp')
+    tmp.unlink(missing_ok=True)
+    try:
+        os.link(src, tmp)
+        mode = 'hardlink'
+    except OSError:
+        shutil.copyfile(src, tmp)
+        mode = 'copy'
+    os.replace(tmp, dst)
+    return mode
 
 
-def _write_xml_mirrors() -> list[Path]:
+def _write_xml_mirrors(validated: set[str]) -> list[Path]:
     written: list[Path] = []
     for yml_path in XML_MIRROR_SOURCES:
         if not yml_path.exists():
             raise FileNotFoundError(f'Не найден файл для XML-копии: {yml_path.as_posix()}')
         xml_path = yml_path.with_suffix('.xml')
-        xml_path.write_text(yml_path.read_text(encoding='utf-8'), encoding='utf-8')
-        _validate_output_xml(xml_path)
+        digest = _file_sha256(yml_path)
+        mode = 'unchanged'
+        if not _same_content(xml_path, yml_path, digest):
+            mode = _link_or_copy(yml_path, xml_path)
+        # одинаковое содержимое (Price.yml -> Price.xml, неизменённые фиды) валидируем один раз
+        if digest not in validated:
+            _validate_output_xml(xml_path)
+            validated.add(digest)
+        print(f'[PRICE] XML mirror {xml_path.name}: {mode}')
         written.append(xml_path)
     return written
 
 
 def _validate_output_xml(path: Path) -> None:
+    # expat без построения дерева: проверка well-formed за один проход и без пиковой памяти ET.parse
+    parser = expat.ParserCreate()
     try:
-        ET.parse(path)
-    except ET.ParseError as exc:
+        with path.open('rb') as fh:
+            parser.ParseFile(fh)
+    except expat.ExpatError as exc:
         raise ValueError(f'Собранный Price.xml невалиден: {exc}') from exc
 
 
 def main() -> int:
-    portal_registry = _build_portal_registry()
+    portal_registry, registry_load_seconds, registry_source = _build_portal_registry()
+    print(f'[PRICE] Satu registry: {len(portal_registry)} categories | {registry_source} | {registry_load_seconds:.3f}s')
     default_map = _build_default_map(portal_registry)
-    overrides = _build_overrides(portal_registry)
-    offers, feed_meta_blocks, status_counts, ready_to_ship_no_price, placeholder_count = _load_offers(default_map, overrides)
+    override_index = OverrideIndex(_build_overrides(portal_registry))
+    load_workers = _price_load_workers()
+    offers, feed_meta_blocks, status_counts, ready_to_ship_no_price, placeholder_count, load_seconds, load_sources = _load_offers(default_map, override_index, workers=load_workers)
 
     offer_ids = [o.offer_id for o in offers]
     vendor_codes = [o.vendor_code for o in offers]
@@ -469,11 +987,15 @@ def main() -> int:
         override_mapped=len([o for o in offers if o.portal_category_id]),
         unmapped_count=len(unmapped),
         satu_file_name=satu_file_name,
+        registry_load_seconds=registry_load_seconds,
+        registry_source=registry_source,
+        override_rules=override_index.rules,
     )
 
-    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
-    OUTPUT_FILE.write_text(
-        _render_price_feed(
+    price_index = OfferIndexBuilder() if OfferIndexBuilder is not None and offer_index_enabled() else None
+    price_sha256 = _write_price_feed(
+        OUTPUT_FILE,
+        _iter_price_feed(
             offers=offers,
             feed_meta_blocks=feed_meta_blocks,
             total_categories=total_categories,
@@ -484,12 +1006,17 @@ def main() -> int:
             placeholder_count=placeholder_count,
             satu_file_name=satu_file_name,
             categories_xml=categories_xml,
+            load_seconds=load_seconds,
+            load_sources=load_sources,
+            load_workers=load_workers,
+            offer_index=price_index,
         ),
-        encoding='utf-8',
     )
-    _validate_output_xml(OUTPUT_FILE)
-    xml_mirrors = _write_xml_mirrors()
+    xml_mirrors = _write_xml_mirrors({price_sha256})
     print(f'[PRICE] OK: {OUTPUT_FILE.as_posix()}')
+    if price_index is not None:
+        index_path = price_index.write(OUTPUT_FILE, feed_sha256=price_sha256)
+        print(f'[PRICE] offer index: {len(price_index.records)} offers | {index_path.as_posix()}')
     print('[PRICE] XML mirrors: ' + ', '.join(path.name for path in xml_mirrors))
     return 0
 
@@ -4,7 +4,14 @@ from __future__ import annotations
 import html
 import json
 import os
+import argparse
+import gzip
+import hashlib
 import re
+import sqlite3
+import statistics
+import sys
+import time
 from dataclasses import dataclass, field
 from datetime import datetime
 from pathlib import Path
@@ -14,6 +21,16 @@ import urllib.parse
 import urllib.request
 import xml.etree.ElementTree as ET
 
+try:
+    import resource
+except ImportError:  # pragma: no cover - нет на Windows
+    resource = None
+
+try:
+    from cs.offer_index import OfferIndex, offer_index_enabled, read_offer_index
+except ImportError:  # pragma: no cover - без scripts/ в sys.path (smoke-импорт) — только iterparse
+    OfferIndex = offer_index_enabled = read_offer_index = None
+
 ALMATY_TZ = ZoneInfo("Asia/Almaty")
 ROOT = Path(__file__).resolve().parents[1]
 PRICE_FILE = ROOT / "docs" / "Price.yml"
@@ -22,12 +39,18 @@ RAW_DIR = DOCS_DIR / "raw"
 SUMMARY_REPORT_FILE = RAW_DIR / "price_checker_report.txt"
 DETAILS_REPORT_FILE = RAW_DIR / "price_checker_details.txt"
 LAST_SUCCESS_FILE = RAW_DIR / "price_checker_last_success.json"
+HISTORY_FILE = RAW_DIR / "price_checker_history.sqlite"
+HISTORY_LOG_FILE = RAW_DIR / "price_checker_history.jsonl"
+OFFER_SNAPSHOT_FILE = RAW_DIR / "price_checker_offers.json.gz"
+OFFER_DIFF_FILE = RAW_DIR / "price_checker_diff.json"
 UNRESOLVED_FILE = RAW_DIR / "category_id_unresolved.txt"
 
 EXPECTED_SUPPLIERS = ("AkCent", "AlStyle", "ComPortal", "CopyLine", "VTT")
 PLACEHOLDER_URL = "https://placehold.co/800x800/png?text=No+Photo"
 DETAIL_LIMIT_DEFAULT = 300
 DETAIL_LIMIT_CRITICAL = 1000
+HEAD_READ_LIMIT = 1 << 20
+SCAN_CHUNK_SIZE = 1 << 20
 
 WARN_TOTAL_DELTA_PCT = 5.0
 WARN_SUPPLIER_DELTA_PCT = 10.0
@@ -40,6 +63,37 @@ WARN_FALSE_DELTA_PCT = 20.0
 FAIL_TOTAL_DROP_PCT = 15.0
 FAIL_SUPPLIER_DROP_PCT = 25.0
 
+# База сравнения: last — последний успешный прогон (price_checker_last_success.json),
+# median — поле за полем медиана последних N успешных прогонов из истории.
+BASELINE_MODE_DEFAULT = "last"
+BASELINE_MEDIAN_RUNS_DEFAULT = 7
+# Сколько дней история хранится по прогонам; старше — по одному прогону на неделю
+HISTORY_DAILY_DAYS_DEFAULT = 400
+HISTORY_VACUUM_FREE_RATIO = 0.25
+
+RUN_FIELDS = (
+    "total",
+    "available_true",
+    "available_false",
+    "ready_to_ship_no_price",
+    "placeholder",
+    "empty_category",
+    "invalid_category",
+    "unknown_satu",
+    "excluded_unmapped_total",
+    "duplicate_offer_id_groups",
+    "duplicate_vendorcode_groups",
+)
+SUPPLIER_FIELDS = (
+    "total",
+    "available",
+    "unavailable",
+    "ready_to_ship_no_price",
+    "placeholder",
+    "excluded_no_categoryid",
+    "no_satu_category",
+)
+
 MONTHS_RU = {
     1: "января", 2: "февраля", 3: "марта", 4: "апреля", 5: "мая", 6: "июня",
     7: "июля", 8: "августа", 9: "сентября", 10: "октября", 11: "ноября", 12: "декабря",
@@ -99,6 +153,47 @@ class DuplicateGroup:
     entries: List[OfferEntry] = field(default_factory=list)
 
 
+@dataclass
+class OfferDiff:
+    """Разница offers между двумя сборками Price; записи — (поставщик, id[, было, стало])."""
+    from_build_time: str = ""
+    to_build_time: str = ""
+    per_supplier: Dict[str, Dict[str, int]] = field(default_factory=dict)
+    added: List[Tuple[str, str]] = field(default_factory=list)
+    removed: List[Tuple[str, str]] = field(default_factory=list)
+    price_changes: List[Tuple[str, str, str, str]] = field(default_factory=list)
+    availability_changes: List[Tuple[str, str, bool, bool]] = field(default_factory=list)
+    category_moves: List[Tuple[str, str, str, str]] = field(default_factory=list)
+    content_changed: List[Tuple[str, str]] = field(default_factory=list)
+
+    def to_json(self) -> dict:
+        return {
+            "from_build_time": self.from_build_time,
+            "to_build_time": self.to_build_time,
+            "per_supplier": self.per_supplier,
+            "added": [list(item) for item in self.added],
+            "removed": [list(item) for item in self.removed],
+            "price_changes": [list(item) for item in self.price_changes],
+            "availability_changes": [list(item) for item in self.availability_changes],
+            "category_moves": [list(item) for item in self.category_moves],
+            "content_changed": [list(item) for item in self.content_changed],
+        }
+
+    @classmethod
+    def from_json(cls, data: dict) -> "OfferDiff":
+        return cls(
+            from_build_time=str(data.get("from_build_time", "")),
+            to_build_time=str(data.get("to_build_time", "")),
+            per_supplier={k: {kk: int(vv) for kk, vv in v.items()} for k, v in (data.get("per_supplier") or {}).items()},
+            added=[tuple(item) for item in data.get("added") or []],
+            removed=[tuple(item) for item in data.get("removed") or []],
+            price_changes=[tuple(item) for item in data.get("price_changes") or []],
+            availability_changes=[tuple(item) for item in data.get("availability_changes") or []],
+            category_moves=[tuple(item) for item in data.get("category_moves") or []],
+            content_changed=[tuple(item) for item in data.get("content_changed") or []],
+        )
+
+
 @dataclass
 class Metrics:
     build_time: str = ""
@@ -121,6 +216,11 @@ class Metrics:
     placeholder_details: List[OfferEntry] = field(default_factory=list)
     duplicate_offer_id_details: List[DuplicateGroup] = field(default_factory=list)
     duplicate_vendorcode_details: List[DuplicateGroup] = field(default_factory=list)
+    # Служебное про сам прогон checker (в baseline не пишется)
+    source: str = ""
+    seconds: float = 0.0
+    peak_rss_mb: float = 0.0
+    offer_diff: OfferDiff | None = None
 
     def to_json(self) -> dict:
         return {
@@ -208,10 +308,6 @@ def parse_build_time_from_feed_meta(text: str) -> str:
         return raw
 
 
-def load_xml_text(path: Path) -> str:
-    return path.read_text(encoding="utf-8")
-
-
 def normalize_spaces(value: str) -> str:
     return " ".join((value or "").split())
 
@@ -325,137 +421,453 @@ def format_duplicate_groups(groups: List[DuplicateGroup], kind: str) -> List[str
     return lines
 
 
-def collect_metrics(price_path: Path) -> Metrics:
-    if not price_path.exists():
-        raise FileNotFoundError("Файл Price.yml не найден.")
-    text = load_xml_text(price_path)
-    if not text.strip():
-        raise ValueError("Файл Price.yml пустой.")
+DuplicateRef = Tuple[str, str, str, str]
 
-    try:
-        root = ET.fromstring(text)
-    except Exception as exc:
-        raise ValueError(f"XML в Price повреждён: {exc}") from exc
 
-    shop = root.find("shop")
-    if shop is None:
-        raise ValueError("В Price отсутствует блок shop.")
-    categories = shop.find("categories")
-    offers = shop.find("offers")
-    if categories is None:
-        raise ValueError("В Price отсутствует блок categories.")
-    if offers is None:
-        raise ValueError("В Price отсутствует блок offers.")
+class DuplicateTracker:
+    """Дубли по ключу без хранения всех offers: ключ -> компактная ссылка на первый offer."""
 
-    category_portal_ids = {
-        str(cat.get("id", "")).strip(): str(cat.get("portal_id", "")).strip()
-        for cat in categories.findall("category")
-        if str(cat.get("id", "")).strip()
-    }
+    def __init__(self) -> None:
+        self.first: Dict[str, DuplicateRef] = {}
+        self.groups: Dict[str, DuplicateGroup] = {}
+
+    def add(self, key: str, entry: OfferEntry) -> None:
+        if not key:
+            return
+        group = self.groups.get(key)
+        if group is not None:
+            group.entries.append(entry)
+            return
+        first = self.first.get(key)
+        if first is None:
+            self.first[key] = (entry.supplier, entry.offer_id, entry.vendor_code, entry.name)
+            return
+        supplier, offer_id, vendor_code, name = first
+        self.groups[key] = DuplicateGroup(
+            key=key,
+            entries=[OfferEntry(supplier=supplier, offer_id=offer_id, vendor_code=vendor_code, name=name), entry],
+        )
 
-    supplier_summary = {name: SupplierSummary() for name in EXPECTED_SUPPLIERS}
-    excluded_by_supplier, excluded_details = parse_unresolved_blocks(UNRESOLVED_FILE)
-    for supplier, count in excluded_by_supplier.items():
-        supplier_summary.setdefault(supplier, SupplierSummary()).excluded_no_categoryid = count
-
-    offer_id_map: Dict[str, List[OfferEntry]] = {}
-    vendor_code_map: Dict[str, List[OfferEntry]] = {}
-    no_satu_category_details: List[OfferEntry] = []
-    ready_to_ship_no_price_details: List[OfferEntry] = []
-    placeholder_details: List[OfferEntry] = []
-
-    total = 0
-    available_true = 0
-    available_false = 0
-    ready_to_ship_no_price = 0
-    placeholder = 0
-    empty_category = 0
-    invalid_category = 0
-    unknown_satu = 0
-
-    for offer in offers.findall("offer"):
-        entry = make_offer_entry(offer)
-        supplier = entry.supplier if entry.supplier in supplier_summary else ""
+    def sorted_groups(self) -> List[DuplicateGroup]:
+        return sorted(self.groups.values(), key=lambda group: (group.key or ""))
+
+
+class MetricsAccumulator:
+    """Счётчики checker по одному offer за раз; до прихода categories проверки категорий откладываются."""
+
+    def __init__(self) -> None:
+        self.category_portal_ids: Dict[str, str] | None = None
+        self.supplier_summary = {name: SupplierSummary() for name in EXPECTED_SUPPLIERS}
+        self.offer_ids = DuplicateTracker()
+        self.vendor_codes = DuplicateTracker()
+        self.no_satu_category_details: List[OfferEntry] = []
+        self.ready_to_ship_no_price_details: List[OfferEntry] = []
+        self.placeholder_details: List[OfferEntry] = []
+        self.pending_category_checks: List[OfferEntry] = []
+        self.total = 0
+        self.available_true = 0
+        self.available_false = 0
+        self.ready_to_ship_no_price = 0
+        self.placeholder = 0
+        self.empty_category = 0
+        self.invalid_category = 0
+        self.unknown_satu = 0
+
+    def set_categories(self, category_portal_ids: Dict[str, str]) -> None:
+        self.category_portal_ids = category_portal_ids
+        pending, self.pending_category_checks = self.pending_category_checks, []
+        for entry in pending:
+            self._check_category(entry)
+
+    def add(self, entry: OfferEntry, avail: str, pictures: Iterable[str]) -> None:
+        supplier = entry.supplier if entry.supplier in self.supplier_summary else ""
         if supplier:
-            supplier_summary[supplier].total += 1
+            self.supplier_summary[supplier].total += 1
 
-        total += 1
-        avail = str(offer.get("available", "")).strip().lower()
+        self.total += 1
         if avail == "true":
-            available_true += 1
+            self.available_true += 1
             if supplier:
-                supplier_summary[supplier].available += 1
+                self.supplier_summary[supplier].available += 1
         elif avail == "false":
-            available_false += 1
+            self.available_false += 1
             if supplier:
-                supplier_summary[supplier].unavailable += 1
+                self.supplier_summary[supplier].unavailable += 1
 
-        if entry.offer_id:
-            offer_id_map.setdefault(entry.offer_id, []).append(entry)
-        if entry.vendor_code:
-            vendor_code_map.setdefault(entry.vendor_code, []).append(entry)
+        self.offer_ids.add(entry.offer_id, entry)
+        self.vendor_codes.add(entry.vendor_code, entry)
+
+        if self.category_portal_ids is None:
+            self.pending_category_checks.append(entry)
+        else:
+            self._check_category(entry)
+
+        if not entry.price and entry.in_stock:
+            self.ready_to_ship_no_price += 1
+            self.ready_to_ship_no_price_details.append(entry)
+            if supplier:
+                self.supplier_summary[supplier].ready_to_ship_no_price += 1
 
+        if any(pic == PLACEHOLDER_URL for pic in pictures):
+            self.placeholder += 1
+            self.placeholder_details.append(entry)
+            if supplier:
+                self.supplier_summary[supplier].placeholder += 1
+
+    def _check_category(self, entry: OfferEntry) -> None:
+        category_portal_ids = self.category_portal_ids or {}
         cid = entry.category_id
         if not cid:
-            empty_category += 1
+            self.empty_category += 1
         elif cid not in category_portal_ids:
-            invalid_category += 1
+            self.invalid_category += 1
 
         has_satu_category = bool(entry.portal_category_id)
         if cid and not has_satu_category:
             has_satu_category = bool(category_portal_ids.get(cid, ""))
         if not has_satu_category:
-            unknown_satu += 1
-            no_satu_category_details.append(entry)
+            self.unknown_satu += 1
+            self.no_satu_category_details.append(entry)
+            supplier = entry.supplier if entry.supplier in self.supplier_summary else ""
             if supplier:
-                supplier_summary[supplier].no_satu_category += 1
+                self.supplier_summary[supplier].no_satu_category += 1
+
+    def finish(self, *, build_time: str, source: str) -> Metrics:
+        excluded_by_supplier, excluded_details = parse_unresolved_blocks(UNRESOLVED_FILE)
+        for supplier, count in excluded_by_supplier.items():
+            self.supplier_summary.setdefault(supplier, SupplierSummary()).excluded_no_categoryid = count
+
+        duplicate_offer_groups = self.offer_ids.sorted_groups()
+        duplicate_vendorcode_groups = self.vendor_codes.sorted_groups()
+
+        missing_suppliers = [name for name, info in self.supplier_summary.items() if info.total <= 0]
+        if missing_suppliers:
+            raise ValueError(
+                "В Price отсутствует один или несколько поставщиков: " + ", ".join(missing_suppliers)
+            )
+
+        return Metrics(
+            build_time=build_time,
+            total=self.total,
+            available_true=self.available_true,
+            available_false=self.available_false,
+            ready_to_ship_no_price=self.ready_to_ship_no_price,
+            placeholder=self.placeholder,
+            empty_category=self.empty_category,
+            invalid_category=self.invalid_category,
+            unknown_satu=self.unknown_satu,
+            excluded_unmapped_total=sum(excluded_by_supplier.values()),
+            duplicate_offer_id_groups=len(duplicate_offer_groups),
+            duplicate_vendorcode_groups=len(duplicate_vendorcode_groups),
+            supplier_summary=self.supplier_summary,
+            excluded_unmapped_by_supplier=excluded_by_supplier,
+            excluded_details=excluded_details,
+            no_satu_category_details=self.no_satu_category_details,
+            ready_to_ship_no_price_details=self.ready_to_ship_no_price_details,
+            placeholder_details=self.placeholder_details,
+            duplicate_offer_id_details=duplicate_offer_groups,
+            duplicate_vendorcode_details=duplicate_vendorcode_groups,
+            source=source,
+        )
 
-        if not entry.price and entry.in_stock:
-            ready_to_ship_no_price += 1
-            ready_to_ship_no_price_details.append(entry)
-            if supplier:
-                supplier_summary[supplier].ready_to_ship_no_price += 1
 
-        pictures = [(pic.text or "").strip() for pic in offer.findall("picture") if (pic.text or "").strip()]
-        if any(pic == PLACEHOLDER_URL for pic in pictures):
-            placeholder += 1
-            placeholder_details.append(entry)
-            if supplier:
-                supplier_summary[supplier].placeholder += 1
+def read_price_head(price_path: Path) -> str:
+    # FEED_META и categories стоят в начале Price; дальше для build_time читать не нужно
+    with price_path.open("rb") as fh:
+        return fh.read(HEAD_READ_LIMIT).decode("utf-8", errors="ignore")
+
+
+def read_category_portal_ids(categories: ET.Element) -> Dict[str, str]:
+    return {
+        str(cat.get("id", "")).strip(): str(cat.get("portal_id", "")).strip()
+        for cat in categories.findall("category")
+        if str(cat.get("id", "")).strip()
+    }
+
+
+def stream_price_offers(price_path: Path, acc: MetricsAccumulator) -> None:
+    """Один проход iterparse: каждый offer обрабатывается и сразу выбрасывается из дерева."""
+    path: List[str] = []
+    seen_shop = seen_categories = seen_offers = False
+    offers_node: ET.Element | None = None
+    try:
+        for event, elem in ET.iterparse(str(price_path), events=("start", "end")):
+            if event == "start":
+                path.append(elem.tag)
+                depth = len(path)
+                if depth == 2 and elem.tag == "shop":
+                    seen_shop = True
+                elif depth == 3 and path[1] == "shop" and elem.tag == "categories":
+                    seen_categories = True
+                elif depth == 3 and path[1] == "shop" and elem.tag == "offers":
+                    seen_offers = True
+                    offers_node = elem
+                continue
+
+            depth = len(path)
+            path.pop()
+            if depth == 3 and path[1] == "shop" and elem.tag == "categories" and acc.category_portal_ids is None:
+                acc.set_categories(read_category_portal_ids(elem))
+                elem.clear()
+            elif depth == 4 and path[1] == "shop" and path[2] == "offers" and elem.tag == "offer":
+                pictures = [(pic.text or "").strip() for pic in elem.findall("picture") if (pic.text or "").strip()]
+                acc.add(make_offer_entry(elem), str(elem.get("available", "")).strip().lower(), pictures)
+                elem.clear()
+                if offers_node is not None:
+                    offers_node.remove(elem)
+    except ET.ParseError as exc:
+        raise ValueError(f"XML в Price повреждён: {exc}") from exc
+
+    if not seen_shop:
+        raise ValueError("В Price отсутствует блок shop.")
+    if not seen_categories:
+        raise ValueError("В Price отсутствует блок categories.")
+    if not seen_offers:
+        raise ValueError("В Price отсутствует блок offers.")
+
+
+def load_price_offer_index(price_path: Path) -> OfferIndex | None:
+    """Sidecar docs/.offers/Price.yml.jsonl от build_price, если он описывает именно этот Price."""
+    if read_offer_index is None or not offer_index_enabled():
+        return None
+    return read_offer_index(price_path)
+
+
+def index_price_offers(price_path: Path, index: OfferIndex, acc: MetricsAccumulator) -> None:
+    """Offers из offer index: значения там XML-escaped, как в самом Price."""
+    with price_path.open("rb") as fh:
+        head = fh.read(index.base)
+    try:
+        # шапка до <offers> + закрывающие теги — маленький валидный XML с shop/categories
+        root = ET.fromstring(head + b"</offers></shop></yml_catalog>")
+    except ET.ParseError as exc:
+        raise ValueError(f"XML в Price повреждён: {exc}") from exc
+    categories = root.find("shop/categories")
+    if categories is None:
+        raise ValueError("В Price отсутствует блок categories.")
+    acc.set_categories(read_category_portal_ids(categories))
+
+    for rec in index.records:
+        offer_id = html.unescape(str(rec["id"])).strip()
+        pictures = [html.unescape(pic).strip() for pic in rec["pictures"]]
+        pictures = [pic for pic in pictures if pic]
+        entry = OfferEntry(
+            supplier=extract_offer_supplier(offer_id) or "Неизвестно",
+            offer_id=offer_id,
+            vendor_code=html.unescape(str(rec["vendor_code"])).strip(),
+            name=normalize_spaces(html.unescape(str(rec["name"]))),
+            category_id=html.unescape(str(rec["category_id"])).strip(),
+            portal_category_id=html.unescape(str(rec.get("portal_category_id") or "")).strip(),
+            price=html.unescape(str(rec.get("price") or "")).strip(),
+            in_stock=bool(rec["in_stock"]),
+            picture=pictures[0] if pictures else "",
+        )
+        acc.add(entry, "true" if rec["available"] else "false", pictures)
+
+
+def collect_metrics(price_path: Path) -> Metrics:
+    if not price_path.exists():
+        raise FileNotFoundError("Файл Price.yml не найден.")
+    head = read_price_head(price_path)
+    if not head.strip() and not price_path.read_text(encoding="utf-8").strip():
+        raise ValueError("Файл Price.yml пустой.")
+
+    acc = MetricsAccumulator()
+    index = load_price_offer_index(price_path)
+    if index is not None:
+        index_price_offers(price_path, index, acc)
+        source = "offer index"
+    else:
+        stream_price_offers(price_path, acc)
+        source = "iterparse"
+    return acc.finish(build_time=parse_build_time_from_feed_meta(head), source=source)
+
+
+# Отпечаток offer для diff: (поставщик, hash блока, price, available, categoryId)
+OfferFingerprint = Tuple[str, str, str, bool, str]
+
+OFFER_CLOSE_TAG = b"</offer>"
+_OFFER_ID_ATTR_RE = re.compile(rb'\sid="([^"]*)"')
+_OFFER_AVAILABLE_ATTR_RE = re.compile(rb'\savailable="([^"]*)"')
+_OFFER_PRICE_RE = re.compile(rb"<price>(.*?)</price>", re.S)
+_OFFER_CATEGORY_RE = re.compile(rb"<categoryId>(.*?)</categoryId>", re.S)
+DIFF_COUNTERS = ("added", "removed", "price_up", "price_down", "available_on", "available_off", "category_moved", "content_changed")
+
+
+def _xml_value(raw: bytes) -> str:
+    return html.unescape(raw.decode("utf-8", errors="replace")).strip()
+
+
+def scan_offer_fingerprints(price_path: Path) -> Dict[str, OfferFingerprint]:
+    """Один проход regex по байтам файла блоками: id -> отпечаток, без дерева и без текста offers в памяти."""
+    out: Dict[str, OfferFingerprint] = {}
+    buf = b""
+    with price_path.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(SCAN_CHUNK_SIZE), b""):
+            buf += chunk
+            pos = 0
+            while True:
+                start = buf.find(b"<offer ", pos)
+                if start == -1:
+                    break
+                end = buf.find(OFFER_CLOSE_TAG, start)
+                if end == -1:
+                    break
+                end += len(OFFER_CLOSE_TAG)
+                add_offer_fingerprint(out, buf[start:end])
+                pos = end
+            # хвост: начатый, но ещё не дочитанный offer (или кусок тега на границе блока)
+            start = buf.find(b"<offer ", pos)
+            buf = buf[start:] if start != -1 else buf[-16:]
+    return out
+
+
+def add_offer_fingerprint(out: Dict[str, OfferFingerprint], block: bytes) -> None:
+    head = block[: block.find(b">") + 1]
+    id_match = _OFFER_ID_ATTR_RE.search(head)
+    offer_id = _xml_value(id_match.group(1)) if id_match else ""
+    if not offer_id or offer_id in out:
+        return
+    avail = _OFFER_AVAILABLE_ATTR_RE.search(head)
+    price = _OFFER_PRICE_RE.search(block)
+    category = _OFFER_CATEGORY_RE.search(block)
+    out[offer_id] = (
+        extract_offer_supplier(offer_id) or "Неизвестно",
+        hashlib.blake2b(block, digest_size=8).hexdigest(),
+        _xml_value(price.group(1)) if price else "",
+        bool(avail) and avail.group(1).strip().lower() == b"true",
+        _xml_value(category.group(1)) if category else "",
+    )
+
+
+def price_as_int(value: str) -> int | None:
+    return int(value) if value.isdigit() else None
+
+
+def diff_offer_fingerprints(old: Dict[str, OfferFingerprint], new: Dict[str, OfferFingerprint]) -> OfferDiff:
+    """O(old + new): сравнение по id; поля смотрим только у offers с изменившимся hash."""
+    diff = OfferDiff()
+
+    def bump(supplier: str, counter: str) -> None:
+        bucket = diff.per_supplier.setdefault(supplier, {name: 0 for name in DIFF_COUNTERS})
+        bucket[counter] += 1
+
+    for offer_id, (supplier, digest, price, available, category_id) in new.items():
+        prev = old.get(offer_id)
+        if prev is None:
+            diff.added.append((supplier, offer_id))
+            bump(supplier, "added")
+            continue
+        if prev[1] == digest:
+            continue
+        _, _, old_price, old_available, old_category_id = prev
+        changed_field = False
+        if old_price != price:
+            diff.price_changes.append((supplier, offer_id, old_price, price))
+            old_num, new_num = price_as_int(old_price), price_as_int(price)
+            bump(supplier, "price_up" if old_num is None or (new_num is not None and new_num > old_num) else "price_down")
+            changed_field = True
+        if old_available != available:
+            diff.availability_changes.append((supplier, offer_id, old_available, available))
+            bump(supplier, "available_on" if available else "available_off")
+            changed_field = True
+        if old_category_id != category_id:
+            diff.category_moves.append((supplier, offer_id, old_category_id, category_id))
+            bump(supplier, "category_moved")
+            changed_field = True
+        if not changed_field:
+            diff.content_changed.append((supplier, offer_id))
+            bump(supplier, "content_changed")
+
+    for offer_id, prev in old.items():
+        if offer_id not in new:
+            diff.removed.append((prev[0], offer_id))
+            bump(prev[0], "removed")
+    return diff
+
+
+def load_offer_snapshot() -> Tuple[str, Dict[str, OfferFingerprint]] | None:
+    if not OFFER_SNAPSHOT_FILE.exists():
+        return None
+    try:
+        with gzip.open(OFFER_SNAPSHOT_FILE, "rt", encoding="utf-8") as fh:
+            data = json.load(fh)
+        offers = {k: (v[0], v[1], v[2], bool(v[3]), v[4]) for k, v in data["offers"].items()}
+        return str(data.get("build_time", "")), offers
+    except (OSError, ValueError, KeyError, IndexError, TypeError):
+        return None
 
-    duplicate_offer_groups = [DuplicateGroup(key=k, entries=v) for k, v in offer_id_map.items() if len(v) > 1]
-    duplicate_vendorcode_groups = [DuplicateGroup(key=k, entries=v) for k, v in vendor_code_map.items() if len(v) > 1]
-    duplicate_offer_groups.sort(key=lambda group: (group.key or ""))
-    duplicate_vendorcode_groups.sort(key=lambda group: (group.key or ""))
 
-    missing_suppliers = [name for name, info in supplier_summary.items() if info.total <= 0]
-    if missing_suppliers:
-        raise ValueError(
-            "В Price отсутствует один или несколько поставщиков: " + ", ".join(missing_suppliers)
+def save_offer_snapshot(build_time: str, offers: Dict[str, OfferFingerprint]) -> None:
+    RAW_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = OFFER_SNAPSHOT_FILE.with_name(OFFER_SNAPSHOT_FILE.name + ".tmp")
+    # mtime=0: одинаковый snapshot даёт одинаковые байты
+    with tmp.open("wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as gz:
+        gz.write(json.dumps({"build_time": build_time, "offers": offers}, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+    tmp.replace(OFFER_SNAPSHOT_FILE)
+
+
+def build_offer_diff(price_path: Path, build_time: str) -> OfferDiff | None:
+    """Diff текущего Price против snapshot предыдущей сборки; повторная проверка той же сборки берёт готовый diff."""
+    snapshot = load_offer_snapshot()
+    if snapshot is not None and build_time and snapshot[0] == build_time:
+        try:
+            diff = OfferDiff.from_json(json.loads(OFFER_DIFF_FILE.read_text(encoding="utf-8")))
+        except (OSError, ValueError, TypeError, AttributeError):
+            return None
+        return diff if diff.to_build_time == build_time else None
+
+    current = scan_offer_fingerprints(price_path)
+    diff = None
+    if snapshot is not None:
+        diff = diff_offer_fingerprints(snapshot[1], current)
+        diff.from_build_time = snapshot[0]
+        diff.to_build_time = build_time
+        RAW_DIR.mkdir(parents=True, exist_ok=True)
+        OFFER_DIFF_FILE.write_text(json.dumps(diff.to_json(), ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+    save_offer_snapshot(build_time, current)
+    return diff
+
+
+def build_offer_diff_lines(diff: OfferDiff | None) -> List[str]:
+    if diff is None:
+        return ["нет базы: snapshot предыдущей сборки ещё не сохранён"]
+    lines = [
+        f"Предыдущая сборка: {diff.from_build_time or '-'}",
+        f"Текущая сборка: {diff.to_build_time or '-'}",
+        "",
+    ]
+    for supplier in sorted(diff.per_supplier, key=lambda name: (name not in EXPECTED_SUPPLIERS, name)):
+        c = diff.per_supplier[supplier]
+        lines.append(
+            f"{supplier} | добавлено={c['added']} | удалено={c['removed']} | цена выросла={c['price_up']} "
+            f"| цена снизилась={c['price_down']} | стало в наличии={c['available_on']} | нет в наличии={c['available_off']} "
+            f"| смена categoryId={c['category_moved']} | прочие изменения={c['content_changed']}"
         )
+    if not diff.per_supplier:
+        lines.append("изменений нет")
+        return lines
 
-    return Metrics(
-        build_time=parse_build_time_from_feed_meta(text),
-        total=total,
-        available_true=available_true,
-        available_false=available_false,
-        ready_to_ship_no_price=ready_to_ship_no_price,
-        placeholder=placeholder,
-        empty_category=empty_category,
-        invalid_category=invalid_category,
-        unknown_satu=unknown_satu,
-        excluded_unmapped_total=sum(excluded_by_supplier.values()),
-        duplicate_offer_id_groups=len(duplicate_offer_groups),
-        duplicate_vendorcode_groups=len(duplicate_vendorcode_groups),
-        supplier_summary=supplier_summary,
-        excluded_unmapped_by_supplier=excluded_by_supplier,
-        excluded_details=excluded_details,
-        no_satu_category_details=no_satu_category_details,
-        ready_to_ship_no_price_details=ready_to_ship_no_price_details,
-        placeholder_details=placeholder_details,
-        duplicate_offer_id_details=duplicate_offer_groups,
-        duplicate_vendorcode_details=duplicate_vendorcode_groups,
+    changes: List[str] = []
+    changes.extend(f"{supplier} | added | id={offer_id}" for supplier, offer_id in diff.added)
+    changes.extend(f"{supplier} | removed | id={offer_id}" for supplier, offer_id in diff.removed)
+    changes.extend(f"{supplier} | price | id={offer_id} | {old or '-'} -> {new or '-'}" for supplier, offer_id, old, new in diff.price_changes)
+    changes.extend(
+        f"{supplier} | available | id={offer_id} | {str(old).lower()} -> {str(new).lower()}"
+        for supplier, offer_id, old, new in diff.availability_changes
     )
+    changes.extend(f"{supplier} | categoryId | id={offer_id} | {old or '-'} -> {new or '-'}" for supplier, offer_id, old, new in diff.category_moves)
+    lines.append("")
+    lines.extend(limit_lines(changes, DETAIL_LIMIT_DEFAULT))
+    return lines
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    # ru_maxrss: КБ на Linux, байты на macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
 
 
 def load_baseline() -> Metrics | None:
@@ -476,6 +888,260 @@ def save_baseline(metrics: Metrics) -> None:
     )
 
 
+def env_int(name: str, default: int) -> int:
+    try:
+        return int((os.getenv(name) or "").strip() or default)
+    except ValueError:
+        return default
+
+
+class MetricsHistory:
+    """История прогонов checker в SQLite (docs/raw/price_checker_history.sqlite).
+
+    runs — по строке на прогон, supplier_runs — SupplierSummary поставщиков этого прогона.
+    Запросы «последние N» идут по индексам (checked_at / supplier+checked_at), без сканов.
+    База — производная: источник истины append-only docs/raw/price_checker_history.jsonl.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.row_factory = sqlite3.Row
+        run_cols = ", ".join(f"{name} INTEGER NOT NULL DEFAULT 0" for name in RUN_FIELDS)
+        supplier_cols = ", ".join(f"{name} INTEGER NOT NULL DEFAULT 0" for name in SUPPLIER_FIELDS)
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "id INTEGER PRIMARY KEY, checked_at INTEGER NOT NULL, build_time TEXT NOT NULL DEFAULT '', "
+            f"status TEXT NOT NULL, {run_cols}, seconds REAL NOT NULL DEFAULT 0, peak_rss_mb REAL NOT NULL DEFAULT 0);"
+            "CREATE INDEX IF NOT EXISTS runs_checked_at ON runs (checked_at);"
+            "CREATE INDEX IF NOT EXISTS runs_status_checked_at ON runs (status, checked_at);"
+            "CREATE TABLE IF NOT EXISTS supplier_runs ("
+            f"supplier TEXT NOT NULL, checked_at INTEGER NOT NULL, run_id INTEGER NOT NULL, {supplier_cols}, "
+            "PRIMARY KEY (supplier, checked_at, run_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS supplier_runs_run_id ON supplier_runs (run_id);"
+        )
+
+    def record_rows(self, rows: Iterable[dict]) -> int:
+        """Вставляет строки формата history_row (новый прогон или replay JSONL); возвращает число вставленных."""
+        count = 0
+        for row in rows:
+            ts = int(row["checked_at"])
+            cur = self._conn.execute(
+                f"INSERT INTO runs (checked_at, build_time, status, {', '.join(RUN_FIELDS)}, seconds, peak_rss_mb) "
+                f"VALUES (?, ?, ?, {', '.join('?' for _ in RUN_FIELDS)}, ?, ?)",
+                (
+                    ts,
+                    str(row.get("build_time", "")),
+                    str(row["status"]),
+                    *(int(row.get(name, 0)) for name in RUN_FIELDS),
+                    float(row.get("seconds", 0.0)),
+                    float(row.get("peak_rss_mb", 0.0)),
+                ),
+            )
+            run_id = int(cur.lastrowid)
+            self._conn.executemany(
+                f"INSERT INTO supplier_runs (supplier, checked_at, run_id, {', '.join(SUPPLIER_FIELDS)}) "
+                f"VALUES (?, ?, ?, {', '.join('?' for _ in SUPPLIER_FIELDS)})",
+                [
+                    (supplier, ts, run_id, *(int(info.get(name, 0)) for name in SUPPLIER_FIELDS))
+                    for supplier, info in (row.get("suppliers") or {}).items()
+                ],
+            )
+            count += 1
+        self._conn.commit()
+        return count
+
+    def last_checked_at(self) -> int:
+        return int(self._conn.execute("SELECT COALESCE(MAX(checked_at), 0) FROM runs").fetchone()[0])
+
+    def recent_runs(self, limit: int, *, status: str = "") -> List[sqlite3.Row]:
+        where = "WHERE status = ? " if status else ""
+        args: Tuple = (status, limit) if status else (limit,)
+        rows = self._conn.execute(
+            f"SELECT * FROM runs {where}ORDER BY checked_at DESC, id DESC LIMIT ?", args
+        ).fetchall()
+        return list(reversed(rows))
+
+    def supplier_trend(self, supplier: str, limit: int) -> List[sqlite3.Row]:
+        rows = self._conn.execute(
+            "SELECT s.*, r.status FROM supplier_runs s JOIN runs r ON r.id = s.run_id "
+            "WHERE s.supplier = ? ORDER BY s.checked_at DESC, s.run_id DESC LIMIT ?",
+            (supplier, limit),
+        ).fetchall()
+        return list(reversed(rows))
+
+    def rolling_baseline(self, runs: int) -> Metrics | None:
+        """Медиана последних N успешных прогонов — поле за полем, отдельно по каждому поставщику."""
+        rows = self.recent_runs(runs, status="УСПЕШНО")
+        if not rows:
+            return None
+        run_ids = [row["id"] for row in rows]
+        by_supplier: Dict[str, List[sqlite3.Row]] = {}
+        placeholders = ", ".join("?" for _ in run_ids)
+        for row in self._conn.execute(f"SELECT * FROM supplier_runs WHERE run_id IN ({placeholders})", run_ids):
+            by_supplier.setdefault(row["supplier"], []).append(row)
+        supplier_summary = {
+            supplier: SupplierSummary(**{name: statistics.median_low(r[name] for r in items) for name in SUPPLIER_FIELDS})
+            for supplier, items in by_supplier.items()
+        }
+        return Metrics(
+            build_time=rows[-1]["build_time"],
+            supplier_summary=supplier_summary,
+            excluded_unmapped_by_supplier={k: v.excluded_no_categoryid for k, v in supplier_summary.items()},
+            **{name: statistics.median_low(r[name] for r in rows) for name in RUN_FIELDS},
+        )
+
+    def compact(self, *, daily_days: int, now: datetime) -> int:
+        """Старше daily_days оставляет последний прогон каждой недели; VACUUM, когда свободных страниц много."""
+        cutoff = int(now.timestamp()) - max(1, daily_days) * 86400
+        cur = self._conn.execute(
+            "DELETE FROM runs WHERE checked_at < ? AND id NOT IN ("
+            "SELECT MAX(id) FROM runs WHERE checked_at < ? "
+            "GROUP BY strftime('%Y-%W', checked_at, 'unixepoch'))",
+            (cutoff, cutoff),
+        )
+        removed = cur.rowcount
+        if removed:
+            self._conn.execute("DELETE FROM supplier_runs WHERE run_id NOT IN (SELECT id FROM runs)")
+        self._conn.commit()
+        page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if page_count and free_pages / page_count >= HISTORY_VACUUM_FREE_RATIO:
+            self._conn.execute("VACUUM")
+        return max(0, removed)
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def history_row(metrics: Metrics, status: str, checked_at: datetime) -> dict:
+    """Строка прогона для JSONL-журнала истории (и для вставки в SQLite)."""
+    return {
+        "checked_at": int(checked_at.timestamp()),
+        "build_time": metrics.build_time,
+        "status": status,
+        **{name: getattr(metrics, name) for name in RUN_FIELDS},
+        "seconds": round(metrics.seconds, 3),
+        "peak_rss_mb": round(metrics.peak_rss_mb, 1),
+        "suppliers": {
+            supplier: {name: getattr(info, name) for name in SUPPLIER_FIELDS}
+            for supplier, info in metrics.supplier_summary.items()
+        },
+    }
+
+
+def history_log_path() -> Path:
+    return Path(os.getenv("PRICE_CHECKER_HISTORY_LOG", "") or HISTORY_LOG_FILE)
+
+
+def append_history_log(row: dict) -> None:
+    """JSONL в git — источник истины: SQLite живёт в actions/cache и может пропасть (7 дней / LRU)."""
+    path = history_log_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a", encoding="utf-8") as fh:
+        fh.write(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n")
+
+
+def read_history_log(after: int) -> List[dict]:
+    path = history_log_path()
+    if not path.exists():
+        return []
+    rows: List[dict] = []
+    with path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                row = json.loads(line)
+                if int(row["checked_at"]) > after and row.get("status"):
+                    rows.append(row)
+            except (ValueError, KeyError, TypeError):
+                continue
+    return rows
+
+
+def open_history() -> MetricsHistory | None:
+    """SQLite из cache, догнанный по JSONL: при промахе cache база пересобирается из журнала."""
+    path = Path(os.getenv("PRICE_CHECKER_HISTORY_FILE", "") or HISTORY_FILE)
+    created = not path.exists()
+    try:
+        history = MetricsHistory(path)
+        replayed = history.record_rows(read_history_log(history.last_checked_at()))
+        if replayed:
+            history.compact(
+                daily_days=env_int("PRICE_CHECKER_HISTORY_DAILY_DAYS", HISTORY_DAILY_DAYS_DEFAULT),
+                now=now_almaty(),
+            )
+    except sqlite3.Error as exc:
+        # История — вспомогательная: без неё checker работает по last_success
+        print(f"[price_checker] history недоступна: {exc}")
+        return None
+    if replayed:
+        print(f"[price_checker] history: из {history_log_path().as_posix()} восстановлено прогонов {replayed}")
+    elif created:
+        print(f"[price_checker] history: новая пустая база {path.as_posix()} (нет ни cache, ни JSONL)")
+    return history
+
+
+def select_baseline(history: MetricsHistory | None) -> Tuple[Metrics | None, str]:
+    mode = (os.getenv("PRICE_CHECKER_BASELINE") or BASELINE_MODE_DEFAULT).strip().lower()
+    if mode == "median" and history is not None:
+        runs = max(1, env_int("PRICE_CHECKER_MEDIAN_RUNS", BASELINE_MEDIAN_RUNS_DEFAULT))
+        try:
+            baseline = history.rolling_baseline(runs)
+        except sqlite3.Error as exc:
+            print(f"[price_checker] history: нет медианы ({exc})")
+            baseline = None
+        if baseline is not None:
+            return baseline, f"медиана последних {runs} успешных прогонов"
+    return load_baseline(), "последний успешный прогон"
+
+
+def trend_main(argv: List[str]) -> int:
+    parser = argparse.ArgumentParser(
+        prog="build_price_checker.py trend",
+        description="Тренд метрик Price checker по истории прогонов.",
+    )
+    parser.add_argument("suppliers", nargs="*", help="поставщики (по умолчанию — итог Price и все поставщики)")
+    parser.add_argument("--runs", type=int, default=14, help="сколько последних прогонов показать")
+    parser.add_argument("--median", type=int, default=BASELINE_MEDIAN_RUNS_DEFAULT, help="окно медианы")
+    args = parser.parse_args(argv)
+
+    path = Path(os.getenv("PRICE_CHECKER_HISTORY_FILE", "") or HISTORY_FILE)
+    if not path.exists() and not history_log_path().exists():
+        print(f"Нет истории: {path.as_posix()}")
+        return 1
+    history = open_history()
+    if history is None:
+        return 1
+    try:
+        runs = max(1, args.runs)
+        window = max(1, args.median)
+
+        def print_table(title: str, rows: List[sqlite3.Row], fields: Tuple[str, ...]) -> None:
+            print(title)
+            if not rows:
+                print("нет данных")
+                return
+            print(" | ".join(["checked_at      ", "status          ", *fields]))
+            for row in rows:
+                when = datetime.fromtimestamp(row["checked_at"], ALMATY_TZ).strftime("%Y-%m-%d %H:%M")
+                print(" | ".join([when, f"{row['status']:<16}", *(f"{row[name]:>{len(name)}}" for name in fields)]))
+            tail = rows[-window:]
+            print(" | ".join([f"медиана {len(tail):<8}", " " * 16, *(f"{statistics.median_low(r[name] for r in tail):>{len(name)}}" for name in fields)]))
+
+        names = args.suppliers or ["Price", *EXPECTED_SUPPLIERS]
+        for i, name in enumerate(names):
+            if i:
+                print("")
+            if name == "Price":
+                print_table("Price", history.recent_runs(runs), RUN_FIELDS[:5] + ("unknown_satu", "excluded_unmapped_total"))
+            else:
+                print_table(name, history.supplier_trend(name, runs), SUPPLIER_FIELDS)
+    finally:
+        history.close()
+    return 0
+
+
 def evaluate(metrics: Metrics, baseline: Metrics | None) -> Tuple[str, str]:
     if metrics.empty_category > 0:
         return "НЕУСПЕШНО", "В итоговом Price есть товары без categoryId."
@@ -526,7 +1192,7 @@ def evaluate(metrics: Metrics, baseline: Metrics | None) -> Tuple[str, str]:
     return "УСПЕШНО", "Критичных проблем не обнаружено."
 
 
-def build_summary_report(status: str, reason: str, metrics: Metrics, baseline: Metrics | None, checked_at: datetime) -> str:
+def build_summary_report(status: str, reason: str, metrics: Metrics, baseline: Metrics | None, checked_at: datetime, baseline_label: str = "") -> str:
     icon = {"УСПЕШНО": "✅", "ТРЕБУЕТ ВНИМАНИЯ": "⚠️", "НЕУСПЕШНО": "❌"}.get(status, "ℹ️")
     top_ready_to_ship_no_price = build_top_suppliers({supplier: info.ready_to_ship_no_price for supplier, info in metrics.supplier_summary.items()})
     top_placeholder = build_top_suppliers({supplier: info.placeholder for supplier, info in metrics.supplier_summary.items()})
@@ -573,6 +1239,11 @@ def build_summary_report(status: str, reason: str, metrics: Metrics, baseline: M
         f"Статус проверки Price: {status}",
         "",
         f"Причина: {reason}",
+        "",
+        f"База сравнения: {baseline_label or '-'}",
+        f"Источник данных checker: {metrics.source or '-'}",
+        f"Время работы checker: {metrics.seconds:.2f} сек",
+        f"Пиковая память checker: {metrics.peak_rss_mb:.1f} МБ",
     ])
     return "\n".join(lines).strip() + "\n"
 
@@ -733,6 +1404,10 @@ def build_details_report(status: str, reason: str, metrics: Metrics, checked_at:
             "ДУБЛИ VENDORCODE",
             format_duplicate_groups(metrics.duplicate_vendorcode_details, "vendorCode"),
         ),
+        (
+            "ИЗМЕНЕНИЯ OFFERS ОТНОСИТЕЛЬНО ПРЕДЫДУЩЕЙ СБОРКИ",
+            build_offer_diff_lines(metrics.offer_diff),
+        ),
         (
             "ПОСТАВЩИКИ С НАИБОЛЬШИМ КОЛИЧЕСТВОМ ПРОБЛЕМ",
             build_top_problem_lines(metrics),
@@ -800,16 +1475,53 @@ def build_failure_details(reason: str, checked_at: datetime) -> str:
     ]).strip() + "\n"
 
 
-def main() -> int:
+def record_history(history: MetricsHistory | None, metrics: Metrics, status: str, checked_at: datetime) -> None:
+    row = history_row(metrics, status, checked_at)
+    try:
+        append_history_log(row)
+    except OSError as exc:
+        print(f"[price_checker] history log: не записан ({exc})")
+    if history is None:
+        return
+    try:
+        history.record_rows([row])
+        removed = history.compact(
+            daily_days=env_int("PRICE_CHECKER_HISTORY_DAILY_DAYS", HISTORY_DAILY_DAYS_DEFAULT),
+            now=checked_at,
+        )
+        if removed:
+            print(f"[price_checker] history: сжато прогонов {removed}")
+    except sqlite3.Error as exc:
+        print(f"[price_checker] history: не записано ({exc})")
+    finally:
+        history.close()
+
+
+def main(argv: List[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "trend":
+        return trend_main(argv[1:])
+
     checked_at = now_almaty()
-    baseline = load_baseline()
+    history = open_history()
+    baseline, baseline_label = select_baseline(history)
     try:
+        started = time.perf_counter()
         metrics = collect_metrics(PRICE_FILE)
+        try:
+            metrics.offer_diff = build_offer_diff(PRICE_FILE, metrics.build_time)
+        except (OSError, ValueError) as exc:
+            # diff — справочный: без него статус и отчёты считаются как раньше
+            print(f"[price_checker] offer diff не построен: {exc}")
+        metrics.seconds = time.perf_counter() - started
+        metrics.peak_rss_mb = peak_rss_mb()
+        print(f"[price_checker] {metrics.source} | {metrics.seconds:.2f}s | peak RSS {metrics.peak_rss_mb:.1f} MB")
         status, reason = evaluate(metrics, baseline)
-        summary_text = build_summary_report(status, reason, metrics, baseline, checked_at)
+        summary_text = build_summary_report(status, reason, metrics, baseline, checked_at, baseline_label)
         details_text = build_details_report(status, reason, metrics, checked_at)
         telegram_text = build_telegram_summary_html(status, reason, metrics, baseline, checked_at)
         write_reports(summary_text, details_text)
+        record_history(history, metrics, status, checked_at)
         try:
             send_telegram(telegram_text)
         except Exception:
@@ -827,6 +1539,8 @@ def main() -> int:
     except Exception as exc:
         reason = f"Неожиданная ошибка checker: {exc}"
 
+    if history is not None:
+        history.close()
     summary_text = build_failure_summary(reason, checked_at)
     details_text = build_failure_details(reason, checked_at)
     telegram_text = (
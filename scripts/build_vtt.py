@@ -35,18 +35,28 @@ from cs.meta import next_run_dom_at_time, now_almaty
 from suppliers.vtt.builder import build_offer_from_raw
 from suppliers.vtt.diagnostics import print_build_summary
 from suppliers.vtt.filtering import categories_from_cfg, prefixes_from_cfg
+from suppliers.vtt.crawler import AimdCrawler, AimdSettings
+from suppliers.vtt.journal import CrawlJournal, open_crawl_journal
+from suppliers.vtt.normalize import norm_ws
+from suppliers.vtt.page_cache import PageCache, open_page_cache
 from suppliers.vtt.quality_gate import run_quality_gate
+from suppliers.vtt.rate_limit import SharedRateLimiter, open_shared_rate_limiter
 from suppliers.vtt.source import (
     cfg_from_env,
     clone_session_with_cookies,
     collect_product_index,
     log,
     login,
+    make_page_fetcher,
     make_session,
-    parse_product_page_from_index,
+    parse_product_page,
+    attach_index_item,
+    fetch_product_page,
+    rate_limit_cooldown_s,
+    use_shared_rate_limiter,
 )
 
-BUILD_VTT_VERSION = "build_vtt_v16_runtime_cleanup"
+BUILD_VTT_VERSION = "build_vtt_v21_listing_scan"
 SUPPLIER_NAME_DEFAULT = "VTT"
 OUT_FILE_DEFAULT = "docs/vtt.yml"
 RAW_OUT_FILE_DEFAULT = "docs/raw/vtt.yml"
@@ -241,6 +251,7 @@ def _prepare_source_env(cfg_dir: Path, filter_cfg: dict[str, Any]) -> None:
 
     safe_defaults = {
         "VTT_LISTING_REQUEST_DELAY_MS": "150",
+        "VTT_LISTING_WORKERS": "4",
         "VTT_PRODUCT_REQUEST_DELAY_MS": "700",
         "VTT_MAX_WORKERS": "2",
         "VTT_MAX_WORKERS_HARD_CAP": "4",
@@ -252,6 +263,8 @@ def _prepare_source_env(cfg_dir: Path, filter_cfg: dict[str, Any]) -> None:
         "VTT_429_BACKOFF_STEP_S": "15",
         "VTT_REQUEST_JITTER_MS": "180",
         "VTT_SHARD_START_DELAY_S": "45",
+        "VTT_FETCH_ENGINE": "aimd",
+        "VTT_AIMD_MAX": "8",
     }
     for key, value in safe_defaults.items():
         os.environ.setdefault(key, value)
@@ -276,6 +289,22 @@ def _maybe_stagger_shard_start() -> None:
     time.sleep(total_delay_s)
 
 
+def _install_rate_limiter() -> SharedRateLimiter | None:
+    limiter = open_shared_rate_limiter(SHARDS_DIR)
+    use_shared_rate_limiter(limiter)
+    if limiter is not None:
+        log(
+            f"[VTT] shared rate limit: budget={limiter.rate_per_s:g}req/s burst={limiter.burst} "
+            f"file={limiter.path.as_posix()}"
+        )
+    return limiter
+
+
+def _log_request_rate(limiter: SharedRateLimiter | None) -> None:
+    if limiter is not None:
+        log(f"[VTT] request rate: {limiter.stats.describe()}")
+
+
 def _print_summary(
     *,
     version: str,
@@ -356,67 +385,186 @@ def _collect_index(cfg) -> list[dict[str, Any]]:
     return [] if sess is None else collect_product_index(sess, cfg, list(cfg.categories), deadline)
 
 
-def _build_offers_for_index(cfg, index: list[dict[str, Any]], *, id_prefix: str) -> list[OfferOut]:
-    deadline = datetime.utcnow() + timedelta(minutes=max(1.0, float(cfg.max_crawl_minutes)))
-    sess = _login_or_raise(cfg)
-    if sess is None:
-        return []
+def _resolve_fetch_engine() -> str:
+    engine = (os.getenv("VTT_FETCH_ENGINE") or "aimd").strip().lower()
+    return engine if engine in {"aimd", "threads"} else "aimd"
 
-    out_offers: list[OfferOut] = []
-    seen_oids: set[str] = set()
-    workers = _resolve_effective_workers(cfg)
 
+def _crawl_threaded(
+    cfg,
+    sess,
+    index: list[dict[str, Any]],
+    deadline: datetime,
+    accept,
+    cache: PageCache | None = None,
+    journal: CrawlJournal | None = None,
+) -> None:
+    """Прежний путь: фиксированный пул потоков + паузы VTT_PRODUCT_REQUEST_DELAY_MS (VTT_FETCH_ENGINE=threads)."""
+    workers = _resolve_effective_workers(cfg)
     log(
-        f"[VTT] crawl profile: workers={workers} "
+        f"[VTT] crawl profile: engine=threads workers={workers} "
         f"listing_delay_ms={int(cfg.listing_request_delay_ms)} "
         f"product_delay_ms={int(cfg.product_request_delay_ms)}"
     )
 
-    if index:
-        thread_state = threading.local()
-        parse_errors = 0
-
-        def parse_worker(item: dict[str, Any]):
-            worker_sess = getattr(thread_state, "sess", None)
-            if worker_sess is None:
-                worker_sess = clone_session_with_cookies(sess, cfg)
-                thread_state.sess = worker_sess
-            return parse_product_page_from_index(worker_sess, cfg, item)
-
-        with ThreadPoolExecutor(max_workers=workers) as pool:
-            futures = []
-            for item in index:
-                if datetime.utcnow() >= deadline:
-                    break
-                futures.append(pool.submit(parse_worker, item))
-
-            for fut in as_completed(futures):
-                if datetime.utcnow() >= deadline:
-                    break
-                try:
-                    raw = fut.result()
-                except Exception as exc:
-                    parse_errors += 1
-                    log(f"[VTT] product parse error: {exc}")
-                    continue
-                if not raw:
-                    continue
-
-                offer = build_offer_from_raw(raw, id_prefix=id_prefix)
-                if not offer or offer.oid in seen_oids:
-                    continue
-
-                seen_oids.add(offer.oid)
-                out_offers.append(offer)
-
-        if parse_errors:
-            log(f"[VTT] product parse errors total: {parse_errors}")
+    thread_state = threading.local()
+    parse_errors = 0
+
+    def parse_worker(item: dict[str, Any]):
+        worker_sess = getattr(thread_state, "sess", None)
+        if worker_sess is None:
+            worker_sess = clone_session_with_cookies(sess, cfg)
+            thread_state.sess = worker_sess
+        url = norm_ws(item.get("url"))
+        if not url:
+            return None
+        page = fetch_product_page(worker_sess, cfg, url, cache)
+        if journal is not None:
+            journal.record(url, page)
+        return page
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        for item in index:
+            if datetime.utcnow() >= deadline:
+                break
+            futures[pool.submit(parse_worker, item)] = item
+
+        cancelled = False
+        for fut in as_completed(futures):
+            if not cancelled and datetime.utcnow() >= deadline:
+                # Ещё не начатые запросы снимаем: остаток подхватит следующий запуск по журналу.
+                # Уже скачанные и выполняющиеся дорабатываем — они записаны в журнал и нужны в выдаче
+                for pending in futures:
+                    pending.cancel()
+                cancelled = True
+            if fut.cancelled():
+                continue
+            try:
+                page = fut.result()
+            except Exception as exc:
+                parse_errors += 1
+                log(f"[VTT] product parse error: {exc}")
+                continue
+            accept(futures[fut], page)
+
+    if parse_errors:
+        log(f"[VTT] product parse errors total: {parse_errors}")
+
+
+def _crawl_aimd(
+    cfg,
+    sess,
+    index: list[dict[str, Any]],
+    deadline: datetime,
+    accept,
+    cache: PageCache | None = None,
+    journal: CrawlJournal | None = None,
+) -> None:
+    """asyncio + AIMD: параллельность подстраивается под латентность и 429 вместо фиксированных пауз."""
+    settings = AimdSettings.from_env(initial=_resolve_effective_workers(cfg))
+    log(
+        f"[VTT] crawl profile: engine=aimd window={settings.initial} "
+        f"min={settings.minimum} max={settings.maximum} decrease={settings.decrease}"
+    )
+
+    def on_error(item: dict[str, Any], exc: BaseException) -> None:
+        log(f"[VTT] product parse error: {item.get('url')} :: {exc}")
+
+    def parse(item: dict[str, Any], resp) -> dict[str, Any] | None:
+        url = norm_ws(item.get("url"))
+        if cache is None:
+            page = parse_product_page(resp.url, resp.text)
+        else:
+            page = cache.resolve(url, resp, parse_product_page)
+        if journal is not None:
+            journal.record(url, page)
+        return page
+
+    crawler = AimdCrawler(make_page_fetcher(sess, cfg, cache), settings=settings, cooldown_s=rate_limit_cooldown_s, log=log)
+    stats = crawler.crawl(
+        index,
+        url_of=lambda item: norm_ws(item.get("url")),
+        parse=parse,
+        on_result=accept,
+        on_error=on_error,
+        deadline=time.monotonic() + max(0.0, (deadline - datetime.utcnow()).total_seconds()),
+    )
+    log(f"[VTT] aimd crawl: {stats.describe()}")
+    if stats.failed:
+        log(f"[VTT] product parse errors total: {stats.failed}")
+
+
+def _build_offers_for_index(cfg, index: list[dict[str, Any]], *, id_prefix: str, cache_name: str) -> list[OfferOut]:
+    deadline = datetime.utcnow() + timedelta(minutes=max(1.0, float(cfg.max_crawl_minutes)))
+    out_offers: list[OfferOut] = []
+    seen_oids: set[str] = set()
+    accepted_urls: set[str] = set()
+
+    def accept(item: dict[str, Any], page: dict[str, Any] | None) -> None:
+        accepted_urls.add(norm_ws(item.get("url")))
+        raw = attach_index_item(page, item)
+        if not raw:
+            return
+        offer = build_offer_from_raw(raw, id_prefix=id_prefix)
+        if not offer or offer.oid in seen_oids:
+            return
+        seen_oids.add(offer.oid)
+        out_offers.append(offer)
+
+    journal = open_crawl_journal(SHARDS_DIR, cache_name)
+    remaining = index
+    if journal is not None:
+        remaining = []
+        for item in index:
+            url = norm_ws(item.get("url"))
+            if url in journal.pages:
+                accept(item, journal.pages[url])
+            else:
+                remaining.append(item)
+        if journal.resumed or journal.reset_reason:
+            log(f"[VTT] journal resume: done={len(index) - len(remaining)} remaining={len(remaining)} | {journal.summary()}")
+
+    sess = _login_or_raise(cfg) if remaining else None
+    if remaining and sess is None:
+        # Soft-fail login: отдаём то, что уже восстановлено из журнала; журнал остаётся для следующей попытки
+        if journal is not None:
+            journal.close()
+            log(f"[VTT] journal kept after login failure: replayed={len(out_offers)} remaining={len(remaining)}")
+        out_offers.sort(key=lambda o: o.oid)
+        return out_offers
+
+    if remaining:
+        cache = open_page_cache(cache_name)
+        try:
+            if _resolve_fetch_engine() == "threads":
+                _crawl_threaded(cfg, sess, remaining, deadline, accept, cache, journal)
+            else:
+                _crawl_aimd(cfg, sess, remaining, deadline, accept, cache, journal)
+        finally:
+            if cache is not None:
+                cache.close()
+                log(f"[VTT] page cache: {cache.summary()}")
+
+    if journal is not None:
+        # На deadline threads-движок выходит из as_completed, не забрав готовые futures, а воркеры
+        # дописывают журнал до shutdown: такие карточки записаны, но в accept не попали
+        for item in remaining:
+            url = norm_ws(item.get("url"))
+            if url and url not in accepted_urls and url in journal.pages:
+                accept(item, journal.pages[url])
+        left = sum(1 for item in index if (url := norm_ws(item.get("url"))) and url not in journal.pages)
+        log(f"[VTT] journal: {journal.summary()} left={left}")
+        if left:
+            journal.close()
+        else:
+            journal.discard()
 
     out_offers.sort(key=lambda o: o.oid)
     return out_offers
 
 
-def _run_quality_gate(*, raw_out_file: str, qg_cfg: dict[str, Any]):
+def _run_quality_gate(*, raw_out_file: str, qg_cfg: dict[str, Any], offers: list[OfferOut] | None = None):
     if not bool(qg_cfg.get("enabled", True)):
         class _QG:
             ok = True
@@ -437,6 +585,7 @@ def _run_quality_gate(*, raw_out_file: str, qg_cfg: dict[str, Any]):
         max_new_cosmetic_issues=_safe_int(qg_cfg.get("max_new_cosmetic_issues"), 5),
         enforce=bool(qg_cfg.get("enforce", True)),
         freeze_current_as_baseline=bool(qg_cfg.get("freeze_current_as_baseline", False)),
+        offers=offers,
     )
 
 
@@ -492,7 +641,9 @@ def _read_index_payload() -> dict[str, Any]:
 def _run_index(cfg_dir: Path, filter_cfg: dict[str, Any]) -> int:
     _prepare_source_env(cfg_dir, filter_cfg)
     cfg = cfg_from_env()
+    limiter = _install_rate_limiter()
     index = _collect_index(cfg)
+    _log_request_rate(limiter)
 
     SHARDS_DIR.mkdir(parents=True, exist_ok=True)
     _safe_write_json(INDEX_FILE, {"categories": list(cfg.categories), "total": len(index), "index": index})
@@ -520,7 +671,9 @@ def _run_shard_index(cfg_dir: Path, filter_cfg: dict[str, Any], *, id_prefix: st
     full_index = list(payload.get("index") or [])
     before = len(full_index)
     shard_index = [item for i, item in enumerate(full_index) if i % shard.total == shard.number]
-    offers = _build_offers_for_index(cfg, shard_index, id_prefix=id_prefix)
+    limiter = _install_rate_limiter()
+    offers = _build_offers_for_index(cfg, shard_index, id_prefix=id_prefix, cache_name=shard.name)
+    _log_request_rate(limiter)
 
     SHARDS_DIR.mkdir(parents=True, exist_ok=True)
     _safe_write_json(
@@ -544,6 +697,7 @@ def _run_shard_index(cfg_dir: Path, filter_cfg: dict[str, Any], *, id_prefix: st
             "before": before,
             "shard_input": len(shard_index),
             "after": len(offers),
+            "request_rate": limiter.summary() if limiter is not None else None,
         },
     )
 
@@ -557,6 +711,7 @@ def _run_shard_index(cfg_dir: Path, filter_cfg: dict[str, Any], *, id_prefix: st
             ("before", before),
             ("shard_input", len(shard_index)),
             ("after", len(offers)),
+            ("request_rate", f"{limiter.stats.effective_rps:.2f}req/s" if limiter is not None else "off"),
             ("json", SHARDS_DIR / f"{shard.name}.json"),
         ],
     )
@@ -611,7 +766,7 @@ def _run_merge(cfg_dir: Path, filter_cfg: dict[str, Any], runtime: VTTRuntime) -
         before=before,
     )
 
-    qg = _run_quality_gate(raw_out_file=runtime.raw_out_file, qg_cfg=runtime.qg_cfg)
+    qg = _run_quality_gate(raw_out_file=runtime.raw_out_file, qg_cfg=runtime.qg_cfg, offers=offers)
     availability_true = sum(1 for offer in offers if offer.available)
     availability_false = len(offers) - availability_true
 
@@ -644,9 +799,11 @@ def _run_full(cfg_dir: Path, filter_cfg: dict[str, Any], runtime: VTTRuntime) ->
     cfg = cfg_from_env()
     build_time, next_run = _build_time_window(runtime)
 
+    limiter = _install_rate_limiter()
     full_index = _collect_index(cfg)
     before = len(full_index)
-    offers = _build_offers_for_index(cfg, full_index, id_prefix=runtime.id_prefix)
+    offers = _build_offers_for_index(cfg, full_index, id_prefix=runtime.id_prefix, cache_name="full")
+    _log_request_rate(limiter)
     after = len(offers)
 
     if not offers:
@@ -665,7 +822,7 @@ def _run_full(cfg_dir: Path, filter_cfg: dict[str, Any], runtime: VTTRuntime) ->
         before=before,
     )
 
-    qg = _run_quality_gate(raw_out_file=runtime.raw_out_file, qg_cfg=runtime.qg_cfg)
+    qg = _run_quality_gate(raw_out_file=runtime.raw_out_file, qg_cfg=runtime.qg_cfg, offers=offers)
     availability_true = sum(1 for offer in offers if offer.available)
     availability_false = after - availability_true
 
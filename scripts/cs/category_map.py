@@ -10,7 +10,7 @@ from __future__ import annotations
 
 import re
 from pathlib import Path
-from typing import Any, Sequence
+from typing import Any, Iterable, Sequence
 
 try:
     import yaml
@@ -80,27 +80,27 @@ def _join_params(params: Sequence[tuple[str, str]] | None) -> str:
     )
 
 
-def _contains_any(text: str, fragments: Sequence[str]) -> bool:
-    return any(_norm(str(f)).strip() and _norm(str(f)).strip() in text for f in fragments)
+# -----------------------------
+# Таблица правил (порядок = приоритет)
+# -----------------------------
+# Каждое правило: (ключ группы, обязательные any-of наборы, запрещающий any-of набор).
+# Правило срабатывает, если в hay есть хотя бы по одному фрагменту из каждого
+# обязательного набора и нет ни одного фрагмента из запрещающего.
 
-
-def _printer_brand_present(hay: str) -> bool:
-    return any(f" {b} " in hay or b in hay for b in _PRINTER_BRANDS)
-
-
-def _resolve_exact(*, name_n: str, vendor_n: str, type_n: str, tech_n: str, hay: str) -> str:
+_EXACT_RULES: tuple[tuple[str, tuple[tuple[str, ...], ...], tuple[str, ...]], ...] = (
     # 1. Расходники
-    if _contains_any(hay, ["тонер", "toner", "тонер-картридж"]) and not _contains_any(hay, ["чернила", "ink"]):
-        return GROUP_IDS["laser_cartridges_toners"]
-    if _contains_any(hay, ["картридж", "cartridge"]) and _contains_any(hay, ["струйн", "ink", "ecotank", "ultrachrome", "surecolor", "pixma", "deskjet", "officejet", "photosmart"]):
-        return GROUP_IDS["ink_cartridges_tanks"]
-    if _contains_any(hay, ["картридж", "cartridge"]) and not _contains_any(hay, ["ink", "струйн"]):
-        return GROUP_IDS["laser_cartridges_toners"]
-    if _contains_any(hay, ["чернила", "ink", "ink bottle", "чернильниц"]):
-        return GROUP_IDS["inks"]
-    if _contains_any(hay, ["девелопер", "developer", "тонер", "toner powder"]) and _contains_any(hay, ["банка", "туба", "bulk", "бутыль", "bottle", "bag"]):
-        return GROUP_IDS["toners_developers"]
-    if _contains_any(hay, [
+    ("laser_cartridges_toners", (("тонер", "toner", "тонер-картридж"),), ("чернила", "ink")),
+    ("ink_cartridges_tanks", (
+        ("картридж", "cartridge"),
+        ("струйн", "ink", "ecotank", "ultrachrome", "surecolor", "pixma", "deskjet", "officejet", "photosmart"),
+    ), ()),
+    ("laser_cartridges_toners", (("картридж", "cartridge"),), ("ink", "струйн")),
+    ("inks", (("чернила", "ink", "ink bottle", "чернильниц"),), ()),
+    ("toners_developers", (
+        ("девелопер", "developer", "тонер", "toner powder"),
+        ("банка", "туба", "bulk", "бутыль", "bottle", "bag"),
+    ), ()),
+    ("drums_photodrums", ((
         "драм",
         "drum",
         "фотобарабан",
@@ -109,19 +109,17 @@ def _resolve_exact(*, name_n: str, vendor_n: str, type_n: str, tech_n: str, hay:
         "комплект блока формирования изображений",
         "image unit",
         "imaging unit",
-    ]):
-        return GROUP_IDS["drums_photodrums"]
-    if _contains_any(hay, ["печатающ", "printhead", "print head", "головка"]):
-        return GROUP_IDS["printheads"]
-    if _contains_any(hay, ["отработанн", "waste", "maintenance box", "контейнер"]) and _contains_any(hay, ["чернил", "toner"]):
-        return GROUP_IDS["waste_containers"]
+    ),), ()),
+    ("printheads", (("печатающ", "printhead", "print head", "головка"),), ()),
+    ("waste_containers", (
+        ("отработанн", "waste", "maintenance box", "контейнер"),
+        ("чернил", "toner"),
+    ), ()),
 
     # 2. Запчасти печати
-    if _contains_any(hay, ["термоблок", "печка", "fuser", "фьюзер"]):
-        return GROUP_IDS["fusers"]
-    if _contains_any(hay, ["блок проявки", "developer unit", "магнитный вал блока проявки"]):
-        return GROUP_IDS["developer_units"]
-    if _contains_any(hay, [
+    ("fusers", (("термоблок", "печка", "fuser", "фьюзер"),), ()),
+    ("developer_units", (("блок проявки", "developer unit", "магнитный вал блока проявки"),), ()),
+    ("transfer_units", ((
         "ремень переноса",
         "узел переноса",
         "вал переноса",
@@ -129,9 +127,8 @@ def _resolve_exact(*, name_n: str, vendor_n: str, type_n: str, tech_n: str, hay:
         "corona",
         "трансферный комплект",
         "transfer kit",
-    ]):
-        return GROUP_IDS["transfer_units"]
-    if _contains_any(hay, [
+    ),), ()),
+    ("rollers_kits", ((
         "ролик подачи",
         "ролики подачи",
         "ремкомплект",
@@ -153,27 +150,19 @@ def _resolve_exact(*, name_n: str, vendor_n: str, type_n: str, tech_n: str, hay:
         "separation rollers",
         "retard pad",
         "separation pad",
-    ]):
-        return GROUP_IDS["rollers_kits"]
-    if _contains_any(hay, ["финишер", "лоток", "подставк", "степлер", "скрепк"]):
-        return GROUP_IDS["finishers_trays_stands"]
-    if _contains_any(hay, ["сервисный комплект", "service kit", "сервисный набор", "ремонтный комплект"]):
-        return GROUP_IDS["service_kits"]
+    ),), ()),
+    ("finishers_trays_stands", (("финишер", "лоток", "подставк", "степлер", "скрепк"),), ()),
+    ("service_kits", (("сервисный комплект", "service kit", "сервисный набор", "ремонтный комплект"),), ()),
 
     # 3. Принтеры / МФУ / плоттеры / сканеры
-    if _contains_any(hay, ["мфу", "multifunction", "all in one"]):
-        return GROUP_IDS["mfp"]
-    if _contains_any(hay, ["плоттер", "plotter", "wide format"]):
-        return GROUP_IDS["plotters"]
-    if _contains_any(hay, ["сканер", "scanner"]) and not _contains_any(hay, ["мфу", "multifunction"]):
-        return GROUP_IDS["scanners"]
-    if _contains_any(hay, ["принтер", "printer"]) and not _contains_any(hay, ["мфу", "multifunction", "plotter", "scanner"]):
-        return GROUP_IDS["printers"]
+    ("mfp", (("мфу", "multifunction", "all in one"),), ()),
+    ("plotters", (("плоттер", "plotter", "wide format"),), ()),
+    ("scanners", (("сканер", "scanner"),), ("мфу", "multifunction")),
+    ("printers", (("принтер", "printer"),), ("мфу", "multifunction", "plotter", "scanner")),
 
     # 4. Проекторы / экраны / интерактивка
-    if _contains_any(hay, ["проектор", "projector"]):
-        return GROUP_IDS["projectors"]
-    if _contains_any(hay, [
+    ("projectors", (("проектор", "projector"),), ()),
+    ("projector_screens", ((
         "экран моторизированный",
         "моторизованный экран",
         "экран на треноге",
@@ -188,52 +177,43 @@ def _resolve_exact(*, name_n: str, vendor_n: str, type_n: str, tech_n: str, hay:
         "portable screen",
         "projection screen",
         "projector screen",
-    ]):
-        return GROUP_IDS["projector_screens"]
-    if _contains_any(hay, ["экран", "screen"]) and _contains_any(hay, [
-        "проекцион", "для проектора", "projector", "projection", "моторизирован", "моторизован",
-        "на треноге", "tripod", "механическ", "настенно потолоч", "wall mounted"
-    ]):
-        return GROUP_IDS["projector_screens"]
-    if _contains_any(hay, ["интерактивная панель", "interactive panel", "интерактивный киоск"]):
-        return GROUP_IDS["interactive_panels"]
-    if _contains_any(hay, ["интерактивная доска", "interactive board", "whiteboard"]):
-        return GROUP_IDS["interactive_boards"]
-    if _contains_any(hay, [
+    ),), ()),
+    ("projector_screens", (
+        ("экран", "screen"),
+        (
+            "проекцион", "для проектора", "projector", "projection", "моторизирован", "моторизован",
+            "на треноге", "tripod", "механическ", "настенно потолоч", "wall mounted",
+        ),
+    ), ()),
+    ("interactive_panels", (("интерактивная панель", "interactive panel", "интерактивный киоск"),), ()),
+    ("interactive_boards", (("интерактивная доска", "interactive board", "whiteboard"),), ()),
+    ("interactive_accessories", ((
         "интерактивная трибуна",
         "interactive podium",
         "ops",
         "кронштейн для панели",
         "стойка для панели",
         "модуль для панели",
-    ]):
-        return GROUP_IDS["interactive_accessories"]
+    ),), ()),
 
     # 5. Документы
-    if _contains_any(hay, ["ламинатор", "laminator"]):
-        return GROUP_IDS["laminators"]
-    if _contains_any(hay, ["пленка для ламинирования", "laminating film", "ламин пленк"]):
-        return GROUP_IDS["laminating_film"]
-    if _contains_any(hay, ["переплетчик", "переплетная машина", "binder", "binding machine"]):
-        return GROUP_IDS["binders"]
-    if _contains_any(hay, ["шредер", "уничтожитель бумаги", "shredder"]):
-        return GROUP_IDS["shredders"]
+    ("laminators", (("ламинатор", "laminator"),), ()),
+    ("laminating_film", (("пленка для ламинирования", "laminating film", "ламин пленк"),), ()),
+    ("binders", (("переплетчик", "переплетная машина", "binder", "binding machine"),), ()),
+    ("shredders", (("шредер", "уничтожитель бумаги", "shredder"),), ()),
 
     # 6. Компы
-    if _contains_any(hay, ["ноутбук", "laptop", "notebook"]):
-        return GROUP_IDS["laptops"]
-    if _contains_any(hay, ["монитор", "monitor"]) and not _contains_any(hay, [
+    ("laptops", (("ноутбук", "laptop", "notebook"),), ()),
+    ("monitors", (("монитор", "monitor"),), (
         "интерактивная панель",
         "interactive panel",
         "интерактивный дисплей",
         "interactive display",
         "интерактивная доска",
         "interactive board",
-    ]):
-        return GROUP_IDS["monitors"]
-    if _contains_any(hay, ["моноблок", "aio", "all in one pc"]):
-        return GROUP_IDS["monoblocks"]
-    if _contains_any(hay, [
+    )),
+    ("monoblocks", (("моноблок", "aio", "all in one pc"),), ()),
+    ("desktops_barebone", ((
         "barebone",
         "mini pc",
         "nettop",
@@ -245,59 +225,159 @@ def _resolve_exact(*, name_n: str, vendor_n: str, type_n: str, tech_n: str, hay:
         "компьютер",
         "small form factor",
         "sff",
-    ]):
-        return GROUP_IDS["desktops_barebone"]
-    if _contains_any(hay, ["tower", "micro"]) and _contains_any(hay, [
-        "dell",
-        "hp",
-        "lenovo",
-        "asus",
-        "acer",
-        "desktop",
-        "optiplex",
-        "prodesk",
-        "thinkcentre",
-        "компьютер",
-        "настольный пк",
-    ]):
-        return GROUP_IDS["desktops_barebone"]
-    if _contains_any(hay, ["workstation", "рабочая станция"]):
-        return GROUP_IDS["workstations"]
-    if _contains_any(hay, ["материнская плата", "ssd", "hdd", "процессор", "оперативная память", "видеокарта", "корпус", "блок питания pc"]):
-        return GROUP_IDS["pc_components"]
+    ),), ()),
+    ("desktops_barebone", (
+        ("tower", "micro"),
+        (
+            "dell",
+            "hp",
+            "lenovo",
+            "asus",
+            "acer",
+            "desktop",
+            "optiplex",
+            "prodesk",
+            "thinkcentre",
+            "компьютер",
+            "настольный пк",
+        ),
+    ), ()),
+    ("workstations", (("workstation", "рабочая станция"),), ()),
+    ("pc_components", ((
+        "материнская плата", "ssd", "hdd", "процессор", "оперативная память", "видеокарта", "корпус", "блок питания pc",
+    ),), ()),
 
     # 7. Энергия
-    if _contains_any(hay, ["источник бесперебойного питания", "ups", "ибп"]):
-        return GROUP_IDS["ups"]
-    if _contains_any(hay, ["стабилизатор", "stabilizer", "avr"]) and not _contains_any(hay, ["ups", "ибп"]):
-        return GROUP_IDS["stabilizers"]
-    if _contains_any(hay, ["аккумулятор", "battery", "батарейный блок", "battery pack", "battery module", "дополнительная батарея", "модуль батарей", "ebm"]):
-        return GROUP_IDS["batteries"]
-    if _contains_any(hay, ["power module", "upm module", "силовой модуль", "snmp", "карта мониторинга ибп", "модуль bypass"]):
-        return GROUP_IDS["ups_accessories"]
+    ("ups", (("источник бесперебойного питания", "ups", "ибп"),), ()),
+    ("stabilizers", (("стабилизатор", "stabilizer", "avr"),), ("ups", "ибп")),
+    ("batteries", ((
+        "аккумулятор", "battery", "батарейный блок", "battery pack", "battery module", "дополнительная батарея",
+        "модуль батарей", "ebm",
+    ),), ()),
+    ("ups_accessories", ((
+        "power module", "upm module", "силовой модуль", "snmp", "карта мониторинга ибп", "модуль bypass",
+    ),), ()),
 
     # 8. Кабели
-    if _contains_any(hay, ["адаптер", "adapter", "переходник", "конвертер", "dock", "док станция"]):
-        return GROUP_IDS["connection_accessories"]
-    if _contains_any(hay, ["кабель", "cable", "шнур", "cord", "patch cord", "utp", "hdmi", "displayport", "usb c", "usb-c", "vga", "dvi", "rj45"]):
-        return GROUP_IDS["cables"]
+    ("connection_accessories", (("адаптер", "adapter", "переходник", "конвертер", "dock", "док станция"),), ()),
+    ("cables", ((
+        "кабель", "cable", "шнур", "cord", "patch cord", "utp", "hdmi", "displayport", "usb c", "usb-c", "vga",
+        "dvi", "rj45",
+    ),), ()),
+)
+
+# Мягкий fallback: только при наличии бренда печатной техники.
+_SOFT_RULES: tuple[tuple[str, tuple[tuple[str, ...], ...], tuple[str, ...]], ...] = (
+    ("other_consumables", ((
+        "картридж", "тонер", "чернила", "девелопер", "фотобарабан", "драм", "печатающ", "maintenance box",
+        "контейнер для отработки",
+    ),), ()),
+    ("other_parts", ((
+        "узел", "модуль", "kit", "ролик", "fuser", "термоблок", "ремень переноса", "лоток",
+        "финишер", "кассета", "подставка", "шлейф", "муфта", "направляющая", "шарнир", "петля",
+        "консоль", "шестерня", "зубчатая передача", "подшипник", "датчик", "активатор", "шкив",
+        "привод", "панель управления", "автоподатчик", "dadf", "adf", "блок подачи чернил",
+        "пылевой фильтр", "рычаг датчика", "газлифт", "жесткий диск", "нагревательная лампа",
+        "транспортного модуля", "транспортный модуль",
+    ),), ()),
+)
+
+# -----------------------------
+# Компиляция правил в один matcher
+# -----------------------------
+# Все фрагменты нормализуются один раз и собираются в trie-regex. На каждой позиции
+# hay он находит самый длинный фрагмент; остальные совпадения в этой позиции — его
+# префиксы (заранее посчитаны). Так один проход по hay даёт полный набор подстрок,
+# эквивалентный прежним проверкам `fragment in hay`.
+
+_CompiledRule = tuple[str, tuple[frozenset[str], ...], frozenset[str]]
+
+
+def _norm_fragment(fragment: str) -> str:
+    return _norm(str(fragment)).strip()
+
+
+def _compile_rules(rules: Sequence[tuple[str, tuple[tuple[str, ...], ...], tuple[str, ...]]]) -> tuple[_CompiledRule, ...]:
+    out: list[_CompiledRule] = []
+    for key, required, excluded in rules:
+        req = tuple(frozenset(f for f in map(_norm_fragment, group) if f) for group in required)
+        exc = frozenset(f for f in map(_norm_fragment, excluded) if f)
+        out.append((key, req, exc))
+    return tuple(out)
+
+
+def _trie_pattern(words: Sequence[str]) -> str:
+    trie: dict[str, Any] = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def _emit(node: dict[str, Any]) -> str:
+        branches = [re.escape(ch) + _emit(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # Жадный optional: если слово может закончиться здесь, сначала пробуем продолжение.
+        return f"(?:{body})?" if "" in node else body
 
+    return _emit(trie)
+
+
+def _build_matcher(fragments: Iterable[str]) -> tuple[re.Pattern[str], dict[str, frozenset[str]]]:
+    words = sorted({f for f in fragments if f})
+    pattern = re.compile(f"(?=({_trie_pattern(words)}))")
+    prefixes = {w: frozenset(p for p in words if w.startswith(p)) for w in words}
+    return pattern, prefixes
+
+
+_EXACT_COMPILED = _compile_rules(_EXACT_RULES)
+_SOFT_COMPILED = _compile_rules(_SOFT_RULES)
+_PRINTER_BRANDS_SET = frozenset(_PRINTER_BRANDS)
+
+
+def _rule_fragments() -> set[str]:
+    out: set[str] = set(_PRINTER_BRANDS_SET)
+    for _key, req, exc in _EXACT_COMPILED + _SOFT_COMPILED:
+        for group in req:
+            out.update(group)
+        out.update(exc)
+    return out
+
+
+_MATCHER_RE, _MATCHER_PREFIXES = _build_matcher(_rule_fragments())
+
+
+def _find_hits(hay: str) -> frozenset[str]:
+    """Один проход по hay: все фрагменты правил, встречающиеся как подстроки."""
+    longest = {m.group(1) for m in _MATCHER_RE.finditer(hay)}
+    if not longest:
+        return frozenset()
+    hits: set[str] = set()
+    for w in longest:
+        hits.update(_MATCHER_PREFIXES[w])
+    return frozenset(hits)
+
+
+def _eval_rules(rules: Sequence[_CompiledRule], hits: frozenset[str]) -> str:
+    for key, req, exc in rules:
+        if all(not hits.isdisjoint(group) for group in req) and hits.isdisjoint(exc):
+            return GROUP_IDS[key]
     return ""
 
 
-def _resolve_soft_fallback(*, hay: str) -> str:
-    if _printer_brand_present(hay):
-        if _contains_any(hay, ["картридж", "тонер", "чернила", "девелопер", "фотобарабан", "драм", "печатающ", "maintenance box", "контейнер для отработки"]):
-            return GROUP_IDS["other_consumables"]
-        if _contains_any(hay, [
-            "узел", "модуль", "kit", "ролик", "fuser", "термоблок", "ремень переноса", "лоток",
-            "финишер", "кассета", "подставка", "шлейф", "муфта", "направляющая", "шарнир", "петля",
-            "консоль", "шестерня", "зубчатая передача", "подшипник", "датчик", "активатор", "шкив",
-            "привод", "панель управления", "автоподатчик", "dadf", "adf", "блок подачи чернил",
-            "пылевой фильтр", "рычаг датчика", "газлифт", "жесткий диск", "нагревательная лампа",
-            "транспортного модуля", "транспортный модуль"
-        ]):
-            return GROUP_IDS["other_parts"]
+def _printer_brand_present(hits: frozenset[str]) -> bool:
+    return not hits.isdisjoint(_PRINTER_BRANDS_SET)
+
+
+def _resolve_exact(*, hits: frozenset[str]) -> str:
+    return _eval_rules(_EXACT_COMPILED, hits)
+
+
+def _resolve_soft_fallback(*, hits: frozenset[str]) -> str:
+    if _printer_brand_present(hits):
+        return _eval_rules(_SOFT_COMPILED, hits)
     return ""
 
 
@@ -315,11 +395,13 @@ def resolve_category_id(*, name: str, vendor: str = "", params: Sequence[tuple[s
     params_n = _norm(_join_params(params))
     hay = f"{name_n}{vendor_n}{type_n}{tech_n}{model_n}{desc_n}{params_n}"
 
-    exact = _resolve_exact(name_n=name_n, vendor_n=vendor_n, type_n=type_n, tech_n=tech_n, hay=hay)
+    hits = _find_hits(hay)
+
+    exact = _resolve_exact(hits=hits)
     if exact:
         return exact
 
-    fallback = _resolve_soft_fallback(hay=hay)
+    fallback = _resolve_soft_fallback(hits=hits)
     if fallback:
         return fallback
 
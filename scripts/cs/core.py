@@ -16,12 +16,16 @@ from __future__ import annotations
 
 from dataclasses import dataclass, replace
 from datetime import datetime, timedelta
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Iterable, Sequence
+from typing import Any, Iterable, Iterator, Sequence
 from zoneinfo import ZoneInfo
 import os
 import hashlib
+import json
 import re
+import sqlite3
+import time
 
 # Числа для парсинга float/int (вес/объём/габариты и т.п.)
 _RE_NUM = re.compile(r"(\d+(?:[\.,]\d+)?)")
@@ -33,7 +37,9 @@ from .description import build_description
 from .pricing import compute_price, CS_PRICE_TIERS
 from .category_map import resolve_category_id
 from .meta import now_almaty, next_run_at_hour
-from .validators import validate_cs_yml
+from .validators import CsYmlValidator, RenderedOffer
+from .offer_index import OfferIndexBuilder, offer_index_enabled
+from .qg_engine import GateOffer
 from .util import norm_ws, safe_int, _truncate_text
 from .writer import (
     xml_escape_text,
@@ -46,6 +52,10 @@ from .writer import (
     make_feed_meta,
     build_cs_feed_xml,
     build_cs_feed_xml_raw,
+    iter_cs_feed_xml,
+    iter_cs_feed_xml_raw,
+    FeedWriteResult,
+    write_chunks_if_changed,
     write_if_changed,
 )
 
@@ -89,6 +99,11 @@ ALMATY_TZ = "Asia/Almaty"
 CORE_FILE = Path(__file__).resolve()
 PROJECT_ROOT = CORE_FILE.parents[2]
 DOCS_RAW_DIR = PROJECT_ROOT / "docs" / "raw"
+DOCS_DEBUG_DIR = PROJECT_ROOT / "docs" / "debug"
+
+# Persistent кэш отрендеренных offers (SQLite, файл на поставщика). CS_RENDER_CACHE=0 выключает.
+CS_RENDER_CACHE_DIR = DOCS_DEBUG_DIR / "cs_render_cache"
+CS_RENDER_CACHE_TTL_DAYS = 30
 
 # --- CS: Совместимость (только безопасно и только где нужно) ---
 _COMPAT_PARAM_NAME = "Совместимость"
@@ -256,6 +271,43 @@ def _cs_expand_consumable_code_ranges(s: str) -> str:
     t = re.sub(r"(?i)\b(?P<a>[A-Z]{1,3}\d{3,6})\s*-\s*(?P<b>[A-Z]{1,3}\d{3,6})\b", _repl, t)
     return t
 
+# --- CS: memo для чистых compat-функций ---
+# Длинные списки моделей (Xerox/HP и т.п.) повторяются в сотнях картриджей: кэшируем результат
+# по аргументам вызова (позиционным и именованным). CS_COMPAT_* флаги фиксируются при импорте
+# модуля, поэтому в ключ не входят.
+CS_COMPAT_MEMO_SIZE = int((os.getenv("CS_COMPAT_MEMO_SIZE", "16384") or "16384").strip() or "16384")
+
+_COMPAT_MEMO_FUNCS: dict[str, Any] = {}
+
+def _compat_memo(fn):
+    cached = lru_cache(maxsize=CS_COMPAT_MEMO_SIZE)(fn)
+    _COMPAT_MEMO_FUNCS[fn.__name__] = cached
+
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        res = cached(*args, **kwargs)
+        # list отдаём копией: кэшированный объект не должен мутироваться снаружи
+        return list(res) if type(res) is list else res
+
+    return wrapper
+
+def compat_memo_stats() -> dict[str, tuple[int, int]]:
+    """(hits, misses) по каждой memo-функции совместимости за текущий процесс."""
+    out: dict[str, tuple[int, int]] = {}
+    for name, cached in _COMPAT_MEMO_FUNCS.items():
+        info = cached.cache_info()
+        out[name] = (info.hits, info.misses)
+    return out
+
+def compat_memo_summary() -> str:
+    """Hit-rate compat memo для лога сборки: name=hits/calls (rate%)."""
+    parts: list[str] = []
+    for name, (hits, misses) in compat_memo_stats().items():
+        total = hits + misses
+        rate = (100.0 * hits / total) if total else 0.0
+        parts.append(f"{name.lstrip('_')}={hits}/{total} ({rate:.0f}%)")
+    return " | ".join(parts)
+
 # CS: извлекаем коды расходников (в исходном порядке) из текста. Никаких моделей техники сюда не пускаем.
 
 def _cs_strip_consumable_codes_from_text(text: str, allow_short_3dig: bool = True) -> str:
@@ -268,6 +320,7 @@ def _cs_strip_consumable_codes_from_text(text: str, allow_short_3dig: bool = Tru
     _ = allow_short_3dig
     return norm_ws(text)
 
+@_compat_memo
 def _cs_clean_compat_value(v: str) -> str:
     s = (v or "").strip()
     if not s:
@@ -360,6 +413,7 @@ def _cs_trim_compat_to_max(v: str, max_len: int = 260) -> str:
     return cut
 
 
+@_compat_memo
 def _cs_trim_compat_for_satu_param(v: str, max_len: int = 255) -> str:
     """Короткая версия только для экспортируемого <param name=\"Совместимость\">.
 
@@ -454,6 +508,7 @@ _RE_COLOR_TOKENS = [
 
 _RE_HI_BLACK = re.compile(r"\bhi[-\s]?black\b", re.IGNORECASE)
 
+@_compat_memo
 def _compat_fragments(s: str) -> list[str]:
     # CS: разбиваем строку совместимости на фрагменты (стабильно)
     s = norm_ws(s)
@@ -527,6 +582,7 @@ _COMPAT_SKIP_WORD_RE = re.compile(r"^\s*(?:совместим\w*|compatible|orig
 _COMPAT_NUM_ONLY_RE = re.compile(r"^\s*\d+(?:[.,]\d+)?\s*$")
 _COMPAT_NO_CODE_RE = re.compile(r"^\s*(?:№|#)\s*\d{2,}\s*$")
 
+@_compat_memo
 def _clean_compat_fragment(f: str) -> str:
     # CS: чистим один фрагмент совместимости (безопасно)
     f = norm_ws(f)
@@ -605,6 +661,7 @@ def _clean_compat_fragment(f: str) -> str:
 
     return f
 
+@_compat_memo
 def _is_valid_compat_fragment(f: str) -> bool:
     """CS: проверка, что фрагмент похож на совместимость (модель/список моделей), а не мусор."""
     f = norm_ws(f)
@@ -1334,12 +1391,63 @@ def _write_category_unresolved_report(path: Path, supplier: str, lines: Sequence
     data = header + "\n\n".join(pieces).rstrip() + "\n"
     path.write_text(data, encoding="utf-8")
 
-def _resolve_offer_category_id(offer: "OfferOut", *, public_vendor: str) -> str:
+@dataclass(frozen=True)
+class PreparedOffer:
+    """Offer после shared prepare-этапа: name/description/vendor/categoryId считаются один раз.
+
+    Используется и для split по categoryId, и для рендера final XML.
+    """
+    offer: "OfferOut"
+    name_full: str
+    native_desc: str
+    vendor: str
+    category_id: str
+
+    @property
+    def oid(self) -> str:
+        return self.offer.oid
+
+    @property
+    def available(self) -> bool:
+        return self.offer.available
+
+    def render(
+        self,
+        *,
+        currency_id: str = CURRENCY_ID_DEFAULT,
+        public_vendor: str = "CS",
+        param_priority: Sequence[str] | None = None,
+    ) -> RenderedOffer:
+        return self.offer.render(
+            currency_id=currency_id,
+            public_vendor=public_vendor,
+            param_priority=param_priority,
+            prepared=self,
+        )
+
+    def to_xml(
+        self,
+        *,
+        currency_id: str = CURRENCY_ID_DEFAULT,
+        public_vendor: str = "CS",
+        param_priority: Sequence[str] | None = None,
+    ) -> str:
+        return self.render(
+            currency_id=currency_id,
+            public_vendor=public_vendor,
+            param_priority=param_priority,
+        ).xml
+
+def prepare_offer(offer: "OfferOut", *, public_vendor: str) -> PreparedOffer:
     name_full = normalize_offer_name(offer.name)
     name_full = sanitize_mixed_text(name_full)
     native_desc = fix_text(offer.native_desc)
+    # RAW должен уже отдавать идеальные params и чистое supplier-description.
+    # Core НЕ переносит характеристики из description в params и не enrich'ит их из desc/name.
     native_desc = strip_service_kv_lines(native_desc)
     vendor = pick_vendor(offer.vendor, name_full, offer.params, native_desc, public_vendor=public_vendor)
+    # categoryId — это общая Satu-таксономия проекта, поэтому резолвится в shared-слое.
+    # Если адаптер когда-нибудь задаст category_id сам, core его уважает.
     category_id = norm_ws(offer.category_id) or resolve_category_id(
         oid=offer.oid,
         name=name_full,
@@ -1347,21 +1455,27 @@ def _resolve_offer_category_id(offer: "OfferOut", *, public_vendor: str) -> str:
         params=offer.params,
         native_desc=native_desc,
     )
-    return norm_ws(category_id)
+    return PreparedOffer(
+        offer=offer,
+        name_full=name_full,
+        native_desc=native_desc,
+        vendor=vendor,
+        category_id=norm_ws(category_id),
+    )
 
 def _split_offers_for_final(
     offers: Sequence["OfferOut"],
     *,
     supplier: str,
     public_vendor: str,
-) -> tuple[list["OfferOut"], list[str]]:
-    resolved: list[OfferOut] = []
+) -> tuple[list[PreparedOffer], list[str]]:
+    resolved: list[PreparedOffer] = []
     unresolved_lines: list[str] = []
 
     for offer in offers:
-        category_id = _resolve_offer_category_id(offer, public_vendor=public_vendor)
-        if category_id:
-            resolved.append(replace(offer, category_id=category_id))
+        prepared = prepare_offer(offer, public_vendor=public_vendor)
+        if prepared.category_id:
+            resolved.append(prepared)
             continue
 
         unresolved_lines.append(
@@ -1382,8 +1496,8 @@ def write_cs_feed_raw(
     before: int,
     encoding: str = OUTPUT_ENCODING_DEFAULT,
     currency_id: str = CURRENCY_ID_DEFAULT,
-) -> bool:
-    full = build_cs_feed_xml_raw(
+) -> FeedWriteResult:
+    chunks = iter_cs_feed_xml_raw(
         offers,
         supplier=supplier,
         supplier_url=supplier_url,
@@ -1393,9 +1507,199 @@ def write_cs_feed_raw(
         encoding=encoding,
         currency_id=currency_id,
     )
-    return write_if_changed(out_file, full, encoding=encoding)
+    return write_chunks_if_changed(out_file, chunks, encoding=encoding)
+
+# --- CS: persistent render cache ---
+# Ключ = sha256(поля OfferOut + параметры рендера + CS_* env + версия shared core).
+# Версия core — хэш исходников scripts/cs/*.py и scripts/cs/config/*, поэтому любая
+# правка core/конфигов автоматически инвалидирует весь кэш.
+
+_CORE_CODE_VERSION: str | None = None
+
+def _core_code_version() -> str:
+    global _CORE_CODE_VERSION
+    if _CORE_CODE_VERSION is None:
+        h = hashlib.sha256()
+        cs_dir = CORE_FILE.parent
+        files = sorted(cs_dir.glob("*.py")) + sorted((cs_dir / "config").glob("*"))
+        for path in files:
+            if not path.is_file():
+                continue
+            h.update(path.name.encode("utf-8"))
+            h.update(path.read_bytes())
+        _CORE_CODE_VERSION = h.hexdigest()
+    return _CORE_CODE_VERSION
+
+def _render_env_fingerprint() -> list[tuple[str, str]]:
+    # CS_RENDER_* (воркеры/кэш) на результат рендера не влияют
+    return sorted(
+        (k, v)
+        for k, v in os.environ.items()
+        if (k.startswith("CS_") and not k.startswith("CS_RENDER_")) or k == "PUBLIC_VENDOR"
+    )
+
+def render_cache_key(
+    offer: "OfferOut",
+    *,
+    currency_id: str,
+    public_vendor: str,
+    param_priority: Sequence[str] | None,
+) -> str:
+    payload = [
+        _core_code_version(),
+        _render_env_fingerprint(),
+        currency_id,
+        public_vendor,
+        list(param_priority or []),
+        offer.oid,
+        bool(offer.available),
+        offer.name,
+        offer.price,
+        list(offer.pictures or []),
+        offer.vendor,
+        [list(kv) for kv in (offer.params or [])],
+        offer.native_desc,
+        offer.category_id,
+    ]
+    raw = json.dumps(payload, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class RenderCache:
+    """SQLite-кэш готовых <offer>-блоков между запусками (docs/debug/cs_render_cache/<supplier>.sqlite).
+
+    Записи, которые не использовались CS_RENDER_CACHE_TTL_DAYS дней, удаляются при close().
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._now = int(time.time())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS render_cache ("
+            "key TEXT PRIMARY KEY, payload TEXT NOT NULL, used_at INTEGER NOT NULL)"
+        )
+
+    def get(self, key: str) -> RenderedOffer | None:
+        row = self._conn.execute("SELECT payload FROM render_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        try:
+            data = json.loads(row[0])
+            rendered = RenderedOffer(
+                xml=data["xml"],
+                oid=data["oid"],
+                vendor_code=data["vendor_code"],
+                price=data["price"],
+                has_picture=bool(data["has_picture"]),
+                keywords=data["keywords"],
+                param_names=tuple(data["param_names"]),
+                category_id=data["category_id"],
+                available=bool(data["available"]),
+                name=data["name"],
+                vendor=data["vendor"],
+                pictures=tuple(data["pictures"]),
+                params=tuple((k, v) for k, v in data["params"]),
+            )
+        except (ValueError, KeyError, TypeError):
+            self.misses += 1
+            return None
+        self._conn.execute("UPDATE render_cache SET used_at = ? WHERE key = ?", (self._now, key))
+        self.hits += 1
+        return rendered
+
+    def put(self, key: str, rendered: RenderedOffer) -> None:
+        payload = json.dumps(
+            {
+                "xml": rendered.xml,
+                "oid": rendered.oid,
+                "vendor_code": rendered.vendor_code,
+                "price": rendered.price,
+                "has_picture": rendered.has_picture,
+                "keywords": rendered.keywords,
+                "param_names": list(rendered.param_names),
+                "category_id": rendered.category_id,
+                "available": rendered.available,
+                "name": rendered.name,
+                "vendor": rendered.vendor,
+                "pictures": list(rendered.pictures),
+                "params": [list(kv) for kv in rendered.params],
+            },
+            ensure_ascii=False,
+        )
+        self._conn.execute(
+            "INSERT OR REPLACE INTO render_cache (key, payload, used_at) VALUES (?, ?, ?)",
+            (key, payload, self._now),
+        )
 
-# CS: пишет фид в файл (validate + write_if_changed)
+    def close(self) -> None:
+        cutoff = self._now - CS_RENDER_CACHE_TTL_DAYS * 86400
+        self._conn.execute("DELETE FROM render_cache WHERE used_at < ?", (cutoff,))
+        self._conn.commit()
+        self._conn.close()
+
+    def summary(self) -> str:
+        return f"hit={self.hits} | miss={self.misses} | file={self.path.as_posix()}"
+
+def open_render_cache(supplier: str) -> RenderCache | None:
+    flag = (os.getenv("CS_RENDER_CACHE", "1") or "1").strip().lower()
+    if flag in ("0", "false", "no"):
+        return None
+    path = Path(os.getenv("CS_RENDER_CACHE_FILE", "") or CS_RENDER_CACHE_DIR / f"{supplier}.sqlite")
+    try:
+        return RenderCache(path)
+    except sqlite3.Error:
+        # Кэш — только ускорение: при битом/недоступном файле собираем без него
+        return None
+
+@dataclass(frozen=True)
+class _CachedOffer:
+    """Offer, чей XML взят из RenderCache: render() просто отдаёт сохранённый результат."""
+    rendered: RenderedOffer
+    available: bool
+
+    def render(self, **_: object) -> RenderedOffer:
+        return self.rendered
+
+def _apply_render_cache(
+    offers: Sequence[PreparedOffer],
+    cache: RenderCache,
+    *,
+    currency_id: str,
+    public_vendor: str,
+    param_priority: Sequence[str] | None,
+) -> tuple[list[PreparedOffer | _CachedOffer], list[str | None]]:
+    """Подменяет попадания кэша на _CachedOffer; для промахов возвращает ключ, куда сохранить рендер."""
+    out: list[PreparedOffer | _CachedOffer] = []
+    pending: list[str | None] = []
+    for prepared in offers:
+        key = render_cache_key(
+            prepared.offer,
+            currency_id=currency_id,
+            public_vendor=public_vendor,
+            param_priority=param_priority,
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            out.append(_CachedOffer(rendered=cached, available=prepared.available))
+            pending.append(None)
+        else:
+            out.append(prepared)
+            pending.append(key)
+    return out, pending
+
+def _validated_chunks(chunks: Iterable[str], validator: CsYmlValidator) -> Iterable[str]:
+    # CS: offers проверяются структурно (on_offer в iter_cs_feed_xml), здесь — только
+    # глобальные текстовые запреты; ошибка в конце отменяет запись временного файла
+    for chunk in chunks:
+        validator.scan_text(chunk)
+        yield chunk
+    validator.finish()
+
+# CS: пишет фид в файл (stream + validate + write_chunks_if_changed)
 def write_cs_feed(
     offers: Sequence["OfferOut"],
     *,
@@ -1409,12 +1713,14 @@ def write_cs_feed(
     public_vendor: str = "CS",
     currency_id: str = CURRENCY_ID_DEFAULT,
     param_priority: Sequence[str] | None = None,
-) -> bool:
+) -> FeedWriteResult:
+    prepare_started = time.perf_counter()
     resolved_offers, unresolved_lines = _split_offers_for_final(
         offers,
         supplier=supplier,
         public_vendor=public_vendor,
     )
+    prepare_seconds = time.perf_counter() - prepare_started
 
     _write_category_unresolved_report(
         _category_unresolved_report_path(supplier),
@@ -1422,8 +1728,33 @@ def write_cs_feed(
         unresolved_lines,
     )
 
-    full = build_cs_feed_xml(
-        resolved_offers,
+    validator = CsYmlValidator(param_drop_default_cf=PARAM_DROP_DEFAULT_CF)
+    cache = open_render_cache(supplier)
+    render_offers: Sequence[PreparedOffer | _CachedOffer] = resolved_offers
+    pending_keys: Iterator[str | None] = iter(())
+    if cache is not None:
+        render_offers, pending = _apply_render_cache(
+            resolved_offers,
+            cache,
+            currency_id=currency_id,
+            public_vendor=public_vendor,
+            param_priority=param_priority,
+        )
+        pending_keys = iter(pending)
+
+    offer_index = OfferIndexBuilder(encoding=encoding) if offer_index_enabled() else None
+
+    def _on_offer(rendered: RenderedOffer) -> None:
+        validator.feed_offer(rendered)
+        if offer_index is not None:
+            offer_index.add(rendered)
+        # on_offer вызывается строго в порядке offers (и в параллельном режиме тоже)
+        key = next(pending_keys, None)
+        if cache is not None and key is not None:
+            cache.put(key, rendered)
+
+    chunks = iter_cs_feed_xml(
+        render_offers,
         supplier=supplier,
         supplier_url=supplier_url,
         build_time=build_time,
@@ -1433,9 +1764,25 @@ def write_cs_feed(
         public_vendor=public_vendor,
         currency_id=currency_id,
         param_priority=param_priority,
+        extra_meta=[("Подготовка offers в core (сек)", f"{prepare_seconds:.3f}")],
+        on_offer=_on_offer,
     )
-    validate_cs_yml(full, param_drop_default_cf=PARAM_DROP_DEFAULT_CF)
-    return write_if_changed(out_file, full, encoding=encoding)
+    try:
+        result = write_chunks_if_changed(out_file, _validated_chunks(chunks, validator), encoding=encoding)
+    finally:
+        if cache is not None:
+            cache.close()
+    # Статус нужен downstream (Price/зеркала/checker): "meta-only"/"unchanged" = offers не менялись
+    print(f"[{supplier}] final feed: {result.describe()}")
+    if offer_index is not None:
+        # offers_sha256 совпадает с файлом на диске и при пропуске записи (unchanged)
+        index_path = offer_index.write(out_file, offers_sha256=result.offers_sha256)
+        print(f"[{supplier}] offer index: {len(offer_index.records)} offers | file={index_path.as_posix()}")
+    if cache is not None:
+        print(f"[{supplier}] render cache: {cache.summary()}")
+    # Статистика за процесс сборки (в process-pool воркерах рендера — свои memo, сюда не входят)
+    print(f"[{supplier}] compat memo: {compat_memo_summary()}")
+    return result
 
 # Пишет файл только если изменился (атомарно)
 def normalize_vendor(v: str) -> str:
@@ -1626,6 +1973,65 @@ def pick_vendor(
 
     return norm_ws(public_vendor)
 
+# --- CS: raw-поля offer (raw-фид + quality gate) ---
+# write_cs_feed_raw и supplier quality gate считают одни и те же fix_text/norm_ws по каждому offer.
+# Кэш по значениям полей (не по объекту: OfferOut мутабелен), поэтому гейт после записи raw-фида
+# получает готовый GateOffer, а изменённый offer просто даёт промах.
+# Гейт — последний потребитель: после него кэш сбрасывается (clear_gate_offer_cache), а не живёт
+# до конца процесса.
+CS_GATE_OFFER_CACHE_SIZE = int((os.getenv("CS_GATE_OFFER_CACHE_SIZE", "65536") or "65536").strip() or "65536")
+
+@lru_cache(maxsize=CS_GATE_OFFER_CACHE_SIZE)
+def _gate_offer_cached(
+    oid: str,
+    available: bool,
+    name: str,
+    price: int | None,
+    pictures: tuple[str, ...],
+    vendor: str,
+    params: tuple[tuple[str, str], ...],
+    native_desc: str,
+    category_id: str,
+) -> GateOffer:
+    pi = safe_int(price)
+
+    # native_desc сохраняем максимально как есть (только делаем безопасным для CDATA)
+    desc = fix_text(native_desc or "").replace("]]>", "]]&gt;")
+
+    pics_out: list[str] = []
+    for pp in pictures:
+        pp2 = (pp or "").strip()
+        if not pp2:
+            continue
+        pics_out.append(_cs_norm_url(pp2))
+
+    params_out: list[tuple[str, str]] = []
+    for k, v in params:
+        kk = norm_ws(k)
+        # сырое: не выводим служебные/отладочные параметры
+        if re.fullmatch(r"(?i)товаров:\s*\d{1,7}", kk or ""):
+            continue
+        vv = fix_text(norm_ws(v))
+        if not kk or not vv:
+            continue
+        params_out.append((kk, vv))
+
+    return GateOffer(
+        oid=oid,
+        available=bool_to_xml(available),
+        category_id=norm_ws(category_id),
+        name=fix_text(norm_ws(name)),
+        price=str(int(pi) if pi is not None else 0),
+        vendor=fix_text(norm_ws(vendor)),
+        description=f"\n{desc}",
+        pictures=tuple(pics_out),
+        params=tuple(params_out),
+    )
+
+def clear_gate_offer_cache() -> None:
+    """Отпускает GateOffer всех offers после quality gate."""
+    _gate_offer_cached.cache_clear()
+
 @dataclass
 class OfferOut:
     oid: str
@@ -1645,26 +2051,34 @@ class OfferOut:
         currency_id: str = CURRENCY_ID_DEFAULT,
         public_vendor: str = "CS",
         param_priority: Sequence[str] | None = None,
+        prepared: PreparedOffer | None = None,
     ) -> str:
-        name_full = normalize_offer_name(self.name)
-        name_full = sanitize_mixed_text(name_full)
-        native_desc = fix_text(self.native_desc)
-        # RAW должен уже отдавать идеальные params и чистое supplier-description.
-        # Core НЕ переносит характеристики из description в params и не enrich'ит их из desc/name.
-        native_desc = strip_service_kv_lines(native_desc)
-        vendor = pick_vendor(self.vendor, name_full, self.params, native_desc, public_vendor=public_vendor)
+        return self.render(
+            currency_id=currency_id,
+            public_vendor=public_vendor,
+            param_priority=param_priority,
+            prepared=prepared,
+        ).xml
+
+    # Собирает XML offer + поля для структурной валидации (без повторного разбора XML)
+    def render(
+        self,
+        *,
+        currency_id: str = CURRENCY_ID_DEFAULT,
+        public_vendor: str = "CS",
+        param_priority: Sequence[str] | None = None,
+        prepared: PreparedOffer | None = None,
+    ) -> RenderedOffer:
+        # prepared приходит из write_cs_feed (уже посчитан при split по categoryId);
+        # при прямом вызове to_xml считаем его здесь.
+        if prepared is None:
+            prepared = prepare_offer(self, public_vendor=public_vendor)
+        name_full = prepared.name_full
+        native_desc = prepared.native_desc
+        vendor = prepared.vendor
         vendor_xml = _normalize_vendor_for_satu_xml(vendor)
         price_final = compute_price(self.price)
-
-        # categoryId — это общая Satu-таксономия проекта, поэтому резолвится в shared-слое.
-        # Если адаптер когда-нибудь задаст category_id сам, core его уважает.
-        category_id = norm_ws(self.category_id) or resolve_category_id(
-            oid=self.oid,
-            name=name_full,
-            vendor=vendor,
-            params=self.params,
-            native_desc=native_desc,
-        )
+        category_id = prepared.category_id
 
         # RAW обязан отдавать уже чистые и финальные supplier params.
         # Core не чистит, не нормализует и не перестраивает параметры под поставщика.
@@ -1694,10 +2108,14 @@ class OfferOut:
         pics = _cs_limit_pictures_for_satu_xml(self.pictures or [], 10)
         if not pics and CS_PICTURE_PLACEHOLDER_URL:
             pics = [CS_PICTURE_PLACEHOLDER_URL]
+        pics_out: list[str] = []
         for pp in pics:
-            pics_xml += f"\n<picture>{xml_escape_text(_cs_norm_url(pp))}</picture>"
+            pics_out.append(xml_escape_text(_cs_norm_url(pp)))
+            pics_xml += f"\n<picture>{pics_out[-1]}</picture>"
 
         params_xml = ""
+        param_names: list[str] = []
+        params_out: list[tuple[str, str]] = []
         for k, v in params_sorted:
             k_src = norm_ws(k)
             v_src = norm_ws(v)
@@ -1717,6 +2135,8 @@ class OfferOut:
             if not kk or not vv:
                 continue
             params_xml += f'\n<param name="{kk}">{vv}</param>'
+            param_names.append(kk)
+            params_out.append((kk, vv))
 
         # Core не знает поставщиков и не меняет supplier-specific availability.
         # Исключение только общее CS-правило: если финальной цены нет, не ставим <price>100</price>,
@@ -1727,6 +2147,7 @@ class OfferOut:
         offer_attrs = [f'id="{xml_escape_attr(self.oid)}"']
         price_xml = ""
         if price_final is None:
+            avail_effective = True
             offer_attrs.append('available="true"')
             offer_attrs.append('in_stock="true"')
         else:
@@ -1747,7 +2168,21 @@ class OfferOut:
             f"<keywords>{xml_escape_text(keywords)}</keywords>\n"
             f"</offer>"
         )
-        return out
+        return RenderedOffer(
+            xml=out,
+            oid=xml_escape_attr(self.oid),
+            vendor_code=xml_escape_text(self.oid),
+            price=int(price_final) if price_final is not None else None,
+            has_picture=bool(pics),
+            keywords=xml_escape_text(keywords),
+            param_names=tuple(param_names),
+            category_id=xml_escape_text(category_id),
+            available=avail_effective,
+            name=xml_escape_text(name_short),
+            vendor=xml_escape_text(vendor_xml) if vendor_xml else "",
+            pictures=tuple(pics_out),
+            params=tuple(params_out),
+        )
 
 # Собирает XML offer (СЫРОЙ: без enrich/clean/compat/keywords/описания-шаблона)
 # Нужен только для диагностики: "что адаптер отдал в core".
@@ -1759,47 +2194,37 @@ class OfferOut:
         *,
         currency_id: str = CURRENCY_ID_DEFAULT,
     ) -> str:
-        oid = xml_escape_attr(self.oid)
-        avail = bool_to_xml(bool(self.available))
-
-        name = xml_escape_text(fix_text(norm_ws(self.name)))
-        vendor = xml_escape_text(fix_text(norm_ws(self.vendor)))
-        category_id = norm_ws(self.category_id)
-        pi = safe_int(self.price)
-        price = int(pi) if pi is not None else 0
-
-        # native_desc сохраняем максимально как есть (только делаем безопасным для XML)
-        native_desc = fix_text(self.native_desc or "").replace("]]>", "]]&gt;")
-
-        pics_xml = ""
-        for pp in (self.pictures or []):
-            pp2 = (pp or "").strip()
-            if not pp2:
-                continue
-            pics_xml += f"\n<picture>{xml_escape_text(_cs_norm_url(pp2))}</picture>"
-
-        params_xml = ""
-        for k, v in (self.params or []):
-            kk = xml_escape_attr(norm_ws(k))
-            # сырое: не выводим служебные/отладочные параметры
-            if re.fullmatch(r"(?i)товаров:\s*\d{1,7}", kk or ""):
-                continue
-            vv = xml_escape_text(fix_text(norm_ws(v)))
-            if not kk or not vv:
-                continue
-            params_xml += f"\n<param name=\"{kk}\">{vv}</param>"
+        raw = self.to_gate_offer()
+        pics_xml = "".join(f"\n<picture>{xml_escape_text(pp)}</picture>" for pp in raw.pictures)
+        params_xml = "".join(
+            f"\n<param name=\"{xml_escape_attr(k)}\">{xml_escape_text(v)}</param>" for k, v in raw.params
+        )
 
         out = (
-            f"<offer id=\"{oid}\" available=\"{avail}\">\n"
-            f"<categoryId>{xml_escape_text(category_id)}</categoryId>\n"
+            f"<offer id=\"{xml_escape_attr(self.oid)}\" available=\"{raw.available}\">\n"
+            f"<categoryId>{xml_escape_text(raw.category_id)}</categoryId>\n"
             f"<vendorCode>{xml_escape_text(self.oid)}</vendorCode>\n"
-            f"<name>{name}</name>\n"
-            f"<price>{price}</price>"
+            f"<name>{xml_escape_text(raw.name)}</name>\n"
+            f"<price>{raw.price}</price>"
             f"{pics_xml}\n"
-            f"<vendor>{vendor}</vendor>\n"
+            f"<vendor>{xml_escape_text(raw.vendor)}</vendor>\n"
             f"<currencyId>{xml_escape_text(currency_id)}</currencyId>\n"
-            f"<description><![CDATA[\n{native_desc}]]></description>"
+            f"<description><![CDATA[{raw.description}]]></description>"
             f"{params_xml}\n"
             f"</offer>"
         )
         return out
+
+    def to_gate_offer(self) -> GateOffer:
+        """Поля raw offer без XML-экранирования — то, что quality gate раньше читал из raw-фида."""
+        return _gate_offer_cached(
+            self.oid,
+            bool(self.available),
+            self.name,
+            self.price,
+            tuple(self.pictures or ()),
+            self.vendor,
+            tuple((k, v) for k, v in (self.params or ())),
+            self.native_desc,
+            self.category_id,
+        )
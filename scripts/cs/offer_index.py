@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/cs/offer_index.py
+
+CS Offer Index — машиночитаемый sidecar к final-фиду поставщика.
+
+Что делает:
+- пишет docs/.offers/<file>.jsonl: строка-шапка + по строке на offer
+  (id, categoryId, цена, наличие, картинки, params и байтовое смещение блока в YML);
+- отдаёт downstream (build_price и т.п.) записи и абсолютные смещения без парсинга XML;
+- проверяет, что индекс описывает именно текущий файл: offers_sha256 из docs/.digests
+  или sha256 всего файла (для фидов, которые пишутся мимо write_chunks_if_changed, напр. Price).
+
+Что не делает:
+- не рендерит offers и не пишет сам фид;
+- не содержит supplier-business логики.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from .validators import RenderedOffer
+from .writer import OFFER_SEPARATOR, OUTPUT_ENCODING_DEFAULT, read_stored_digest
+
+OFFER_INDEX_DIR_NAME = ".offers"
+OFFER_INDEX_VERSION = 1
+# Шапка фида (header + FEED_META) заведомо меньше; дальше не читаем
+_HEAD_READ_LIMIT = 1 << 20
+_FEED_META_END = b"-->\n\n"
+_HASH_CHUNK_SIZE = 1 << 20
+
+def offer_index_enabled() -> bool:
+    return (os.getenv("CS_OFFER_INDEX", "1") or "1").strip().lower() not in ("0", "false", "no")
+
+def offer_index_path(feed_path: str | Path) -> Path:
+    p = Path(feed_path)
+    return p.parent / OFFER_INDEX_DIR_NAME / f"{p.name}.jsonl"
+
+@dataclass
+class OfferIndexBuilder:
+    """Копит записи по мере рендера; offset/length — байты относительно начала блока offers.
+
+    base — абсолютный offset блока offers, если его знает сам писатель (иначе ищется по FEED_META).
+    """
+    encoding: str = OUTPUT_ENCODING_DEFAULT
+    records: list[dict[str, Any]] = field(default_factory=list)
+    base: int | None = None
+    _pos: int = field(default=0, init=False, repr=False)
+
+    def add(self, rendered: RenderedOffer) -> None:
+        self.add_block(
+            rendered.xml,
+            {
+                "id": rendered.oid,
+                "vendor_code": rendered.vendor_code,
+                "category_id": rendered.category_id,
+                "name": rendered.name,
+                "vendor": rendered.vendor,
+                "price": rendered.price,
+                "available": rendered.available,
+                "in_stock": rendered.price is None,
+                "pictures": list(rendered.pictures),
+                "params": [list(kv) for kv in rendered.params],
+            },
+        )
+
+    def add_block(self, xml: str, record: dict[str, Any]) -> None:
+        """Запись для offer-блока xml; блоки идут подряд через OFFER_SEPARATOR."""
+        if self.records:
+            self._pos += len(OFFER_SEPARATOR.encode(self.encoding))
+        length = len(xml.encode(self.encoding))
+        self.records.append({**record, "offset": self._pos, "length": length})
+        self._pos += length
+
+    def write(self, feed_path: str | Path, *, offers_sha256: str = "", feed_sha256: str = "") -> Path:
+        path = offer_index_path(feed_path)
+        head: dict[str, Any] = {
+            "version": OFFER_INDEX_VERSION,
+            "feed": Path(feed_path).name,
+            "count": len(self.records),
+        }
+        if offers_sha256:
+            head["offers_sha256"] = offers_sha256
+        if feed_sha256:
+            head["feed_sha256"] = feed_sha256
+        if self.base is not None:
+            head["base"] = self.base
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as fh:
+            fh.write(json.dumps(head, ensure_ascii=False) + "\n")
+            for rec in self.records:
+                fh.write(json.dumps(rec, ensure_ascii=False, separators=(",", ":")) + "\n")
+        tmp.replace(path)
+        return path
+
+@dataclass(frozen=True)
+class OfferIndex:
+    """Прочитанный индекс: base — абсолютный байтовый offset первого offer в файле."""
+    feed_path: Path
+    base: int
+    records: list[dict[str, Any]]
+
+    def span(self, rec: dict[str, Any]) -> tuple[int, int]:
+        start = self.base + int(rec["offset"])
+        return start, start + int(rec["length"])
+
+def _offers_base(feed_path: Path) -> int | None:
+    with feed_path.open("rb") as fh:
+        head = fh.read(_HEAD_READ_LIMIT)
+    meta_at = head.find(b"<!--FEED_META")
+    if meta_at == -1:
+        return None
+    end = head.find(_FEED_META_END, meta_at)
+    return None if end == -1 else end + len(_FEED_META_END)
+
+def _file_sha256(p: Path) -> str:
+    h = hashlib.sha256()
+    with p.open("rb") as fh:
+        for chunk in iter(lambda: fh.read(_HASH_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+def _matches_feed(head: dict[str, Any], p: Path) -> bool:
+    if head.get("version") != OFFER_INDEX_VERSION:
+        return False
+    if head.get("feed_sha256"):
+        return head["feed_sha256"] == _file_sha256(p)
+    digest = read_stored_digest(p).get("offers_sha256")
+    return bool(digest) and head.get("offers_sha256") == digest
+
+def read_offer_index(feed_path: str | Path) -> OfferIndex | None:
+    """Индекс текущего фида или None, если его нет/он от другой версии файла."""
+    p = Path(feed_path)
+    path = offer_index_path(p)
+    if not p.exists() or not path.exists():
+        return None
+    try:
+        with path.open("r", encoding="utf-8") as fh:
+            head = json.loads(fh.readline())
+            if not _matches_feed(head, p):
+                return None
+            records = [json.loads(line) for line in fh if line.strip()]
+    except (OSError, ValueError, AttributeError):
+        return None
+    if len(records) != int(head.get("count", -1)):
+        return None
+    base = int(head["base"]) if "base" in head else _offers_base(p)
+    if base is None:
+        return None
+    return OfferIndex(feed_path=p, base=base, records=records)
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/cs/qg_engine.py
+
+CS Quality Gate Engine — общий движок supplier-правил quality gate.
+
+Что делает:
+- держит общий QualityIssue и GateOffer (значения offer так, как их видит XML-парсер raw-фида);
+- прогоняет зарегистрированные supplier-правила по offers за один проход;
+- берёт offers из памяти (OfferOut.to_gate_offer) или потоково парсит raw-фид, если in-memory списка нет;
+- после прохода по offers из памяти сбрасывает кэш GateOffer в core (гейт — его последний потребитель);
+- считает время и число срабатываний по каждому правилу.
+
+Что не делает:
+- не содержит supplier-правил и baseline-политики (они в suppliers/<x>/quality_gate.py);
+- не пишет отчёт (это cs/qg_report.py).
+"""
+from __future__ import annotations
+
+import os
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator, Sequence
+
+SOURCE_MEMORY = "memory"
+SOURCE_FEED = "feed"
+
+
+@dataclass(frozen=True)
+class QualityIssue:
+    severity: str
+    rule: str
+    oid: str
+    name: str
+    details: str
+
+
+@dataclass(frozen=True, slots=True)
+class GateOffer:
+    """Offer raw-фида без XML-экранирования: ровно то, что вернул бы ElementTree."""
+
+    oid: str
+    available: str
+    category_id: str
+    name: str
+    price: str
+    vendor: str
+    description: str
+    pictures: tuple[str, ...] = ()
+    params: tuple[tuple[str, str], ...] = ()
+
+
+def qg_in_memory_enabled() -> bool:
+    return (os.getenv("CS_QG_IN_MEMORY", "1") or "1").strip().lower() not in ("0", "false", "no")
+
+
+def _elem_text(el: ET.Element | None) -> str:
+    if el is None:
+        return ""
+    return "".join(el.itertext())
+
+
+def gate_offer_from_element(offer_el: ET.Element) -> GateOffer:
+    return GateOffer(
+        oid=offer_el.get("id") or "",
+        available=offer_el.get("available") or "",
+        category_id=offer_el.findtext("categoryId") or "",
+        name=offer_el.findtext("name") or "",
+        price=offer_el.findtext("price") or "",
+        vendor=offer_el.findtext("vendor") or "",
+        description=offer_el.findtext("description") or "",
+        pictures=tuple(_elem_text(p) for p in offer_el.findall("picture")),
+        params=tuple((p.get("name") or "", _elem_text(p)) for p in offer_el.findall("param")),
+    )
+
+
+def iter_gate_offers_from_feed(feed_path: str | Path) -> Iterator[GateOffer]:
+    """Потоковый разбор raw-фида: в памяти держим один offer, а не всё дерево."""
+    with open(feed_path, "r", encoding="utf-8", errors="ignore") as fh:
+        for _event, elem in ET.iterparse(fh, events=("end",)):
+            if elem.tag != "offer":
+                continue
+            yield gate_offer_from_element(elem)
+            elem.clear()
+
+
+def iter_gate_offers(feed_path: str | Path, offers: Sequence[Any] | None = None) -> tuple[str, Iterable[GateOffer]]:
+    """Источник offers для гейта: OfferOut из памяти, иначе raw-фид с диска."""
+    if offers is not None and qg_in_memory_enabled():
+        return SOURCE_MEMORY, (offer.to_gate_offer() for offer in offers)
+    return SOURCE_FEED, iter_gate_offers_from_feed(feed_path)
+
+
+RuleFn = Callable[[Any], "list[QualityIssue] | None"]
+
+
+@dataclass(frozen=True)
+class RuleStat:
+    rule: str
+    seconds: float
+    hits: int
+
+
+@dataclass(frozen=True)
+class QualityRunResult:
+    issues: list[QualityIssue]
+    offer_count: int
+    source: str
+    seconds: float
+    prepare_seconds: float
+    rules: tuple[RuleStat, ...]
+
+    def describe(self) -> str:
+        parts = [f"offers={self.offer_count}", f"source={self.source}", f"total={self.seconds * 1000:.0f}ms"]
+        parts.append(f"prepare={self.prepare_seconds * 1000:.0f}ms")
+        for stat in self.rules:
+            parts.append(f"{stat.rule}={stat.seconds * 1000:.0f}ms/{stat.hits}")
+        return " | ".join(parts)
+
+
+class QualityRuleEngine:
+    """
+    Реестр supplier-правил.
+
+    prepare(offer) один раз на offer собирает supplier-контекст (нормализованные name/params и т.п.),
+    правила получают этот контекст и возвращают список QualityIssue (или None).
+    Порядок issues = порядок offers x порядок регистрации правил, как в прежних _detect_issues;
+    дедупликация и сортировка остаются за supplier-слоем.
+    """
+
+    def __init__(self, supplier: str, prepare: Callable[[GateOffer], Any] | None = None) -> None:
+        self.supplier = supplier
+        self.prepare = prepare
+        self._rules: list[tuple[str, RuleFn]] = []
+
+    def rule(self, name: str) -> Callable[[RuleFn], RuleFn]:
+        def _register(fn: RuleFn) -> RuleFn:
+            if any(existing == name for existing, _fn in self._rules):
+                raise ValueError(f"{self.supplier}: правило {name!r} уже зарегистрировано")
+            self._rules.append((name, fn))
+            return fn
+
+        return _register
+
+    @property
+    def rule_names(self) -> tuple[str, ...]:
+        return tuple(name for name, _fn in self._rules)
+
+    def run(
+        self,
+        offers: Iterable[GateOffer],
+        *,
+        source: str = SOURCE_FEED,
+        prepare: Callable[[GateOffer], Any] | None = None,
+    ) -> QualityRunResult:
+        """prepare переопределяет self.prepare на один прогон (напр. контекст с настройками из schema)."""
+        clock = time.perf_counter
+        started = clock()
+        rules = list(self._rules)
+        seconds = [0.0] * len(rules)
+        hits = [0] * len(rules)
+        prepare_seconds = 0.0
+        prepare = prepare or self.prepare
+        issues: list[QualityIssue] = []
+        offer_count = 0
+
+        for offer in offers:
+            offer_count += 1
+            if prepare is not None:
+                t0 = clock()
+                ctx = prepare(offer)
+                prepare_seconds += clock() - t0
+            else:
+                ctx = offer
+            for i, (_name, fn) in enumerate(rules):
+                t0 = clock()
+                found = fn(ctx)
+                seconds[i] += clock() - t0
+                if found:
+                    hits[i] += len(found)
+                    issues.extend(found)
+
+        return QualityRunResult(
+            issues=issues,
+            offer_count=offer_count,
+            source=source,
+            seconds=clock() - started,
+            prepare_seconds=prepare_seconds,
+            rules=tuple(RuleStat(name, seconds[i], hits[i]) for i, (name, _fn) in enumerate(rules)),
+        )
+
+    def run_feed(
+        self,
+        feed_path: str | Path,
+        offers: Sequence[Any] | None = None,
+        *,
+        prepare: Callable[[GateOffer], Any] | None = None,
+    ) -> QualityRunResult:
+        """Прогон правил по in-memory offers (если переданы) или по raw-фиду; печатает статистику правил."""
+        source, gate_offers = iter_gate_offers(feed_path, offers)
+        try:
+            result = self.run(gate_offers, source=source, prepare=prepare)
+        finally:
+            if source == SOURCE_MEMORY:
+                # core импортирует этот модуль, поэтому импорт — здесь, а не на уровне модуля
+                from .core import clear_gate_offer_cache
+
+                clear_gate_offer_cache()
+        print(f"[{self.supplier}] quality gate rules: {result.describe()}")
+        return result
@@ -15,6 +15,7 @@ CS Util — shared helper layer.
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 from typing import Any
 
 # -----------------------------
@@ -23,9 +24,9 @@ from typing import Any
 
 _RE_WS = re.compile(r"\s+")
 _RE_INT = re.compile(r"-?\d+")
-_RE_CYR = re.compile(r"[А-Яа-яЁё]")
 _RE_LAT = re.compile(r"[A-Za-z]")
 _RE_MIXED_TOKEN = re.compile(r"[A-Za-zА-Яа-яЁё]{2,}")
+_RE_MIXED_PAIR = re.compile(r"[A-Za-z][А-Яа-яЁё]|[А-Яа-яЁё][A-Za-z]")
 
 # Визуально похожие LAT -> CYR для смешанных токенов.
 _LAT_TO_CYR = {
@@ -85,33 +86,54 @@ _CYR_TO_LAT = {
 # Text helpers
 # -----------------------------
 
+# str.translate-таблицы вместо посимвольных dict.get в Python-цикле.
+_LAT_TO_CYR_TABLE = str.maketrans(_LAT_TO_CYR)
+_CYR_TO_LAT_TABLE = str.maketrans(_CYR_TO_LAT)
+_DROP_LAT_TABLE = str.maketrans(
+    "", "", "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz"
+)
+
+# LRU только для коротких строк (имена params, vendor, значения):
+# длинные описания почти не повторяются и только вымывали бы кэш.
+_NORM_WS_CACHE_MAX_LEN = 64
+_NORM_WS_CACHE_SIZE = 8192
+
+def _fix_mixed_token(m: re.Match[str]) -> str:
+    tok = m.group(0)
+    if tok.isascii() or not _RE_LAT.search(tok):
+        return tok
+    # Токен состоит только из A-Za-z/кириллицы: всё, что не латиница, — кириллица.
+    cyr_cnt = len(tok.translate(_DROP_LAT_TABLE))
+    lat_cnt = len(tok) - cyr_cnt
+
+    # LAT-перевес считаем техно-токеном/аббревиатурой.
+    if lat_cnt >= cyr_cnt:
+        return tok.translate(_CYR_TO_LAT_TABLE)
+    return tok.translate(_LAT_TO_CYR_TABLE)
+
 def fix_mixed_cyr_lat(s: str) -> str:
     """Чинит смешение кириллицы/латиницы в одном токене."""
-    if not s:
+    if not s or s.isascii():
         return s
+    # Смешанный токен обязательно содержит соседние LAT+CYR буквы:
+    # нет такой пары — нет и токенов для правки, sub с callback не нужен.
+    if not _RE_MIXED_PAIR.search(s):
+        return s
+    return _RE_MIXED_TOKEN.sub(_fix_mixed_token, s)
 
-    def _fix_token(m: re.Match[str]) -> str:
-        tok = m.group(0)
-        has_cyr = bool(_RE_CYR.search(tok))
-        has_lat = bool(_RE_LAT.search(tok))
-        if not (has_cyr and has_lat):
-            return tok
-
-        lat_cnt = sum(("A" <= ch <= "Z") or ("a" <= ch <= "z") for ch in tok)
-        cyr_cnt = sum(bool(_RE_CYR.match(ch)) for ch in tok)
-
-        # LAT-перевес считаем техно-токеном/аббревиатурой.
-        if lat_cnt >= cyr_cnt:
-            return "".join(_CYR_TO_LAT.get(ch, ch) for ch in tok)
-        return "".join(_LAT_TO_CYR.get(ch, ch) for ch in tok)
+def _norm_ws_impl(s: str) -> str:
+    # str.split() режет по тем же unicode-пробелам, что и \s (включая NBSP).
+    return fix_mixed_cyr_lat(" ".join(s.split()))
 
-    return _RE_MIXED_TOKEN.sub(_fix_token, s)
+_norm_ws_cached = lru_cache(maxsize=_NORM_WS_CACHE_SIZE)(_norm_ws_impl)
 
 def norm_ws(s: str) -> str:
     """Нормализует пробелы и правит смешанную кир/лат."""
-    text = (s or "").replace("\u00a0", " ").strip()
-    text = _RE_WS.sub(" ", text).strip()
-    return fix_mixed_cyr_lat(text)
+    if not s:
+        return ""
+    if len(s) <= _NORM_WS_CACHE_MAX_LEN:
+        return _norm_ws_cached(s)
+    return _norm_ws_impl(s)
 
 def safe_int(s: Any) -> int | None:
     """Безопасно парсит int из строки: берёт первое целое."""
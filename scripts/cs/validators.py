@@ -15,6 +15,7 @@ CS Validators — final feed validation layer.
 from __future__ import annotations
 
 import re
+from dataclasses import dataclass
 
 from .util import norm_ws, safe_int
 
@@ -25,130 +26,204 @@ from .util import norm_ws, safe_int
 _RE_HASH_LIKE_OID = re.compile(r"^[A-Z]{2}H[0-9A-F]{10}$")
 
 # -----------------------------
-# Public API
+# Структурированный результат рендера
 # -----------------------------
 
-def validate_cs_yml(xml: str, *, param_drop_default_cf: set[str]) -> None:
-    """Проверить уже собранный CS-фид и бросить ValueError при ошибках."""
-    errors: list[str] = []
-
-    # -----------------------------
-    # Глобальные запреты
-    # -----------------------------
-    if "<available>" in xml:
-        errors.append('Найден тег <available> (должен быть только available="true/false" в <offer>).')
-
-    if re.search(r"\bShuko\b", xml, flags=re.I):
-        errors.append("Найдено слово 'Shuko' (нужно 'Schuko').")
-
-    drop_names = {norm_ws(x).casefold() for x in (param_drop_default_cf or set()) if norm_ws(x)}
-
-    # -----------------------------
-    # Состояние текущего offer
-    # -----------------------------
-    in_offer = False
-    offer_id = ""
-    has_picture = False
-    vendor_code = ""
-    keywords = ""
-    price_ok = True
-
-    ids_seen: set[str] = set()
-    dup_ids: list[str] = []
-    hash_like_ids: list[str] = []
-    bad_no_pic: list[str] = []
-    bad_vendorcode: list[str] = []
-    bad_keywords: list[str] = []
-    bad_params: list[str] = []
-    bad_price: list[str] = []
-
-    # -----------------------------
-    # Построчный разбор готового XML
-    # -----------------------------
-    for line in xml.splitlines():
-        s = line.strip()
+@dataclass(frozen=True)
+class RenderedOffer:
+    """Итог OfferOut.render(): готовый XML offer + поля, которые проверяет валидатор.
+
+    Строковые поля хранятся в том же (XML-экранированном) виде, в каком они попадают
+    в фид, чтобы структурная проверка совпадала с текстовой.
+    """
+    xml: str
+    oid: str
+    vendor_code: str
+    price: int | None
+    has_picture: bool
+    keywords: str
+    param_names: tuple[str, ...]
+    # Для offer index (sidecar рядом с фидом): те же значения, что попали в XML
+    category_id: str = ""
+    available: bool = False
+    name: str = ""
+    vendor: str = ""
+    pictures: tuple[str, ...] = ()
+    params: tuple[tuple[str, str], ...] = ()
 
-        if s.startswith("<offer ") and 'id="' in s:
-            in_offer = True
-            has_picture = False
-            vendor_code = ""
-            keywords = ""
-            price_ok = True
+# -----------------------------
+# Public API
+# -----------------------------
 
+class CsYmlValidator:
+    """Потоковая проверка CS-фида, в конце finish().
+
+    Два режима с общими правилами и сообщениями:
+    - feed(chunk): текст, куски режутся по границам строк (внешние файлы);
+    - feed_offer(RenderedOffer) + scan_text(chunk): структурно, по полям рендера.
+    """
+
+    def __init__(self, *, param_drop_default_cf: set[str]) -> None:
+        self.drop_names = {norm_ws(x).casefold() for x in (param_drop_default_cf or set()) if norm_ws(x)}
+
+        self.has_available_tag = False
+        self.has_shuko = False
+
+        # Состояние текущего offer
+        self.in_offer = False
+        self.offer_id = ""
+        self.has_picture = False
+        self.vendor_code = ""
+        self.keywords = ""
+        self.price_ok = True
+
+        self.ids_seen: set[str] = set()
+        self.dup_ids: list[str] = []
+        self.hash_like_ids: list[str] = []
+        self.bad_no_pic: list[str] = []
+        self.bad_vendorcode: list[str] = []
+        self.bad_keywords: list[str] = []
+        self.bad_params: list[str] = []
+        self.bad_price: list[str] = []
+
+    def _reset_offer(self) -> None:
+        self.in_offer = False
+        self.offer_id = ""
+        self.has_picture = False
+        self.vendor_code = ""
+        self.keywords = ""
+        self.price_ok = True
+
+    def scan_text(self, chunk: str) -> None:
+        """Только глобальные запреты по тексту (без построчного разбора offers)."""
+        if not self.has_available_tag and "<available>" in chunk:
+            self.has_available_tag = True
+
+        if not self.has_shuko and re.search(r"\bShuko\b", chunk, flags=re.I):
+            self.has_shuko = True
+
+    def feed(self, chunk: str) -> None:
+        """Текстовый режим: глобальные запреты + построчный разбор готового XML."""
+        self.scan_text(chunk)
+        for line in chunk.splitlines():
+            self._feed_line(line.strip())
+
+    def feed_offer(self, offer: RenderedOffer) -> None:
+        """Структурный режим: те же проверки offer по полям рендера, без разбора XML.
+
+        Глобальные запреты (<available>, Shuko) проверяются отдельно через scan_text().
+        """
+        self._start_offer(offer.oid)
+        for name in offer.param_names:
+            self._check_param(name)
+        self.has_picture = offer.has_picture
+        self.vendor_code = offer.vendor_code.strip()
+        self.keywords = offer.keywords.strip()
+        self.price_ok = offer.price is None or offer.price >= 100
+        self._finish_offer()
+
+    def _start_offer(self, offer_id: str) -> None:
+        self._reset_offer()
+        self.in_offer = True
+        self.offer_id = offer_id
+        if self.offer_id:
+            if self.offer_id in self.ids_seen:
+                self.dup_ids.append(self.offer_id)
+            self.ids_seen.add(self.offer_id)
+            if _RE_HASH_LIKE_OID.fullmatch(self.offer_id):
+                self.hash_like_ids.append(self.offer_id)
+
+    def _check_param(self, raw_name: str) -> None:
+        param_name = norm_ws(raw_name)
+        if param_name and param_name.casefold() in self.drop_names:
+            self.bad_params.append(f"{self.offer_id}: запрещённый param '{param_name}'")
+
+    def _finish_offer(self) -> None:
+        if self.offer_id:
+            if not self.has_picture:
+                self.bad_no_pic.append(self.offer_id)
+            if not self.vendor_code or self.vendor_code != self.offer_id:
+                self.bad_vendorcode.append(self.offer_id)
+            if not self.keywords:
+                self.bad_keywords.append(self.offer_id)
+            if not self.price_ok:
+                self.bad_price.append(self.offer_id)
+        self._reset_offer()
+
+    def _feed_line(self, s: str) -> None:
+        if s.startswith("<offer ") and 'id="' in s:
             m = re.search(r'id="([^"]+)"', s)
-            offer_id = m.group(1) if m else ""
-            if offer_id:
-                if offer_id in ids_seen:
-                    dup_ids.append(offer_id)
-                ids_seen.add(offer_id)
-                if _RE_HASH_LIKE_OID.fullmatch(offer_id):
-                    hash_like_ids.append(offer_id)
-            continue
-
-        if not in_offer:
-            continue
+            self._start_offer(m.group(1) if m else "")
+            return
+
+        if not self.in_offer:
+            return
 
         if s.startswith("<picture>") and s.endswith("</picture>"):
-            has_picture = True
-            continue
+            self.has_picture = True
+            return
 
         if s.startswith("<vendorCode>") and s.endswith("</vendorCode>"):
-            vendor_code = re.sub(r"^<vendorCode>|</vendorCode>$", "", s).strip()
-            continue
+            self.vendor_code = re.sub(r"^<vendorCode>|</vendorCode>$", "", s).strip()
+            return
 
         if s.startswith("<keywords>") and s.endswith("</keywords>"):
-            keywords = re.sub(r"^<keywords>|</keywords>$", "", s).strip()
-            continue
+            self.keywords = re.sub(r"^<keywords>|</keywords>$", "", s).strip()
+            return
 
         if s.startswith("<price>") and s.endswith("</price>"):
             price_val = re.sub(r"^<price>|</price>$", "", s).strip()
             price_num = safe_int(price_val)
-            price_ok = price_num is not None and price_num >= 100
-            continue
+            self.price_ok = price_num is not None and price_num >= 100
+            return
 
         if s.startswith("<param ") and 'name="' in s:
             m_name = re.search(r'name="([^"]+)"', s)
-            param_name = norm_ws(m_name.group(1) if m_name else "")
-            if param_name and param_name.casefold() in drop_names:
-                bad_params.append(f"{offer_id}: запрещённый param '{param_name}'")
-            continue
+            self._check_param(m_name.group(1) if m_name else "")
+            return
 
         if s == "</offer>":
-            if offer_id:
-                if not has_picture:
-                    bad_no_pic.append(offer_id)
-                if not vendor_code or vendor_code != offer_id:
-                    bad_vendorcode.append(offer_id)
-                if not keywords:
-                    bad_keywords.append(offer_id)
-                if not price_ok:
-                    bad_price.append(offer_id)
-
-            in_offer = False
-            offer_id = ""
-            has_picture = False
-            vendor_code = ""
-            keywords = ""
-            price_ok = True
-            continue
-
-    # -----------------------------
-    # Сборка финальных ошибок
-    # -----------------------------
-    if dup_ids:
-        errors.append("Дублирующиеся offer id: " + ", ".join(dup_ids[:20]))
-    if hash_like_ids:
-        errors.append("Подозрительные hash-like offer id: " + ", ".join(hash_like_ids[:20]))
-    if bad_no_pic:
-        errors.append("Офферы без picture: " + ", ".join(bad_no_pic[:20]))
-    if bad_vendorcode:
-        errors.append("vendorCode отсутствует или не совпадает с offer id: " + ", ".join(bad_vendorcode[:20]))
-    if bad_keywords:
-        errors.append("Офферы без keywords: " + ", ".join(bad_keywords[:20]))
-    if bad_params:
-        errors.append("В финал просочились запрещённые params: " + "; ".join(bad_params[:20]))
-    if bad_price:
-        errors.append("Офферы с невалидной price: " + ", ".join(bad_price[:20]))
-
-    if errors:
-        raise ValueError("\n".join(errors))
+            self._finish_offer()
+            return
+
+    def errors(self) -> list[str]:
+        errors: list[str] = []
+        if self.has_available_tag:
+            errors.append('Найден тег <available> (должен быть только available="true/false" в <offer>).')
+        if self.has_shuko:
+            errors.append("Найдено слово 'Shuko' (нужно 'Schuko').")
+
+        # -----------------------------
+        # Сборка финальных ошибок
+        # -----------------------------
+        if self.dup_ids:
+            errors.append("Дублирующиеся offer id: " + ", ".join(self.dup_ids[:20]))
+        if self.hash_like_ids:
+            errors.append("Подозрительные hash-like offer id: " + ", ".join(self.hash_like_ids[:20]))
+        if self.bad_no_pic:
+            errors.append("Офферы без picture: " + ", ".join(self.bad_no_pic[:20]))
+        if self.bad_vendorcode:
+            errors.append("vendorCode отсутствует или не совпадает с offer id: " + ", ".join(self.bad_vendorcode[:20]))
+        if self.bad_keywords:
+            errors.append("Офферы без keywords: " + ", ".join(self.bad_keywords[:20]))
+        if self.bad_params:
+            errors.append("В финал просочились запрещённые params: " + "; ".join(self.bad_params[:20]))
+        if self.bad_price:
+            errors.append("Офферы с невалидной price: " + ", ".join(self.bad_price[:20]))
+        return errors
+
+    def finish(self) -> None:
+        """Бросить ValueError, если за весь поток накопились ошибки."""
+        errors = self.errors()
+        if errors:
+            raise ValueError("\n".join(errors))
+
+
+def validate_cs_yml(xml: str, *, param_drop_default_cf: set[str]) -> None:
+    """Проверить уже собранный CS-фид (текстом) и бросить ValueError при ошибках.
+
+    Нужен для внешних/уже записанных файлов; внутри сборки используется структурный режим.
+    """
+    validator = CsYmlValidator(param_drop_default_cf=param_drop_default_cf)
+    validator.feed(xml)
+    validator.finish()
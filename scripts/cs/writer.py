@@ -14,14 +14,47 @@ CS Writer — XML/YML assembly and file writing layer.
 """
 from __future__ import annotations
 
+import hashlib
+import json
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime
+from functools import partial
 from pathlib import Path
-from typing import Sequence
+from typing import Callable, Iterable, Iterator, Sequence
 
 OUTPUT_ENCODING_DEFAULT = "utf-8"
 CURRENCY_ID_DEFAULT = "KZT"
 
+# Sidecar с digest последней записи: docs/.digests/<file>.json
+DIGEST_DIR_NAME = ".digests"
+# Разделитель между offers в фиде (offer index считает по нему байтовые смещения)
+OFFER_SEPARATOR = "\n\n"
+_HASH_CHUNK_SIZE = 1 << 20
+
+# Параллельный рендер offers (opt-in): CS_RENDER_WORKERS=N, N>1 включает ProcessPoolExecutor.
+# Маленькие фиды (< CS_RENDER_MIN_OFFERS) всегда рендерятся последовательно.
+CS_RENDER_MIN_OFFERS_DEFAULT = 500
+CS_RENDER_CHUNK_DEFAULT = 100
+
+# Строки FEED_META, которые меняются каждый запуск и не считаются изменением фида
+VOLATILE_META_LABELS = (
+    "Время сборки (Алматы)",
+    "Ближайшая сборка (Алматы)",
+    "Подготовка offers в core (сек)",
+)
+_RE_VOLATILE_CATALOG_DATE = re.compile(r'(<yml_catalog date=")[^"]*(")')
+_RE_VOLATILE_META_LINE = re.compile(
+    r"(?m)^(" + "|".join(re.escape(x) for x in VOLATILE_META_LABELS) + r")\s*\|.*$"
+)
+
+# Статусы записи фида
+FEED_STATUS_OFFERS = "offers"        # изменились offers
+FEED_STATUS_META = "meta"            # offers те же, изменились неволатильные поля шапки
+FEED_STATUS_UNCHANGED = "unchanged"  # отличаются только volatile-поля (или ничего) — файл не трогаем
+
 # -----------------------------
 # XML / HTML escape helpers
 # -----------------------------
@@ -89,6 +122,7 @@ def make_feed_meta(
     after: int,
     in_true: int,
     in_false: int,
+    extra: Sequence[tuple[str, str]] | None = None,
 ) -> str:
     lines = [
         "<!--FEED_META",
@@ -100,43 +134,116 @@ def make_feed_meta(
         f"Сколько товаров у поставщика после фильтра | {after}",
         f"Сколько товаров есть в наличии (true)      | {in_true}",
         f"Сколько товаров нет в наличии (false)      | {in_false}",
-        "-->",
     ]
+    # Дополнительные служебные строки (тайминги core и т.п.) — в том же формате "ключ | значение"
+    for label, value in extra or []:
+        lines.append(f"{label:<42} | {value}")
+    lines.append("-->")
     return "\n".join(lines)
 
 # -----------------------------
 # Внутренние helper'ы
 # -----------------------------
 
-def _build_offers_xml_final(
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int((os.getenv(name, "") or "").strip() or default)
+    except ValueError:
+        return default
+
+def _render_offers_chunk(
     offers: Sequence["OfferOut"],
     *,
     currency_id: str,
     public_vendor: str,
     param_priority: Sequence[str] | None,
-) -> str:
-    if not offers:
-        return ""
-    return "\n\n".join(
-        o.to_xml(
+) -> list["RenderedOffer"]:
+    # Выполняется в worker-процессе: рендер offer — чистая функция от OfferOut/PreparedOffer
+    return [
+        o.render(
             currency_id=currency_id,
             public_vendor=public_vendor,
             param_priority=param_priority,
         )
         for o in offers
+    ]
+
+def _iter_offers_xml_parallel(
+    offers: Sequence["OfferOut"],
+    *,
+    workers: int,
+    chunk_size: int,
+    currency_id: str,
+    public_vendor: str,
+    param_priority: Sequence[str] | None,
+) -> Iterator["RenderedOffer"]:
+    render = partial(
+        _render_offers_chunk,
+        currency_id=currency_id,
+        public_vendor=public_vendor,
+        param_priority=list(param_priority) if param_priority is not None else None,
     )
+    chunks = [list(offers[i : i + chunk_size]) for i in range(0, len(offers), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # map() отдаёт результаты в порядке chunks — порядок offers сохраняется
+        for rendered in pool.map(render, chunks):
+            yield from rendered
 
-def _build_offers_xml_raw(
+def _iter_offers_rendered_final(
     offers: Sequence["OfferOut"],
     *,
     currency_id: str,
-) -> str:
-    if not offers:
-        return ""
-    return "\n\n".join(o.to_xml_raw(currency_id=currency_id) for o in offers)
+    public_vendor: str,
+    param_priority: Sequence[str] | None,
+) -> Iterator["RenderedOffer"]:
+    workers = _env_int("CS_RENDER_WORKERS", 0)
+    min_offers = _env_int("CS_RENDER_MIN_OFFERS", CS_RENDER_MIN_OFFERS_DEFAULT)
+    if workers > 1 and len(offers) >= max(1, min_offers):
+        chunk_size = max(1, _env_int("CS_RENDER_CHUNK", CS_RENDER_CHUNK_DEFAULT))
+        yield from _iter_offers_xml_parallel(
+            offers,
+            workers=workers,
+            chunk_size=chunk_size,
+            currency_id=currency_id,
+            public_vendor=public_vendor,
+            param_priority=param_priority,
+        )
+        return
+    for o in offers:
+        yield o.render(
+            currency_id=currency_id,
+            public_vendor=public_vendor,
+            param_priority=param_priority,
+        )
+
+def _iter_offers_xml_final(
+    offers: Sequence["OfferOut"],
+    *,
+    currency_id: str,
+    public_vendor: str,
+    param_priority: Sequence[str] | None,
+    on_offer: Callable[["RenderedOffer"], None] | None = None,
+) -> Iterator[str]:
+    for rendered in _iter_offers_rendered_final(
+        offers,
+        currency_id=currency_id,
+        public_vendor=public_vendor,
+        param_priority=param_priority,
+    ):
+        if on_offer is not None:
+            on_offer(rendered)
+        yield rendered.xml
 
-def _build_feed_xml(
-    offers_xml: str,
+def _iter_offers_xml_raw(
+    offers: Sequence["OfferOut"],
+    *,
+    currency_id: str,
+) -> Iterator[str]:
+    for o in offers:
+        yield o.to_xml_raw(currency_id=currency_id)
+
+def _iter_feed_xml(
+    offers_xml: Iterable[str],
     *,
     supplier: str,
     supplier_url: str,
@@ -147,7 +254,13 @@ def _build_feed_xml(
     in_true: int,
     in_false: int,
     encoding: str,
-) -> str:
+    extra_meta: Sequence[tuple[str, str]] | None = None,
+) -> Iterator[str]:
+    """Отдаёт фид кусками: header+FEED_META, затем по одному offer, затем footer.
+
+    Куски режутся по границам строк, а разделители совпадают с тем, что раньше
+    давал ensure_footer_spacing(), поэтому склейка кусков байт-в-байт равна старому XML.
+    """
     meta = make_feed_meta(
         supplier=supplier,
         supplier_url=supplier_url,
@@ -157,15 +270,20 @@ def _build_feed_xml(
         after=after,
         in_true=in_true,
         in_false=in_false,
+        extra=extra_meta,
     )
-    xml = make_header(build_time, encoding=encoding) + "\n" + meta + "\n\n" + offers_xml + "\n\n" + make_footer()
-    return ensure_footer_spacing(xml)
+    yield make_header(build_time, encoding=encoding) + "\n" + meta + "\n\n"
+    first = True
+    for offer_xml in offers_xml:
+        yield offer_xml if first else OFFER_SEPARATOR + offer_xml
+        first = False
+    yield make_footer() if first else OFFER_SEPARATOR + make_footer()
 
 # -----------------------------
 # Сборка final / raw XML
 # -----------------------------
 
-def build_cs_feed_xml(
+def iter_cs_feed_xml(
     offers: Sequence["OfferOut"],
     *,
     supplier: str,
@@ -177,17 +295,21 @@ def build_cs_feed_xml(
     public_vendor: str = "CS",
     currency_id: str = CURRENCY_ID_DEFAULT,
     param_priority: Sequence[str] | None = None,
-) -> str:
+    extra_meta: Sequence[tuple[str, str]] | None = None,
+    on_offer: Callable[["RenderedOffer"], None] | None = None,
+) -> Iterator[str]:
+    """Final-фид кусками; on_offer получает структурный RenderedOffer каждого offer (для валидатора)."""
     after = len(offers)
     in_true = sum(1 for o in offers if getattr(o, "available", False))
     in_false = after - in_true
-    offers_xml = _build_offers_xml_final(
+    offers_xml = _iter_offers_xml_final(
         offers,
         currency_id=currency_id,
         public_vendor=public_vendor,
         param_priority=param_priority,
+        on_offer=on_offer,
     )
-    return _build_feed_xml(
+    return _iter_feed_xml(
         offers_xml,
         supplier=supplier,
         supplier_url=supplier_url,
@@ -198,9 +320,10 @@ def build_cs_feed_xml(
         in_true=in_true,
         in_false=in_false,
         encoding=encoding,
+        extra_meta=extra_meta,
     )
 
-def build_cs_feed_xml_raw(
+def iter_cs_feed_xml_raw(
     offers: Sequence["OfferOut"],
     *,
     supplier: str,
@@ -210,12 +333,12 @@ def build_cs_feed_xml_raw(
     before: int,
     encoding: str = OUTPUT_ENCODING_DEFAULT,
     currency_id: str = CURRENCY_ID_DEFAULT,
-) -> str:
+) -> Iterator[str]:
     after = len(offers)
     in_true = sum(1 for o in offers if getattr(o, "available", False))
     in_false = after - in_true
-    offers_xml = _build_offers_xml_raw(offers, currency_id=currency_id)
-    return _build_feed_xml(
+    offers_xml = _iter_offers_xml_raw(offers, currency_id=currency_id)
+    return _iter_feed_xml(
         offers_xml,
         supplier=supplier,
         supplier_url=supplier_url,
@@ -228,22 +351,221 @@ def build_cs_feed_xml_raw(
         encoding=encoding,
     )
 
+def build_cs_feed_xml(
+    offers: Sequence["OfferOut"],
+    *,
+    supplier: str,
+    supplier_url: str,
+    build_time: datetime,
+    next_run: datetime,
+    before: int,
+    encoding: str = OUTPUT_ENCODING_DEFAULT,
+    public_vendor: str = "CS",
+    currency_id: str = CURRENCY_ID_DEFAULT,
+    param_priority: Sequence[str] | None = None,
+    extra_meta: Sequence[tuple[str, str]] | None = None,
+) -> str:
+    xml = "".join(
+        iter_cs_feed_xml(
+            offers,
+            supplier=supplier,
+            supplier_url=supplier_url,
+            build_time=build_time,
+            next_run=next_run,
+            before=before,
+            encoding=encoding,
+            public_vendor=public_vendor,
+            currency_id=currency_id,
+            param_priority=param_priority,
+            extra_meta=extra_meta,
+        )
+    )
+    return ensure_footer_spacing(xml)
+
+def build_cs_feed_xml_raw(
+    offers: Sequence["OfferOut"],
+    *,
+    supplier: str,
+    supplier_url: str,
+    build_time: datetime,
+    next_run: datetime,
+    before: int,
+    encoding: str = OUTPUT_ENCODING_DEFAULT,
+    currency_id: str = CURRENCY_ID_DEFAULT,
+) -> str:
+    xml = "".join(
+        iter_cs_feed_xml_raw(
+            offers,
+            supplier=supplier,
+            supplier_url=supplier_url,
+            build_time=build_time,
+            next_run=next_run,
+            before=before,
+            encoding=encoding,
+            currency_id=currency_id,
+        )
+    )
+    return ensure_footer_spacing(xml)
+
 # -----------------------------
 # Запись файла
 # -----------------------------
 
-def write_if_changed(path: str, data: str, *, encoding: str = OUTPUT_ENCODING_DEFAULT) -> bool:
-    """Перезаписывает файл только если контент реально изменился."""
+@dataclass(frozen=True)
+class FeedWriteResult:
+    """Итог записи фида. bool(result) == True, если файл на диске перезаписан."""
+    path: str
+    status: str
+    offers_sha256: str
+
+    @property
+    def written(self) -> bool:
+        return self.status != FEED_STATUS_UNCHANGED
+
+    @property
+    def offers_changed(self) -> bool:
+        return self.status == FEED_STATUS_OFFERS
+
+    def __bool__(self) -> bool:
+        return self.written
+
+    def describe(self) -> str:
+        labels = {
+            FEED_STATUS_OFFERS: "offers changed",
+            FEED_STATUS_META: "meta-only",
+            FEED_STATUS_UNCHANGED: "unchanged",
+        }
+        return f"{labels.get(self.status, self.status)} | file={self.path}"
+
+def strip_volatile_meta(text: str) -> str:
+    """Убирает из шапки фида значения, которые меняются каждый запуск (дата, время сборки, тайминги)."""
+    text = _RE_VOLATILE_CATALOG_DATE.sub(r"\1\2", text)
+    return _RE_VOLATILE_META_LINE.sub(r"\1 |", text)
+
+def read_stored_digest(p: Path) -> dict[str, str]:
+    """Digest из sidecar docs/.digests/<file>.json, если он описывает текущий файл (иначе {})."""
+    if not p.exists():
+        return {}
+    stored, _ = _check_stored_digest(p)
+    return stored
+
+def _digest_path(p: Path) -> Path:
+    return p.parent / DIGEST_DIR_NAME / f"{p.name}.json"
+
+def _check_stored_digest(p: Path, *, trust_size: bool = False) -> tuple[dict[str, str], str]:
+    """(sidecar или {}, sha256 файла или "", если файл не перечитывался).
+
+    Без чтения файла sidecar принимается при совпадении размера и mtime_ns, а с trust_size —
+    по одному размеру. Иначе файл перехешируется, и stable/offers digest из sidecar остаются
+    в силе, если совпал полный sha256.
+    """
+    st = p.stat()
+    try:
+        stored = json.loads(_digest_path(p).read_text(encoding="utf-8"))
+        if not isinstance(stored, dict) or int(stored.get("bytes", -1)) != st.st_size or not stored.get("sha256"):
+            stored = {}
+    except Exception:
+        stored = {}
+    if stored and (trust_size or int(stored.get("mtime_ns", -1)) == st.st_mtime_ns):
+        return {k: str(v) for k, v in stored.items()}, ""
+    h = hashlib.sha256()
+    with p.open("rb") as fh:
+        for block in iter(lambda: fh.read(_HASH_CHUNK_SIZE), b""):
+            h.update(block)
+    actual = h.hexdigest()
+    if stored and str(stored["sha256"]) == actual:
+        return {k: str(v) for k, v in stored.items()}, actual
+    return {}, actual
+
+def _read_stored_digest(p: Path) -> dict[str, str]:
+    """Digest текущего файла: из sidecar, а если его нет/он устарел — sha256 файла по кускам.
+
+    Фид и sidecar пишутся и коммитятся вместе, а в CI файл всегда из свежего checkout
+    (mtime не совпадает никогда), поэтому здесь sidecar принимается по размеру — старый фид
+    не перечитывается. Цена: правка фида мимо write_chunks_if_changed с тем же размером
+    не видна; если новый рендер совпадёт со stable digest sidecar, такая правка останется в файле.
+    read_stored_digest (проверка offer index) по-прежнему требует mtime_ns или sha256.
+
+    Без sidecar известен только полный sha256: stable/offers digest пустые,
+    и любое отличие считается изменением offers.
+    """
+    if not p.exists():
+        return {}
+    stored, actual = _check_stored_digest(p, trust_size=True)
+    return stored or {"sha256": actual}
+
+def _write_stored_digest(p: Path, *, digest: str, size: int, stable: str, offers: str) -> None:
+    dp = _digest_path(p)
+    dp.parent.mkdir(parents=True, exist_ok=True)
+    payload = {
+        "sha256": digest,
+        "bytes": size,
+        "mtime_ns": p.stat().st_mtime_ns,
+        "stable_sha256": stable,
+        "offers_sha256": offers,
+    }
+    dp.write_text(json.dumps(payload) + "\n", encoding="utf-8")
+
+def write_chunks_if_changed(
+    path: str,
+    chunks: Iterable[str],
+    *,
+    encoding: str = OUTPUT_ENCODING_DEFAULT,
+) -> FeedWriteResult:
+    """Стримит куски во временный файл и подменяет файл, только если фид изменился по смыслу.
+
+    Первый кусок — шапка (header + FEED_META), остальные — offers и footer.
+    Считаются три sha256: полный, stable (шапка без volatile-строк + offers) и offers-only.
+    Если совпал stable digest предыдущей записи, файл не трогается, даже когда
+    в шапке поменялись время сборки / next run.
+
+    Старый файл целиком не перечитывается: digest предыдущей записи берётся из sidecar.
+    Если chunks бросает исключение (например, валидатор), временный файл удаляется,
+    а текущий файл остаётся нетронутым.
+    """
     p = Path(path)
     p.parent.mkdir(parents=True, exist_ok=True)
-    new_bytes = data.encode(encoding, errors="strict")
+    tmp = p.with_suffix(p.suffix + ".tmp")
 
-    if p.exists():
-        old_bytes = p.read_bytes()
-        if old_bytes == new_bytes:
-            return False
+    h_full = hashlib.sha256()
+    h_stable = hashlib.sha256()
+    h_offers = hashlib.sha256()
+    size = 0
+    try:
+        with tmp.open("wb") as fh:
+            for idx, chunk in enumerate(chunks):
+                data = chunk.encode(encoding, errors="strict")
+                h_full.update(data)
+                size += len(data)
+                fh.write(data)
+                if idx == 0:
+                    h_stable.update(strip_volatile_meta(chunk).encode(encoding, errors="strict"))
+                else:
+                    h_stable.update(data)
+                    h_offers.update(data)
+    except BaseException:
+        tmp.unlink(missing_ok=True)
+        raise
 
-    tmp = p.with_suffix(p.suffix + ".tmp")
-    tmp.write_bytes(new_bytes)
+    digest = h_full.hexdigest()
+    stable = h_stable.hexdigest()
+    offers = h_offers.hexdigest()
+    prev = _read_stored_digest(p)
+
+    if prev and (prev.get("sha256") == digest or prev.get("stable_sha256") == stable):
+        tmp.unlink(missing_ok=True)
+        if not prev.get("stable_sha256"):
+            _write_stored_digest(p, digest=digest, size=size, stable=stable, offers=offers)
+        return FeedWriteResult(path=str(p), status=FEED_STATUS_UNCHANGED, offers_sha256=offers)
+
+    status = FEED_STATUS_META if prev.get("offers_sha256") == offers else FEED_STATUS_OFFERS
     tmp.replace(p)
-    return True
+    _write_stored_digest(p, digest=digest, size=size, stable=stable, offers=offers)
+    return FeedWriteResult(path=str(p), status=status, offers_sha256=offers)
+
+def write_if_changed(path: str, data: str, *, encoding: str = OUTPUT_ENCODING_DEFAULT) -> FeedWriteResult:
+    """Перезаписывает файл только если контент реально изменился (volatile-поля шапки не в счёт)."""
+    # Шапка = всё до конца FEED_META; без FEED_META весь текст считается телом
+    end = data.find("-->", data.find("<!--FEED_META")) if "<!--FEED_META" in data else -1
+    head, body = (data[: end + 3], data[end + 3 :]) if end != -1 else ("", data)
+    return write_chunks_if_changed(path, [head, body], encoding=encoding)
@@ -19,11 +19,11 @@ from dataclasses import dataclass
 from html import unescape
 from pathlib import Path
 import re
-import xml.etree.ElementTree as ET
-from typing import Any
+from typing import Any, Sequence
 
 import yaml
 
+from cs.qg_engine import GateOffer, QualityIssue, QualityRuleEngine
 from cs.qg_report import QualityGateResult, write_quality_gate_report
 
 _WS_RE = re.compile(r"\s+")
@@ -101,14 +101,6 @@ _OID_VENDOR_HINTS: list[tuple[re.Pattern[str], str]] = [
     (re.compile(r"(?iu)^ACSBID-"), "SMART"),
 ]
 
-@dataclass(frozen=True)
-class QualityIssue:
-    severity: str
-    rule: str
-    oid: str
-    name: str
-    details: str
-
 def _norm_ws(value: Any) -> str:
     s = unescape(str(value or "")).replace("\xa0", " ").strip()
     s = _WS_RE.sub(" ", s)
@@ -128,11 +120,11 @@ def _write_yaml(path: str, data: dict[str, Any]) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
     p.write_text(yaml.safe_dump(data, allow_unicode=True, sort_keys=False), encoding="utf-8")
 
-def _offer_params(offer_el: ET.Element) -> dict[str, list[str]]:
+def _offer_params(offer: GateOffer) -> dict[str, list[str]]:
     out: dict[str, list[str]] = defaultdict(list)
-    for p in offer_el.findall("param"):
-        key = _norm_ws(p.get("name") or "")
-        val = _norm_ws("".join(p.itertext()))
+    for raw_key, raw_val in offer.params:
+        key = _norm_ws(raw_key)
+        val = _norm_ws(raw_val)
         if key and val:
             out[key].append(val)
     return dict(out)
@@ -197,50 +189,79 @@ def _is_suspicious_vendor(*, vendor: str, name: str, desc_plain: str, params: di
     )
     return not bool(inferred)
 
-def _detect_issues(feed_path: str) -> list[QualityIssue]:
-    xml_text = Path(feed_path).read_text(encoding="utf-8", errors="ignore")
-    root = ET.fromstring(xml_text)
-
-    issues: list[QualityIssue] = []
-
-    for offer in root.findall(".//offer"):
-        oid = _norm_ws(offer.get("id") or "")
-        name = _norm_ws(offer.findtext("name") or "")
-        vendor = _norm_ws(offer.findtext("vendor") or "")
-        price_text = _norm_ws(offer.findtext("price") or "")
-        desc_html = offer.findtext("description") or ""
-        params = _offer_params(offer)
-
-        price_int = _safe_price_int(price_text)
-        if price_int is None or price_int <= 0:
-            issues.append(QualityIssue("critical", "invalid_price", oid, name, price_text or "empty"))
-
-        for key in params:
-            if _cf(key) in _BANNED_PARAM_KEYS:
-                issues.append(QualityIssue("critical", "banned_param_key", oid, name, key))
+@dataclass(frozen=True)
+class _OfferCtx:
+    oid: str
+    name: str
+    vendor: str
+    price_text: str
+    desc_html: str
+    params: dict[str, list[str]]
+
+def _prepare(offer: GateOffer) -> _OfferCtx:
+    return _OfferCtx(
+        oid=_norm_ws(offer.oid),
+        name=_norm_ws(offer.name),
+        vendor=_norm_ws(offer.vendor),
+        price_text=_norm_ws(offer.price),
+        desc_html=offer.description,
+        params=_offer_params(offer),
+    )
 
-        if "oaicite" in desc_html or "contentReference" in desc_html:
-            issues.append(QualityIssue("critical", "desc_oaicite_leak", oid, name, "oaicite/contentReference"))
-            desc_plain = ""
-        else:
-            desc_plain = _description_plain_for_gate(desc_html)
-            if _DESC_SUPPLIER_HEADER_RE.search(desc_plain):
-                issues.append(QualityIssue("cosmetic", "desc_header_leak", oid, name, "supplier header in description"))
-
-        if _is_suspicious_vendor(
-            vendor=vendor,
-            name=name,
-            desc_plain=desc_plain,
-            params=params,
-            oid=oid,
-        ):
-            issues.append(QualityIssue("cosmetic", "suspicious_vendor", oid, name, vendor or "empty"))
-
-        compat_values = params.get("Совместимость", []) + params.get("Для устройства", [])
-        for compat in compat_values:
-            if _COMPAT_LABEL_LEAK_RE.search(compat):
-                issues.append(QualityIssue("cosmetic", "compat_label_leak", oid, name, compat[:200]))
-                break
+def _has_oaicite(o: _OfferCtx) -> bool:
+    return "oaicite" in o.desc_html or "contentReference" in o.desc_html
+
+RULES = QualityRuleEngine("AkCent", prepare=_prepare)
+
+@RULES.rule("price")
+def _check_price(o: _OfferCtx) -> list[QualityIssue] | None:
+    price_int = _safe_price_int(o.price_text)
+    if price_int is None or price_int <= 0:
+        return [QualityIssue("critical", "invalid_price", o.oid, o.name, o.price_text or "empty")]
+    return None
+
+@RULES.rule("param_keys")
+def _check_param_keys(o: _OfferCtx) -> list[QualityIssue]:
+    return [
+        QualityIssue("critical", "banned_param_key", o.oid, o.name, key)
+        for key in o.params
+        if _cf(key) in _BANNED_PARAM_KEYS
+    ]
+
+@RULES.rule("description")
+def _check_description(o: _OfferCtx) -> list[QualityIssue] | None:
+    if _has_oaicite(o):
+        return [QualityIssue("critical", "desc_oaicite_leak", o.oid, o.name, "oaicite/contentReference")]
+    if _DESC_SUPPLIER_HEADER_RE.search(_description_plain_for_gate(o.desc_html)):
+        return [QualityIssue("cosmetic", "desc_header_leak", o.oid, o.name, "supplier header in description")]
+    return None
+
+@RULES.rule("vendor")
+def _check_vendor(o: _OfferCtx) -> list[QualityIssue] | None:
+    # desc_plain нужен только для угадывания бренда при пустом vendor
+    desc_plain = ""
+    if not _cf(o.vendor) and not _has_oaicite(o):
+        desc_plain = _description_plain_for_gate(o.desc_html)
+    if _is_suspicious_vendor(
+        vendor=o.vendor,
+        name=o.name,
+        desc_plain=desc_plain,
+        params=o.params,
+        oid=o.oid,
+    ):
+        return [QualityIssue("cosmetic", "suspicious_vendor", o.oid, o.name, o.vendor or "empty")]
+    return None
+
+@RULES.rule("compat")
+def _check_compat(o: _OfferCtx) -> list[QualityIssue] | None:
+    compat_values = o.params.get("Совместимость", []) + o.params.get("Для устройства", [])
+    for compat in compat_values:
+        if _COMPAT_LABEL_LEAK_RE.search(compat):
+            return [QualityIssue("cosmetic", "compat_label_leak", o.oid, o.name, compat[:200])]
+    return None
+
+def _detect_issues(feed_path: str, offers: Sequence[Any] | None = None) -> list[QualityIssue]:
+    issues = RULES.run_feed(feed_path, offers).issues
 
     deduped: dict[tuple[str, str, str], QualityIssue] = {}
     for issue in issues:
@@ -304,9 +325,10 @@ def run_quality_gate(
     max_new_cosmetic_issues: int = 5,
     enforce: bool = True,
     freeze_current_as_baseline: bool = False,
+    offers: Sequence[Any] | None = None,
     **_legacy_unused: object,
 ) -> QualityGateResult:
-    issues = _detect_issues(feed_path)
+    issues = _detect_issues(feed_path, offers)
     critical = [x for x in issues if x.severity == "critical"]
     cosmetic = [x for x in issues if x.severity == "cosmetic"]
 
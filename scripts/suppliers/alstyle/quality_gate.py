@@ -19,10 +19,11 @@ from dataclasses import dataclass
 from html import unescape
 from pathlib import Path
 import re
-import xml.etree.ElementTree as ET
+from typing import Any, Sequence
 
 import yaml
 
+from cs.qg_engine import GateOffer, QualityIssue, QualityRuleEngine
 from cs.qg_report import QualityGateResult, write_quality_gate_report
 
 _COMPAT_LABEL_LEAK_RE = re.compile(
@@ -38,14 +39,6 @@ _TECH_BODY_LEAK_RE = re.compile(
 )
 _WS_RE = re.compile(r"\s+")
 
-@dataclass(frozen=True)
-class QualityIssue:
-    severity: str
-    rule: str
-    oid: str
-    name: str
-    details: str
-
 def _norm_ws(s: str) -> str:
     s2 = unescape(s or "")
     s2 = s2.replace("\u00a0", " ").strip()
@@ -66,51 +59,71 @@ def _write_yaml(path: str, data: dict) -> None:
         encoding="utf-8",
     )
 
-def _offer_params(offer_el: ET.Element) -> dict[str, list[str]]:
+def _offer_params(offer: GateOffer) -> dict[str, list[str]]:
     out: dict[str, list[str]] = defaultdict(list)
-    for p in offer_el.findall("param"):
-        k = _norm_ws(p.get("name") or "")
-        v = _norm_ws("".join(p.itertext()))
+    for raw_key, raw_val in offer.params:
+        k = _norm_ws(raw_key)
+        v = _norm_ws(raw_val)
         if k and v:
             out[k].append(v)
     return dict(out)
 
-def _detect_issues(feed_path: str) -> list[QualityIssue]:
-    xml_text = Path(feed_path).read_text(encoding="utf-8", errors="ignore")
-    root = ET.fromstring(xml_text)
-
-    issues: list[QualityIssue] = []
+@dataclass(frozen=True)
+class _OfferCtx:
+    oid: str
+    name: str
+    desc_html: str
+    desc_text: str
+    params: dict[str, list[str]]
+
+def _prepare(offer: GateOffer) -> _OfferCtx:
+    return _OfferCtx(
+        oid=_norm_ws(offer.oid),
+        name=_norm_ws(offer.name),
+        desc_html=offer.description,
+        desc_text=unescape(offer.description),
+        params=_offer_params(offer),
+    )
 
-    for offer in root.findall(".//offer"):
-        oid = _norm_ws(offer.get("id") or "")
-        name = _norm_ws(offer.findtext("name") or "")
-        desc_html = offer.findtext("description") or ""
-        params = _offer_params(offer)
+RULES = QualityRuleEngine("AlStyle", prepare=_prepare)
 
-        compat_values = params.get("Совместимость", [])
-        for compat in compat_values:
-            if _COMPAT_LABEL_LEAK_RE.search(compat):
-                issues.append(QualityIssue("critical", "compat_label_leak", oid, name, compat[:200]))
+@RULES.rule("compat")
+def _check_compat(o: _OfferCtx) -> list[QualityIssue]:
+    issues: list[QualityIssue] = []
+    for compat in o.params.get("Совместимость", []):
+        if _COMPAT_LABEL_LEAK_RE.search(compat):
+            issues.append(QualityIssue("critical", "compat_label_leak", o.oid, o.name, compat[:200]))
 
-            families = {x.casefold() for x in _XEROX_FAMILY_RE.findall(compat)}
-            if len(families) >= 3 and len(compat) >= 180:
-                issues.append(QualityIssue("cosmetic", "heavy_xerox_compat", oid, name, compat[:200]))
+        families = {x.casefold() for x in _XEROX_FAMILY_RE.findall(compat)}
+        if len(families) >= 3 and len(compat) >= 180:
+            issues.append(QualityIssue("cosmetic", "heavy_xerox_compat", o.oid, o.name, compat[:200]))
+    return issues
 
-        for key in params:
-            if _BAD_POWER_KEY_RE.match(key):
-                issues.append(QualityIssue("critical", "bad_power_key", oid, name, key))
-            if _MARKETPLACE_RE.search(key):
-                issues.append(QualityIssue("critical", "marketplace_param_leak", oid, name, key))
+@RULES.rule("param_keys")
+def _check_param_keys(o: _OfferCtx) -> list[QualityIssue]:
+    issues: list[QualityIssue] = []
+    for key in o.params:
+        if _BAD_POWER_KEY_RE.match(key):
+            issues.append(QualityIssue("critical", "bad_power_key", o.oid, o.name, key))
+        if _MARKETPLACE_RE.search(key):
+            issues.append(QualityIssue("critical", "marketplace_param_leak", o.oid, o.name, key))
+    return issues
+
+@RULES.rule("description")
+def _check_description(o: _OfferCtx) -> list[QualityIssue]:
+    issues: list[QualityIssue] = []
+    if "oaicite" in o.desc_html or "contentReference" in o.desc_html:
+        issues.append(QualityIssue("critical", "desc_oaicite_leak", o.oid, o.name, "oaicite/contentReference"))
 
-        if "oaicite" in desc_html or "contentReference" in desc_html:
-            issues.append(QualityIssue("critical", "desc_oaicite_leak", oid, name, "oaicite/contentReference"))
+    if _MARKETPLACE_RE.search(o.desc_text):
+        issues.append(QualityIssue("critical", "marketplace_text_in_description", o.oid, o.name, "marketplace text in final description"))
 
-        desc_text = unescape(desc_html)
-        if _MARKETPLACE_RE.search(desc_text):
-            issues.append(QualityIssue("critical", "marketplace_text_in_description", oid, name, "marketplace text in final description"))
+    if _TECH_BODY_LEAK_RE.search(o.desc_text):
+        issues.append(QualityIssue("cosmetic", "tech_block_leak_in_body", o.oid, o.name, "В обычный body протёк блок 'Характеристики'"))
+    return issues
 
-        if _TECH_BODY_LEAK_RE.search(desc_text):
-            issues.append(QualityIssue("cosmetic", "tech_block_leak_in_body", oid, name, "В обычный body протёк блок 'Характеристики'"))
+def _detect_issues(feed_path: str, offers: Sequence[Any] | None = None) -> list[QualityIssue]:
+    issues = RULES.run_feed(feed_path, offers).issues
 
     deduped: dict[tuple[str, str, str], QualityIssue] = {}
     for issue in issues:
@@ -145,6 +158,7 @@ def run_quality_gate(
     max_new_cosmetic_issues: int = 5,
     enforce: bool = True,
     freeze_current_as_baseline: bool = False,
+    offers: Sequence[Any] | None = None,
 ) -> QualityGateResult:
     """
     ВАЖНО:
@@ -153,8 +167,10 @@ def run_quality_gate(
 
     Здесь они трактуются как:
       общий лимит cosmetic-товаров / общий лимит cosmetic-срабатываний.
+
+    offers — in-memory OfferOut, из которых записан feed_path; без них raw-фид разбирается с диска.
     """
-    issues = _detect_issues(feed_path)
+    issues = _detect_issues(feed_path, offers)
 
     critical = [x for x in issues if x.severity == "critical"]
     cosmetic = [x for x in issues if x.severity == "cosmetic"]
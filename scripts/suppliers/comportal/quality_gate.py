@@ -16,16 +16,17 @@ from __future__ import annotations
 
 from collections import defaultdict
 from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Any
+from typing import Any, Sequence
 import re
-import xml.etree.ElementTree as ET
 
 try:
     import yaml
 except Exception:  # pragma: no cover
     yaml = None  # type: ignore
 
+from cs.qg_engine import GateOffer, QualityIssue, QualityRuleEngine
 from cs.qg_report import QualityGateResult, write_quality_gate_report
 
 QUALITY_BASELINE_DEFAULT = "scripts/suppliers/comportal/config/quality_gate_baseline.yml"
@@ -43,14 +44,6 @@ _DUPLICATE_BRAND_IN_NAME_RE = re.compile(
 _RULES_EXCLUDED_FROM_ENFORCE = {"placeholder_picture", "duplicate_brand_in_name", "insecure_http_picture"}
 _RULES_TREATED_AS_ALLOWED_KNOWN = {"placeholder_picture"}
 
-@dataclass(frozen=True)
-class QualityIssue:
-    severity: str
-    rule: str
-    oid: str
-    name: str
-    details: str
-
 def _norm_ws(s: str) -> str:
     return _WS_RE.sub(" ", (s or "").strip())
 
@@ -81,49 +74,88 @@ def _make_issue(severity: str, rule: str, oid: str, name: str, details: str) ->
         details=_norm_ws(details),
     )
 
-def _detect_issues(feed_path: str, schema_path: str | None = None) -> list[QualityIssue]:
-    xml_text = Path(feed_path).read_text(encoding="utf-8", errors="ignore")
-    root = ET.fromstring(xml_text)
+@dataclass(frozen=True)
+class _OfferCtx:
+    oid: str
+    name: str
+    vendor: str
+    price: str
+    desc_html: str
+    pictures: tuple[str, ...]
+    blacklist: frozenset[str]
+    placeholder: str
+
+def _prepare(offer: GateOffer, *, blacklist: frozenset[str], placeholder: str) -> _OfferCtx:
+    return _OfferCtx(
+        oid=_norm_ws(offer.oid),
+        name=_norm_ws(offer.name),
+        vendor=_norm_ws(offer.vendor),
+        price=_norm_ws(offer.price),
+        desc_html=offer.description,
+        pictures=offer.pictures,
+        blacklist=blacklist,
+        placeholder=placeholder,
+    )
 
+RULES = QualityRuleEngine("ComPortal")
+
+@RULES.rule("vendor")
+def _check_vendor(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.vendor:
+        return [_make_issue("critical", "empty_vendor", o.oid, o.name, "")]
+    if o.vendor.casefold() in o.blacklist:
+        return [_make_issue("critical", "supplier_vendor_leak", o.oid, o.name, o.vendor)]
+    return None
+
+@RULES.rule("price")
+def _check_price(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.price:
+        return [_make_issue("critical", "empty_price", o.oid, o.name, "")]
+    return None
+
+@RULES.rule("name")
+def _check_name(o: _OfferCtx) -> list[QualityIssue] | None:
+    if _DUPLICATE_BRAND_IN_NAME_RE.search(o.name):
+        return [_make_issue("cosmetic", "duplicate_brand_in_name", o.oid, o.name, o.name)]
+    return None
+
+@RULES.rule("pictures")
+def _check_pictures(o: _OfferCtx) -> list[QualityIssue]:
+    issues: list[QualityIssue] = []
+    for pic in o.pictures:
+        url = _norm_ws(pic)
+        if not url:
+            continue
+        if url == o.placeholder:
+            issues.append(_make_issue("cosmetic", "placeholder_picture", o.oid, o.name, url))
+        elif _HTTP_URL_RE.search(url):
+            issues.append(_make_issue("cosmetic", "insecure_http_picture", o.oid, o.name, url))
+    return issues
+
+@RULES.rule("description")
+def _check_description(o: _OfferCtx) -> list[QualityIssue] | None:
+    if "oaicite" in o.desc_html or "contentReference" in o.desc_html:
+        return [_make_issue("critical", "desc_oaicite_leak", o.oid, o.name, "oaicite/contentReference")]
+    return None
+
+def _detect_issues(
+    feed_path: str,
+    schema_path: str | None = None,
+    offers: Sequence[Any] | None = None,
+) -> list[QualityIssue]:
     schema = _read_yaml(schema_path)
-    blacklist = {
+    blacklist = frozenset(
         str(x).strip().casefold()
         for x in (schema.get("vendor_blacklist_casefold") or [])
         if str(x).strip()
-    }
+    )
     placeholder = str(schema.get("placeholder_picture") or PLACEHOLDER_URL).strip() or PLACEHOLDER_URL
 
-    issues: list[QualityIssue] = []
-
-    for offer in root.findall(".//offer"):
-        oid = _norm_ws(offer.get("id") or "")
-        name = _norm_ws(offer.findtext("name") or "")
-        vendor = _norm_ws(offer.findtext("vendor") or "")
-        desc_html = offer.findtext("description") or ""
-
-        if not vendor:
-            issues.append(_make_issue("critical", "empty_vendor", oid, name, ""))
-
-        if vendor and vendor.casefold() in blacklist:
-            issues.append(_make_issue("critical", "supplier_vendor_leak", oid, name, vendor))
-
-        if not _norm_ws(offer.findtext("price") or ""):
-            issues.append(_make_issue("critical", "empty_price", oid, name, ""))
-
-        if _DUPLICATE_BRAND_IN_NAME_RE.search(name):
-            issues.append(_make_issue("cosmetic", "duplicate_brand_in_name", oid, name, name))
-
-        for pic in offer.findall("picture"):
-            url = _norm_ws("".join(pic.itertext()))
-            if not url:
-                continue
-            if url == placeholder:
-                issues.append(_make_issue("cosmetic", "placeholder_picture", oid, name, url))
-            elif _HTTP_URL_RE.search(url):
-                issues.append(_make_issue("cosmetic", "insecure_http_picture", oid, name, url))
-
-        if "oaicite" in desc_html or "contentReference" in desc_html:
-            issues.append(_make_issue("critical", "desc_oaicite_leak", oid, name, "oaicite/contentReference"))
+    issues = RULES.run_feed(
+        feed_path,
+        offers,
+        prepare=partial(_prepare, blacklist=blacklist, placeholder=placeholder),
+    ).issues
 
     deduped: dict[tuple[str, str, str, str], QualityIssue] = {}
     for issue in issues:
@@ -163,11 +195,12 @@ def run_quality_gate(
     max_new_cosmetic_offers: int = 5,
     max_new_cosmetic_issues: int = 5,
     freeze_current_as_baseline: bool = False,
+    offers: Sequence[Any] | None = None,
 ) -> dict[str, object]:
     baseline_path = str(baseline_path or QUALITY_BASELINE_DEFAULT)
     report_path = str(report_path or QUALITY_REPORT_DEFAULT)
 
-    issues = _detect_issues(feed_path, schema_path=schema_path)
+    issues = _detect_issues(feed_path, schema_path=schema_path, offers=offers)
     critical = [x for x in issues if x.severity == "critical"]
     cosmetic = [x for x in issues if x.severity == "cosmetic"]
 
@@ -19,10 +19,11 @@ from dataclasses import dataclass
 from html import unescape
 from pathlib import Path
 import re
-import xml.etree.ElementTree as ET
+from typing import Any, Sequence
 
 import yaml
 
+from cs.qg_engine import GateOffer, QualityIssue, QualityRuleEngine
 from cs.qg_report import QualityGateResult, write_quality_gate_report
 
 _WS_RE = re.compile(r"\s+")
@@ -50,14 +51,6 @@ _CANON_NUMERIC_TAIL_RX = re.compile(r"\bCanon\s+((?:\d{2,4}[A-Z]?)(?:\s*/\s*\d{2
 _CANON_ALPHA_TAIL_RX = re.compile(r"\bCanon\s+([A-Z]{1,8}-?[A-Z0-9]{1,12})\b", re.I)
 _COMPAT_BROKEN_RX = re.compile(r"(?iu)(?:WorkCentre\s+WorkCentre|Phaser\s+Phaser|LaserJet\s+LaserJet|imageRUNNER\s+imageRUNNER|E-Studio\s+E-Studio)")
 
-@dataclass(frozen=True)
-class QualityIssue:
-    severity: str
-    rule: str
-    oid: str
-    name: str
-    details: str
-
 def _norm_ws(s: str) -> str:
     s2 = unescape(s or "")
     s2 = s2.replace("\u00a0", " ").strip()
@@ -79,11 +72,11 @@ def _read_yaml(path: str) -> QualityGateResult:
         return {}
     return yaml.safe_load(p.read_text(encoding="utf-8")) or {}
 
-def _offer_params(offer_el: ET.Element) -> dict[str, list[str]]:
+def _offer_params(offer: GateOffer) -> dict[str, list[str]]:
     out: dict[str, list[str]] = defaultdict(list)
-    for p in offer_el.findall("param"):
-        k = _norm_ws(p.get("name") or "")
-        v = _norm_ws(p.text or "")
+    for raw_key, raw_val in offer.params:
+        k = _norm_ws(raw_key)
+        v = _norm_ws(raw_val)
         if k and v:
             out[k].append(v)
     return out
@@ -194,90 +187,159 @@ def _ink_can_skip_compat(name: str, typ: str, desc: str) -> bool:
     )
     return bool(generic_re.search(hay)) and not compat_hint_re.search(hay)
 
-def collect_quality_issues(feed_path: str) -> list[QualityIssue]:
-    xml_text = Path(feed_path).read_text(encoding="utf-8", errors="ignore")
-    root = ET.fromstring(xml_text)
-    issues: list[QualityIssue] = []
+@dataclass(frozen=True)
+class _OfferCtx:
+    oid: str
+    name: str
+    price: str
+    pic: str
+    vendor: str
+    desc: str
+    params: dict[str, list[str]]
+    typ: str
+    model: str
+    compat: str
+    codes: str
+
+    @property
+    def has_identity(self) -> bool:
+        return bool(self.oid and self.name)
+
+def _prepare(offer: GateOffer) -> _OfferCtx:
+    params = _offer_params(offer)
+    return _OfferCtx(
+        oid=_norm_ws(offer.oid),
+        name=_norm_ws(offer.name),
+        price=_norm_ws(offer.price),
+        pic=_norm_ws(offer.pictures[0] if offer.pictures else ""),
+        vendor=_norm_ws(offer.vendor),
+        desc=_norm_ws(offer.description),
+        params=params,
+        typ=_param_first(params, "Тип"),
+        model=_param_first(params, "Модель"),
+        compat=_param_first(params, "Совместимость"),
+        codes=_param_first(params, "Коды расходников"),
+    )
 
-    for offer in root.findall(".//offer"):
-        oid = _norm_ws(offer.get("id") or "")
-        name = _norm_ws((offer.findtext("name") or ""))
-        price = _norm_ws((offer.findtext("price") or ""))
-        pic = _norm_ws((offer.findtext("picture") or ""))
-        vendor = _norm_ws((offer.findtext("vendor") or ""))
-        desc = _norm_ws((offer.findtext("description") or ""))
-        params = _offer_params(offer)
-        typ = _param_first(params, "Тип")
-        model = _param_first(params, "Модель")
-        compat = _param_first(params, "Совместимость")
-        codes = _param_first(params, "Коды расходников")
-        code_list = _split_codes(codes)
-        expected_title_codes = _extract_expected_title_codes(name)
-
-        if not oid or not name:
-            issues.append(QualityIssue("critical", "missing_identity", oid or "?", name or "?", "offer without id/name"))
-            continue
+RULES = QualityRuleEngine("CopyLine", prepare=_prepare)
+
+# Первое правило: offer без id/name дальше не проверяется.
+@RULES.rule("identity")
+def _check_identity(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.has_identity:
+        return [QualityIssue("critical", "missing_identity", o.oid or "?", o.name or "?", "offer without id/name")]
+    return None
+
+@RULES.rule("price")
+def _check_price(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.has_identity:
+        return None
+    price = o.price
+    if not price or not re.fullmatch(r"\d+(?:\.\d+)?", price) or float(price) <= 0:
+        return [QualityIssue("critical", "invalid_price", o.oid, o.name, f"price={price!r}")]
+    return None
+
+@RULES.rule("picture")
+def _check_picture(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.has_identity:
+        return None
+    if not o.pic:
+        return [QualityIssue("critical", "missing_picture", o.oid, o.name, "picture missing")]
+    if _PLACEHOLDER_RE.search(o.pic):
+        return [QualityIssue("cosmetic", "placeholder_picture_only", o.oid, o.name, o.pic)]
+    return None
+
+@RULES.rule("description")
+def _check_description(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.has_identity:
+        return None
+    if not o.desc:
+        return [QualityIssue("cosmetic", "empty_description", o.oid, o.name, "description empty")]
+    if _DESC_HEADER_RE.search(o.desc):
+        return [QualityIssue("cosmetic", "desc_header_leak", o.oid, o.name, o.desc[:120])]
+    return None
+
+@RULES.rule("vendor")
+def _check_vendor(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.has_identity or o.vendor:
+        return None
+    issues = [QualityIssue("cosmetic", "empty_vendor", o.oid, o.name, "vendor empty")]
+    obvious_brand = _obvious_brand(o.name, o.compat)
+    if obvious_brand:
+        issues.append(QualityIssue("cosmetic", "vendor_empty_but_brand_obvious", o.oid, o.name, obvious_brand))
+    return issues
 
-        if not price or not re.fullmatch(r"\d+(?:\.\d+)?", price) or float(price) <= 0:
-            issues.append(QualityIssue("critical", "invalid_price", oid, name, f"price={price!r}"))
-
-        if not pic:
-            issues.append(QualityIssue("critical", "missing_picture", oid, name, "picture missing"))
-        elif _PLACEHOLDER_RE.search(pic):
-            issues.append(QualityIssue("cosmetic", "placeholder_picture_only", oid, name, pic))
-
-        if not desc:
-            issues.append(QualityIssue("cosmetic", "empty_description", oid, name, "description empty"))
-        elif _DESC_HEADER_RE.search(desc):
-            issues.append(QualityIssue("cosmetic", "desc_header_leak", oid, name, desc[:120]))
-
-        obvious_brand = _obvious_brand(name, compat)
-        if not vendor:
-            issues.append(QualityIssue("cosmetic", "empty_vendor", oid, name, "vendor empty"))
-            if obvious_brand:
-                issues.append(QualityIssue("cosmetic", "vendor_empty_but_brand_obvious", oid, name, obvious_brand))
-
-        if model and name and _norm_ws(model).casefold() == _norm_ws(name).casefold():
-            issues.append(QualityIssue("cosmetic", "model_equals_name", oid, name, model[:120]))
-
-        is_consumable = bool(_CONSUMABLE_NAME_RE.match(name) or typ in {"Картридж", "Тонер-картридж", "Драм-картридж", "Чернила", "Девелопер"})
-        if is_consumable:
-            if not compat and not _COMPAT_FAMILY_RE.search(desc) and not _ink_can_skip_compat(name, typ, desc):
-                issues.append(QualityIssue("cosmetic", "missing_compat", oid, name, "compat missing"))
-            if not codes and not _ink_can_skip_codes(name, typ, desc):
-                issues.append(QualityIssue("cosmetic", "missing_codes", oid, name, "codes missing"))
-
-            if expected_title_codes and not code_list:
-                issues.append(QualityIssue("cosmetic", "code_present_in_title_but_missing_in_params", oid, name, ", ".join(expected_title_codes[:6])))
-
-            if expected_title_codes and code_list:
-                missing = [x for x in expected_title_codes if not _expected_code_is_covered(x, code_list, vendor, name)]
-                if missing:
-                    canon_expected = [x for x in expected_title_codes if x.startswith("CANON ")]
-                    canon_missing = [x for x in missing if x.startswith("CANON ")]
-                    if canon_expected and canon_missing and "/" in name:
-                        issues.append(QualityIssue("cosmetic", "mixed_brand_tail_incomplete", oid, name, ", ".join(canon_missing[:6])))
-                    else:
-                        issues.append(QualityIssue("cosmetic", "multi_code_parsing_incomplete", oid, name, ", ".join(missing[:6])))
-
-            if _COMPAT_BROKEN_RX.search(compat):
-                issues.append(QualityIssue("cosmetic", "compat_normalization_broken", oid, name, compat[:160]))
-
-        if typ != "Кабель сетевой":
-            unexpected_cable = [k for k in _CABLE_KEYS if _param_first(params, k)]
-            if unexpected_cable:
-                issues.append(QualityIssue("cosmetic", "unexpected_cable_param_on_non_cable", oid, name, ", ".join(unexpected_cable)))
+@RULES.rule("model")
+def _check_model(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.has_identity:
+        return None
+    if o.model and _norm_ws(o.model).casefold() == _norm_ws(o.name).casefold():
+        return [QualityIssue("cosmetic", "model_equals_name", o.oid, o.name, o.model[:120])]
+    return None
+
+@RULES.rule("consumable")
+def _check_consumable(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.has_identity:
+        return None
+    oid, name, typ, desc, compat, codes = o.oid, o.name, o.typ, o.desc, o.compat, o.codes
+    is_consumable = bool(_CONSUMABLE_NAME_RE.match(name) or typ in {"Картридж", "Тонер-картридж", "Драм-картридж", "Чернила", "Девелопер"})
+    if not is_consumable:
+        return None
 
+    issues: list[QualityIssue] = []
+    code_list = _split_codes(codes)
+    expected_title_codes = _extract_expected_title_codes(name)
+
+    if not compat and not _COMPAT_FAMILY_RE.search(desc) and not _ink_can_skip_compat(name, typ, desc):
+        issues.append(QualityIssue("cosmetic", "missing_compat", oid, name, "compat missing"))
+    if not codes and not _ink_can_skip_codes(name, typ, desc):
+        issues.append(QualityIssue("cosmetic", "missing_codes", oid, name, "codes missing"))
+
+    if expected_title_codes and not code_list:
+        issues.append(QualityIssue("cosmetic", "code_present_in_title_but_missing_in_params", oid, name, ", ".join(expected_title_codes[:6])))
+
+    if expected_title_codes and code_list:
+        missing = [x for x in expected_title_codes if not _expected_code_is_covered(x, code_list, o.vendor, name)]
+        if missing:
+            canon_expected = [x for x in expected_title_codes if x.startswith("CANON ")]
+            canon_missing = [x for x in missing if x.startswith("CANON ")]
+            if canon_expected and canon_missing and "/" in name:
+                issues.append(QualityIssue("cosmetic", "mixed_brand_tail_incomplete", oid, name, ", ".join(canon_missing[:6])))
+            else:
+                issues.append(QualityIssue("cosmetic", "multi_code_parsing_incomplete", oid, name, ", ".join(missing[:6])))
+
+    if _COMPAT_BROKEN_RX.search(compat):
+        issues.append(QualityIssue("cosmetic", "compat_normalization_broken", oid, name, compat[:160]))
     return issues
 
-def run_quality_gate(*, feed_path: str, policy_path: str, baseline_path: str | None = None, report_path: str | None = None) -> QualityGateResult:
+@RULES.rule("cable_params")
+def _check_cable_params(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.has_identity or o.typ == "Кабель сетевой":
+        return None
+    unexpected_cable = [k for k in _CABLE_KEYS if _param_first(o.params, k)]
+    if unexpected_cable:
+        return [QualityIssue("cosmetic", "unexpected_cable_param_on_non_cable", o.oid, o.name, ", ".join(unexpected_cable))]
+    return None
+
+def collect_quality_issues(feed_path: str, offers: Sequence[Any] | None = None) -> list[QualityIssue]:
+    return RULES.run_feed(feed_path, offers).issues
+
+def run_quality_gate(
+    *,
+    feed_path: str,
+    policy_path: str,
+    baseline_path: str | None = None,
+    report_path: str | None = None,
+    offers: Sequence[Any] | None = None,
+) -> QualityGateResult:
     """
     CopyLine quality gate с единым форматом отчёта.
 
     Важно:
     - supplier-specific логика поиска ошибок не меняется;
     - меняется только единый текстовый вывод и подсчёт known/new для отчёта;
-    - baseline у CopyLine по-прежнему хранит сигнатуры cosmetic-срабатываний.
+    - baseline у CopyLine по-прежнему хранит сигнатуры cosmetic-срабатываний;
+    - offers — in-memory OfferOut, из которых записан feed_path (без них raw-фид разбирается с диска).
     """
     policy = _read_yaml(policy_path)
     qcfg = (policy.get("quality_gate") or {}) if isinstance(policy, dict) else {}
@@ -289,7 +351,7 @@ def run_quality_gate(*, feed_path: str, policy_path: str, baseline_path: str | N
     if not report_path:
         report_path = qcfg.get("report_path") or ""
 
-    issues = collect_quality_issues(feed_path)
+    issues = collect_quality_issues(feed_path, offers)
     critical = [x for x in issues if x.severity == "critical"]
     cosmetic = [x for x in issues if x.severity == "cosmetic"]
 
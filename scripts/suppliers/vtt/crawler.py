@@ -0,0 +1,384 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/suppliers/vtt/crawler.py
+
+VTT Crawler — asyncio-движок загрузки карточек с AIMD-управлением параллельностью.
+
+Что делает:
+- держит окно параллельности (число in-flight запросов): +1 за каждое «окно» успешных ответов
+  с нормальной латентностью, ×decrease на 429 / 5xx / сетевую ошибку / резкий рост латентности;
+- на 429 ставит общую паузу для всех запросов (Retry-After или backoff из source.py) и повторяет запрос;
+- повторяет запрос и тогда, когда parse бросил RefetchRequired;
+- отдаёт результаты по мере готовности через callback в потоке event loop;
+- работает с любым sync fetch(url) -> FetchResponse: в сборке это requests-сессия с cookies после
+  login() (source.make_page_fetcher), для локальной проверки — urllib против stand-in HTTP-сервера.
+
+Что не делает:
+- не логинится и не разбирает HTML сам (parse передаёт вызывающий);
+- не строит offers и не пишет файлы.
+"""
+from __future__ import annotations
+
+import asyncio
+import heapq
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Iterable, Mapping
+
+
+class FetchNetworkError(Exception):
+    """Сетевой сбой транспорта (connect/read timeout, reset) — повторяемая ошибка."""
+
+
+class RefetchRequired(Exception):
+    """parse не может разобрать ответ (напр. 304 без сохранённой карточки) — запрос надо повторить."""
+
+
+@dataclass(frozen=True, slots=True)
+class FetchResponse:
+    status: int
+    url: str
+    text: str
+    headers: Mapping[str, str]
+    queued_s: float = 0.0  # ожидание общего rate limiter до отправки запроса
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float((os.getenv(name) or "").strip() or default)
+    except Exception:
+        return default
+
+
+@dataclass(frozen=True, slots=True)
+class AimdSettings:
+    initial: int = 2
+    minimum: int = 1
+    maximum: int = 8
+    increase: float = 1.0
+    decrease: float = 0.5
+    latency_factor: float = 3.0
+    retries: int = 5
+    network_retry_s: float = 2.5
+
+    @classmethod
+    def from_env(cls, *, initial: int) -> "AimdSettings":
+        minimum = max(1, _env_int("VTT_AIMD_MIN", 1))
+        maximum = max(minimum, _env_int("VTT_AIMD_MAX", 8))
+        return cls(
+            initial=min(maximum, max(minimum, _env_int("VTT_AIMD_INITIAL", initial))),
+            minimum=minimum,
+            maximum=maximum,
+            increase=max(0.1, _env_float("VTT_AIMD_INCREASE", 1.0)),
+            decrease=min(0.95, max(0.1, _env_float("VTT_AIMD_DECREASE", 0.5))),
+            latency_factor=max(1.5, _env_float("VTT_AIMD_LATENCY_FACTOR", 3.0)),
+            retries=max(
+                1,
+                _env_int("VTT_429_RETRIES", 0) or _env_int("VTT_NETWORK_OUTER_RETRIES", 5),
+            ),
+        )
+
+
+class AimdWindow:
+    """
+    Окно параллельности в духе TCP congestion control.
+
+    limit растёт на increase/limit за каждый успешный ответ (то есть примерно +increase за окно),
+    пока латентность не выходит за baseline x latency_factor; перегрузка умножает limit на decrease.
+    Пачка 429/медленных ответов из одного окна — одно событие: повторное снижение не раньше
+    чем через ~2 baseline-латентности.
+    """
+
+    def __init__(self, settings: AimdSettings) -> None:
+        self.settings = settings
+        self.limit = float(min(settings.maximum, max(settings.minimum, settings.initial)))
+        self.peak = self.limit
+        self.decreases = 0
+        self.cooldown_until = 0.0
+        self._baseline_s: float | None = None
+        self._last_decrease = float("-inf")
+
+    @property
+    def allowed(self) -> int:
+        return max(self.settings.minimum, int(self.limit))
+
+    def _observe(self, latency_s: float) -> bool:
+        """Обновляет baseline; True — ответ укладывается в норму."""
+        base = self._baseline_s
+        self._baseline_s = latency_s if base is None else base + 0.1 * (latency_s - base)
+        return base is None or latency_s <= base * self.settings.latency_factor
+
+    def on_success(self, latency_s: float, now: float) -> None:
+        if not self._observe(latency_s):
+            self.on_congestion(now)
+            return
+        self.limit = min(float(self.settings.maximum), self.limit + self.settings.increase / max(1.0, self.limit))
+        self.peak = max(self.peak, self.limit)
+
+    def on_congestion(self, now: float) -> bool:
+        guard_s = max(0.5, 2.0 * (self._baseline_s or 0.5))
+        if now - self._last_decrease < guard_s:
+            return False
+        self._last_decrease = now
+        self.limit = max(float(self.settings.minimum), self.limit * self.settings.decrease)
+        self.decreases += 1
+        return True
+
+    def on_rate_limited(self, now: float, cooldown_s: float) -> None:
+        self.on_congestion(now)
+        self.cooldown_until = max(self.cooldown_until, now + max(0.0, cooldown_s))
+
+
+@dataclass(slots=True)
+class CrawlStats:
+    items: int = 0
+    requests: int = 0
+    ok: int = 0
+    rate_limited: int = 0
+    server_errors: int = 0
+    network_errors: int = 0
+    retries: int = 0
+    failed: int = 0
+    decreases: int = 0
+    peak_limit: int = 0
+    final_limit: int = 0
+    cooldown_s: float = 0.0
+    latency_total_s: float = 0.0
+    seconds: float = 0.0
+    stopped_by_deadline: bool = False
+
+    def describe(self) -> str:
+        avg_ms = (1000.0 * self.latency_total_s / self.requests) if self.requests else 0.0
+        rate = (self.requests / self.seconds) if self.seconds > 0 else 0.0
+        return (
+            f"items={self.items} requests={self.requests} ok={self.ok} "
+            f"429={self.rate_limited} 5xx={self.server_errors} net={self.network_errors} "
+            f"retries={self.retries} failed={self.failed} "
+            f"limit={self.final_limit} peak={self.peak_limit} decreases={self.decreases} "
+            f"cooldown={self.cooldown_s:.1f}s avg_latency={avg_ms:.0f}ms "
+            f"rate={rate:.2f}req/s elapsed={self.seconds:.1f}s"
+            + (" deadline=hit" if self.stopped_by_deadline else "")
+        )
+
+
+@dataclass(slots=True)
+class _Attempt:
+    response: FetchResponse | None
+    latency_s: float
+    result: Any = None
+    error: BaseException | None = None
+    parse_error: BaseException | None = None
+
+
+class HttpStatusError(Exception):
+    def __init__(self, status: int, url: str) -> None:
+        super().__init__(f"HTTP {status}: {url}")
+        self.status = status
+        self.url = url
+
+
+def _default_cooldown_s(resp: FetchResponse, attempt_no: int) -> float:
+    raw = (resp.headers.get("Retry-After") or "").strip()
+    try:
+        return max(1.0, float(raw))
+    except Exception:
+        return min(60.0, 5.0 * attempt_no)
+
+
+class AimdCrawler:
+    def __init__(
+        self,
+        fetch: Callable[[str], FetchResponse],
+        *,
+        settings: AimdSettings,
+        cooldown_s: Callable[[FetchResponse, int], float] | None = None,
+        log: Callable[[str], None] = print,
+    ) -> None:
+        self.fetch = fetch
+        self.settings = settings
+        self.cooldown_s = cooldown_s or _default_cooldown_s
+        self.log = log
+
+    def crawl(
+        self,
+        items: Iterable[Any],
+        *,
+        url_of: Callable[[Any], str],
+        parse: Callable[[Any, FetchResponse], Any],
+        on_result: Callable[[Any, Any], None],
+        on_error: Callable[[Any, BaseException], None] | None = None,
+        deadline: float | None = None,
+    ) -> CrawlStats:
+        """Синхронная обёртка: deadline — момент time.monotonic(), после которого новые запросы не ставятся."""
+        return asyncio.run(
+            self._crawl(list(items), url_of=url_of, parse=parse, on_result=on_result, on_error=on_error, deadline=deadline)
+        )
+
+    def _attempt(self, url: str, item: Any, parse: Callable[[Any, FetchResponse], Any]) -> _Attempt:
+        t0 = time.perf_counter()
+        try:
+            resp = self.fetch(url)
+        except Exception as exc:
+            return _Attempt(None, time.perf_counter() - t0, error=exc)
+        attempt = _Attempt(resp, max(0.0, time.perf_counter() - t0 - resp.queued_s))
+        if 200 <= resp.status < 400:
+            try:
+                attempt.result = parse(item, resp)
+            except Exception as exc:
+                attempt.parse_error = exc
+        return attempt
+
+    async def _crawl(
+        self,
+        items: list[Any],
+        *,
+        url_of: Callable[[Any], str],
+        parse: Callable[[Any, FetchResponse], Any],
+        on_result: Callable[[Any, Any], None],
+        on_error: Callable[[Any, BaseException], None] | None,
+        deadline: float | None,
+    ) -> CrawlStats:
+        loop = asyncio.get_running_loop()
+        window = AimdWindow(self.settings)
+        stats = CrawlStats(items=len(items))
+        started = time.monotonic()
+
+        pending: deque[tuple[Any, int]] = deque((item, 1) for item in items)
+        delayed: list[tuple[float, int, Any, int]] = []
+        seq = 0
+        in_flight: dict[asyncio.Future, tuple[Any, int]] = {}
+
+        def fail(item: Any, exc: BaseException) -> None:
+            stats.failed += 1
+            if on_error is not None:
+                on_error(item, exc)
+
+        def retry_later(item: Any, attempt_no: int, exc: BaseException, delay_s: float) -> None:
+            nonlocal seq
+            if attempt_no >= self.settings.retries:
+                fail(item, exc)
+                return
+            stats.retries += 1
+            seq += 1
+            heapq.heappush(delayed, (time.monotonic() + delay_s, seq, item, attempt_no + 1))
+
+        executor = ThreadPoolExecutor(max_workers=self.settings.maximum, thread_name_prefix="vtt-fetch")
+        try:
+            while pending or delayed or in_flight:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline and (pending or delayed):
+                    if not stats.stopped_by_deadline:
+                        self.log(f"[VTT] crawl deadline: dropped {len(pending) + len(delayed)} queued items")
+                    stats.stopped_by_deadline = True
+                    pending.clear()
+                    delayed.clear()
+
+                while delayed and delayed[0][0] <= now:
+                    _ready, _seq, item, attempt_no = heapq.heappop(delayed)
+                    pending.append((item, attempt_no))
+
+                cooling = window.cooldown_until > now
+                while pending and not cooling and len(in_flight) < window.allowed:
+                    item, attempt_no = pending.popleft()
+                    url = url_of(item)
+                    if not url:
+                        fail(item, ValueError("empty url"))
+                        continue
+                    fut = loop.run_in_executor(executor, self._attempt, url, item, parse)
+                    in_flight[fut] = (item, attempt_no)
+                    stats.requests += 1
+
+                wake = [t for t in (window.cooldown_until if cooling else 0.0, delayed[0][0] if delayed else 0.0, deadline or 0.0) if t > now]
+                timeout = (min(wake) - now) if wake else None
+                if not in_flight:
+                    if timeout is None:
+                        continue
+                    await asyncio.sleep(max(0.01, timeout))
+                    continue
+
+                done, _ = await asyncio.wait(set(in_flight), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for fut in done:
+                    item, attempt_no = in_flight.pop(fut)
+                    attempt: _Attempt = fut.result()
+                    stats.latency_total_s += attempt.latency_s
+                    now = time.monotonic()
+                    resp = attempt.response
+
+                    if resp is None:
+                        exc = attempt.error or FetchNetworkError("no response")
+                        if not isinstance(exc, FetchNetworkError):
+                            fail(item, exc)
+                            continue
+                        stats.network_errors += 1
+                        window.on_congestion(now)
+                        retry_later(item, attempt_no, exc, min(20.0, self.settings.network_retry_s * attempt_no))
+                        continue
+
+                    if resp.status == 429:
+                        stats.rate_limited += 1
+                        cooldown_s = self.cooldown_s(resp, attempt_no)
+                        # Окна 429 перекрываются: в статистику идёт только продление текущего окна
+                        old_until = window.cooldown_until
+                        window.on_rate_limited(now, cooldown_s)
+                        stats.cooldown_s += max(0.0, window.cooldown_until - max(old_until, now))
+                        self.log(
+                            f"[VTT] rate limit: {resp.url} :: 429 cooldown={cooldown_s:.1f}s "
+                            f"limit={window.allowed}"
+                        )
+                        retry_later(item, attempt_no, HttpStatusError(429, resp.url), 0.0)
+                        continue
+
+                    if resp.status >= 500:
+                        stats.server_errors += 1
+                        window.on_congestion(now)
+                        retry_later(
+                            item,
+                            attempt_no,
+                            HttpStatusError(resp.status, resp.url),
+                            min(20.0, self.settings.network_retry_s * attempt_no),
+                        )
+                        continue
+
+                    if resp.status >= 400:
+                        fail(item, HttpStatusError(resp.status, resp.url))
+                        continue
+
+                    stats.ok += 1
+                    window.on_success(attempt.latency_s, now)
+                    if isinstance(attempt.parse_error, RefetchRequired):
+                        retry_later(item, attempt_no, attempt.parse_error, 0.0)
+                        continue
+                    if attempt.parse_error is not None:
+                        fail(item, attempt.parse_error)
+                        continue
+                    on_result(item, attempt.result)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        stats.decreases = window.decreases
+        stats.peak_limit = int(window.peak)
+        stats.final_limit = window.allowed
+        stats.seconds = time.monotonic() - started
+        return stats
+
+
+__all__ = [
+    "AimdCrawler",
+    "AimdSettings",
+    "AimdWindow",
+    "CrawlStats",
+    "FetchNetworkError",
+    "FetchResponse",
+    "HttpStatusError",
+    "RefetchRequired",
+]
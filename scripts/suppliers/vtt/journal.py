@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/suppliers/vtt/journal.py
+
+VTT Crawl Journal — append-only журнал разобранных карточек для продолжения прерванного crawl.
+
+Что делает:
+- дописывает в docs/debug/vtt_shards/<shard>.journal.jsonl по строке на каждую готовую карточку
+  (flush + fsync сразу, так что строка переживает падение процесса);
+- при перезапуске читает журнал и отдаёт уже разобранные карточки, чтобы качать только остаток index;
+- сбрасывает журнал, если он старше VTT_JOURNAL_MAX_AGE_H или записан другим форматом.
+
+Что не делает:
+- не хранит поля из index (категории, listing-заголовки) — их при replay добавляет source.attach_index_item;
+- не записывает неудачные запросы: они повторяются при следующем запуске;
+- не строит offers.
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+_JOURNAL_KIND = "vtt_crawl_journal"
+_JOURNAL_VERSION = 1
+VTT_JOURNAL_MAX_AGE_H_DEFAULT = 24.0
+
+
+def _max_age_s() -> float:
+    try:
+        hours = float((os.getenv("VTT_JOURNAL_MAX_AGE_H") or "").strip() or VTT_JOURNAL_MAX_AGE_H_DEFAULT)
+    except Exception:
+        hours = VTT_JOURNAL_MAX_AGE_H_DEFAULT
+    return max(0.0, hours) * 3600.0
+
+
+def _restore_page(page: Any) -> dict[str, Any] | None:
+    if not isinstance(page, dict):
+        return None
+    # JSON не различает tuple/list, а builder ждёт params как пары
+    page["params"] = [tuple(kv) for kv in page.get("params") or []]
+    return page
+
+
+class CrawlJournal:
+    """
+    Первая строка — заголовок {"journal", "version", "name", "created_at"}, дальше {"url", "page"}.
+    page=null тоже запись: карточка скачана, но без title, повторно её не качаем.
+    Оборванная при падении последняя строка при чтении пропускается.
+    """
+
+    def __init__(self, path: Path, name: str) -> None:
+        self.path = path
+        self.name = name
+        self.created_at = time.time()
+        self.pages: dict[str, dict[str, Any] | None] = {}
+        self.appended = 0
+        self.reset_reason = ""
+        self._lock = threading.Lock()
+        torn_tail = self._load()
+        self.resumed = len(self.pages)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._fh = open(path, "a", encoding="utf-8")
+        if torn_tail:
+            self._fh.write("\n")
+        if path.stat().st_size == 0:
+            self._append({"journal": _JOURNAL_KIND, "version": _JOURNAL_VERSION, "name": name, "created_at": self.created_at})
+
+    def _load(self) -> bool:
+        """Читает журнал; True — последняя строка оборвана и перед дозаписью нужен перевод строки."""
+        if not self.path.exists():
+            return False
+        with open(self.path, "r", encoding="utf-8", errors="replace") as fh:
+            text = fh.read()
+        lines = text.splitlines()
+        header: dict[str, Any] = {}
+        try:
+            header = json.loads(lines[0]) if lines else {}
+        except ValueError:
+            header = {}
+
+        if header.get("journal") != _JOURNAL_KIND or header.get("version") != _JOURNAL_VERSION:
+            self.reset_reason = "format"
+        elif header.get("name") != self.name:
+            self.reset_reason = "name"
+        elif time.time() - float(header.get("created_at") or 0.0) > _max_age_s():
+            self.reset_reason = "age"
+        if self.reset_reason:
+            self.path.unlink()
+            return False
+
+        self.created_at = float(header["created_at"])
+        for line in lines[1:]:
+            try:
+                row = json.loads(line)
+                url = str(row["url"])
+            except (ValueError, KeyError, TypeError):
+                continue
+            self.pages[url] = _restore_page(row.get("page"))
+        return bool(text) and not text.endswith("\n")
+
+    def _append(self, row: dict[str, Any]) -> None:
+        self._fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        os.fsync(self._fh.fileno())
+
+    def record(self, url: str, page: dict[str, Any] | None) -> None:
+        """Вызывается из рабочих потоков сразу после разбора карточки."""
+        with self._lock:
+            self._append({"url": url, "page": page})
+            self.pages[url] = page
+            self.appended += 1
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+    def discard(self) -> None:
+        """Crawl дошёл до конца: продолжать нечего, следующий запуск начнёт с чистого журнала."""
+        self.close()
+        self.path.unlink(missing_ok=True)
+
+    def summary(self) -> str:
+        parts = [f"resumed={self.resumed}", f"recorded={self.appended}"]
+        if self.reset_reason:
+            parts.append(f"reset={self.reset_reason}")
+        return " | ".join(parts + [f"file={self.path.as_posix()}"])
+
+
+def open_crawl_journal(shards_dir: Path, name: str) -> CrawlJournal | None:
+    flag = (os.getenv("VTT_JOURNAL", "1") or "1").strip().lower()
+    if flag in ("0", "false", "no"):
+        return None
+    path = Path(os.getenv("VTT_JOURNAL_FILE", "") or shards_dir / f"{name}.journal.jsonl")
+    try:
+        return CrawlJournal(path, name)
+    except OSError:
+        # Журнал — только страховка: без него crawl идёт как раньше, с нуля
+        return None
+
+
+__all__ = [
+    "CrawlJournal",
+    "open_crawl_journal",
+]
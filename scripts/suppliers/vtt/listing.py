@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/suppliers/vtt/listing.py
+
+VTT Listing — разбор listing-страниц каталога для collect_product_index.
+
+Что делает:
+- за один проход достаёт из HTML все href-атрибуты (compiled XPath по lxml-дереву) и текст <a>;
+- классифицирует ссылки на карточки товара и listing-страницы с категориями;
+- кэширует нормализацию URL (urljoin / urlparse / parse_qs / normalize_listing_url): на VTT одни и те же
+  меню и пагинация повторяются на каждой странице;
+- без lxml откатывается на прежние regex-проходы (_ANCHOR_RE + _HREF_RE).
+
+Что не делает:
+- не ходит в сеть и не обходит каталог (BFS и параллельность — в source.collect_product_index);
+- не решает, какие категории разрешены: отдаёт категории ссылки, фильтр у вызывающего.
+"""
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from html import unescape
+from urllib.parse import parse_qs, urljoin, urlparse
+
+from .filtering import normalize_listing_title, normalize_listing_url, product_path_re
+
+try:  # pragma: no cover - lxml есть в requirements.txt
+    from lxml import etree as lxml_etree
+    from lxml import html as lxml_html
+except Exception:  # pragma: no cover - окружение без lxml
+    lxml_etree = None
+    lxml_html = None
+
+LINK_PRODUCT = "product"
+LINK_LISTING = "listing"
+
+# Тот же набор, что находили _ANCHOR_RE/_HREF_RE: любой атрибут, имя которого кончается на href
+_HREF_ATTRS_XPATH = (
+    lxml_etree.XPath("//@*[substring(name(), string-length(name()) - 3) = 'href']")
+    if lxml_etree is not None
+    else None
+)
+
+_HREF_RE = re.compile(r'''href=["\']([^"\']+)["\']''', re.I)
+_ANCHOR_RE = re.compile(r'''<a\b[^>]*href=["\']([^"\']+)["\'][^>]*>(.*?)</a>''', re.I | re.S)
+
+_URL_CACHE_SIZE = 65536
+
+
+@dataclass(frozen=True, slots=True)
+class ListingScan:
+    """Разобранная listing-страница: ссылки уже абсолютные и нормализованные."""
+
+    url: str
+    categories: tuple[str, ...]
+    products: tuple[tuple[str, str], ...]  # (url карточки, listing-заголовок или "")
+    listings: tuple[tuple[str, tuple[str, ...]], ...]  # (нормализованный listing url, его категории)
+
+
+def _parse_html(html: str):
+    try:
+        return lxml_html.document_fromstring(html)
+    except ValueError:
+        # str с <?xml encoding=...?> lxml принимает только байтами
+        return lxml_html.document_fromstring(html.encode("utf-8"))
+
+
+def extract_links(html: str) -> list[tuple[str, str | None]]:
+    """(href, текст <a> или None для прочих тегов) в порядке документа."""
+    if not html or not html.strip():
+        return []
+    if lxml_html is None:
+        return extract_links_regex(html)
+    try:
+        doc = _parse_html(html)
+    except Exception:
+        return extract_links_regex(html)
+    out: list[tuple[str, str | None]] = []
+    for value in _HREF_ATTRS_XPATH(doc):
+        el = value.getparent()
+        out.append((str(value), el.text_content() if el.tag == "a" else None))
+    return out
+
+
+def extract_links_regex(html: str) -> list[tuple[str, str | None]]:
+    """Прежний путь: anchors с inner HTML, затем все href= (дубли отсеет классификация)."""
+    out: list[tuple[str, str | None]] = [(unescape(href), inner) for href, inner in _ANCHOR_RE.findall(html)]
+    out.extend((unescape(href), None) for href in _HREF_RE.findall(html))
+    return out
+
+
+@lru_cache(maxsize=4096)
+def _origin(url: str) -> str:
+    p = urlparse(url)
+    return f"{p.scheme}://{p.netloc}/"
+
+
+@lru_cache(maxsize=4096)
+def page_categories(url: str) -> tuple[str, ...]:
+    return tuple(sorted({x.strip() for x in parse_qs(urlparse(url).query).get("category", []) if x.strip()}))
+
+
+@lru_cache(maxsize=_URL_CACHE_SIZE)
+def classify_href(base: str, href: str, base_netloc: str) -> tuple[str, str, tuple[str, ...]]:
+    """(LINK_PRODUCT | LINK_LISTING | "", абсолютный url, категории listing-ссылки)."""
+    if not href or href.startswith("#") or href.startswith("javascript:"):
+        return "", "", ()
+    abs_url = urljoin(base, href)
+    parsed = urlparse(abs_url)
+    if parsed.netloc != base_netloc:
+        return "", "", ()
+    path_l = parsed.path.lower()
+    if path_l.startswith("/catalog/") and not parsed.query and product_path_re(parsed.path):
+        return LINK_PRODUCT, abs_url, ()
+    if path_l.startswith("/catalog"):
+        cats = page_categories(abs_url)
+        if cats:
+            return LINK_LISTING, normalize_listing_url(abs_url), cats
+    return "", "", ()
+
+
+@lru_cache(maxsize=_URL_CACHE_SIZE)
+def _listing_title(text: str) -> str:
+    return normalize_listing_title(text)
+
+
+def scan_listing(page_url: str, html: str, base_netloc: str) -> ListingScan:
+    """Один проход по ссылкам страницы; listing-ссылки берутся только из <a>, как и раньше."""
+    origin = _origin(page_url)
+    products: list[tuple[str, str]] = []
+    listings: list[tuple[str, tuple[str, ...]]] = []
+    for raw_href, text in extract_links(html):
+        href = raw_href.strip()
+        # Абсолютный путь от корня резолвится одинаково с любой страницы сайта — ключ кэша общий
+        base = origin if href.startswith("/") and not href.startswith("//") else page_url
+        kind, target, cats = classify_href(base, href, base_netloc)
+        if kind == LINK_PRODUCT:
+            products.append((target, _listing_title(text) if text is not None else ""))
+        elif kind == LINK_LISTING and text is not None:
+            listings.append((target, cats))
+    return ListingScan(
+        url=page_url,
+        categories=page_categories(page_url),
+        products=tuple(products),
+        listings=tuple(listings),
+    )
+
+
+def url_cache_info() -> str:
+    info = classify_href.cache_info()
+    total = info.hits + info.misses
+    rate = (100.0 * info.hits / total) if total else 0.0
+    return f"url_cache hit={info.hits} miss={info.misses} ({rate:.0f}%)"
+
+
+__all__ = [
+    "LINK_LISTING",
+    "LINK_PRODUCT",
+    "ListingScan",
+    "classify_href",
+    "extract_links",
+    "extract_links_regex",
+    "page_categories",
+    "scan_listing",
+    "url_cache_info",
+]
@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/suppliers/vtt/page_cache.py
+
+VTT Page Cache — SQLite-кэш карточек товара между запусками (conditional GET).
+
+Что делает:
+- хранит по URL карточки ETag / Last-Modified, sha256 тела и результат source.parse_product_page;
+- отдаёт заголовки If-None-Match / If-Modified-Since для повторного запроса;
+- на 304 или на тело с тем же sha256 возвращает сохранённый разбор без HTML-парсинга;
+- на 304 без годной записи удаляет строку и просит повторить запрос (StaleNotModified), а не теряет карточку;
+- считает за прогон hit / 304 / miss / сэкономленные байты.
+
+Что не делает:
+- не хранит сами HTML-страницы;
+- не хранит поля из index (категории, listing-заголовки) — их добавляет source.attach_index_item;
+- не ходит в сеть сам.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable
+
+from .crawler import FetchResponse, RefetchRequired
+
+ROOT = Path(__file__).resolve().parents[3]
+VTT_PAGE_CACHE_DIR = ROOT / "docs" / "debug" / "vtt_page_cache"
+VTT_PAGE_CACHE_TTL_DAYS = 30
+
+_SCHEMA_VERSION = "1"
+_COMMIT_EVERY = 200
+
+ParsePage = Callable[[str, str], "dict[str, Any] | None"]
+
+
+def _parser_version() -> str:
+    """Хэш всех модулей suppliers/vtt (как cs.core._core_code_version для cs/).
+
+    Разбор карточки тянет source -> params -> pictures / normalize и т.д.; перечислять файлы руками
+    ненадёжно, поэтому правка любого модуля слоя делает сохранённые разборы недействительными.
+    """
+    h = hashlib.sha256(_SCHEMA_VERSION.encode("utf-8"))
+    for path in sorted(Path(__file__).resolve().parent.glob("*.py")):
+        h.update(path.name.encode("utf-8"))
+        h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+class StaleNotModified(RefetchRequired):
+    """304 на условный запрос, а годного разбора в кэше нет: запись удалена, нужен GET без валидаторов."""
+
+
+@dataclass(frozen=True, slots=True)
+class CachedPage:
+    final_url: str
+    etag: str
+    last_modified: str
+    body_sha256: str
+    body_bytes: int
+    parser_version: str
+    page: dict[str, Any] | None
+
+
+@dataclass(slots=True)
+class PageCacheStats:
+    hits: int = 0
+    not_modified: int = 0
+    misses: int = 0
+    bytes_saved: int = 0
+
+    def describe(self) -> str:
+        return (
+            f"hit={self.hits} 304={self.not_modified} miss={self.misses} "
+            f"bytes_saved={self.bytes_saved}"
+        )
+
+
+def _page_from_json(raw: str | None) -> dict[str, Any] | None:
+    if raw is None:
+        return None
+    page = json.loads(raw)
+    # JSON не различает tuple/list, а builder ждёт params как пары
+    page["params"] = [tuple(kv) for kv in page.get("params") or []]
+    return page
+
+
+class PageCache:
+    """
+    Кэш для многопоточного crawl: conditional_headers/resolve вызываются из рабочих потоков,
+    поэтому соединение общее под одним lock.
+
+    hit — 200 с тем же телом (сервер не отдал валидаторы или проигнорировал их), парсинг пропущен;
+    304 — тело не скачивалось и не парсилось; miss — новая или изменённая карточка, парсим и сохраняем.
+    Записи, которые не запрашивались VTT_PAGE_CACHE_TTL_DAYS дней, удаляются при close().
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.stats = PageCacheStats()
+        self.parser_version = _parser_version()
+        self._now = int(time.time())
+        self._lock = threading.Lock()
+        self._dirty = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            "url TEXT PRIMARY KEY, final_url TEXT NOT NULL, etag TEXT NOT NULL, last_modified TEXT NOT NULL, "
+            "body_sha256 TEXT NOT NULL, body_bytes INTEGER NOT NULL, parser_version TEXT NOT NULL, "
+            "page TEXT, used_at INTEGER NOT NULL)"
+        )
+
+    def _lookup(self, url: str) -> CachedPage | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT final_url, etag, last_modified, body_sha256, body_bytes, parser_version, page "
+                "FROM pages WHERE url = ?",
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return CachedPage(
+                final_url=row[0],
+                etag=row[1],
+                last_modified=row[2],
+                body_sha256=row[3],
+                body_bytes=int(row[4]),
+                parser_version=row[5],
+                page=_page_from_json(row[6]),
+            )
+        except (ValueError, TypeError, AttributeError):
+            return None
+
+    def _count(self, field: str, bytes_saved: int = 0) -> None:
+        with self._lock:
+            setattr(self.stats, field, getattr(self.stats, field) + 1)
+            self.stats.bytes_saved += bytes_saved
+
+    def _write(self, sql: str, args: tuple[Any, ...]) -> None:
+        with self._lock:
+            self._conn.execute(sql, args)
+            self._dirty += 1
+            if self._dirty >= _COMMIT_EVERY:
+                self._conn.commit()
+                self._dirty = 0
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        entry = self._lookup(url)
+        # Разбор устаревшим парсером не переиспользуем: без валидаторов сервер отдаст тело целиком
+        if entry is None or entry.parser_version != self.parser_version:
+            return {}
+        headers: dict[str, str] = {}
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        return headers
+
+    def resolve(self, url: str, resp: FetchResponse, parse_page: ParsePage) -> dict[str, Any] | None:
+        """Разбор карточки url: из кэша на 304 / неизменное тело, иначе parse_page(final_url, html).
+
+        304 без годной записи бросает StaleNotModified: вызывающий повторяет запрос (crawler — сам).
+        """
+        entry = self._lookup(url)
+
+        if resp.status == 304:
+            if entry is None or entry.parser_version != self.parser_version:
+                # Валидаторы ушли, а записи нет/она битая/от старого парсера — телом не располагаем.
+                # Без строки conditional_headers пуст, и повторный GET вернёт тело целиком
+                self._count("misses")
+                self._write("DELETE FROM pages WHERE url = ?", (url,))
+                raise StaleNotModified(url)
+            self._count("not_modified", entry.body_bytes)
+            self._write("UPDATE pages SET used_at = ? WHERE url = ?", (self._now, url))
+            return entry.page
+
+        body = (resp.text or "").encode("utf-8")
+        body_sha256 = hashlib.sha256(body).hexdigest()
+        etag = (resp.headers.get("ETag") or "").strip()
+        last_modified = (resp.headers.get("Last-Modified") or "").strip()
+
+        if (
+            entry is not None
+            and entry.body_sha256 == body_sha256
+            and entry.parser_version == self.parser_version
+            and entry.final_url == resp.url
+        ):
+            self._count("hits")
+            self._write(
+                "UPDATE pages SET etag = ?, last_modified = ?, used_at = ? WHERE url = ?",
+                (etag, last_modified, self._now, url),
+            )
+            return entry.page
+
+        self._count("misses")
+        page = parse_page(resp.url, resp.text or "")
+        self._write(
+            "INSERT OR REPLACE INTO pages "
+            "(url, final_url, etag, last_modified, body_sha256, body_bytes, parser_version, page, used_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                url,
+                resp.url,
+                etag,
+                last_modified,
+                body_sha256,
+                len(body),
+                self.parser_version,
+                None if page is None else json.dumps(page, ensure_ascii=False),
+                self._now,
+            ),
+        )
+        return page
+
+    def close(self) -> None:
+        cutoff = self._now - VTT_PAGE_CACHE_TTL_DAYS * 86400
+        with self._lock:
+            self._conn.execute("DELETE FROM pages WHERE used_at < ?", (cutoff,))
+            self._conn.commit()
+            self._conn.close()
+
+    def summary(self) -> str:
+        return f"{self.stats.describe()} | file={self.path.as_posix()}"
+
+
+def open_page_cache(name: str) -> PageCache | None:
+    """name — имя файла кэша без расширения (shard-N в shard-режиме, full в полном прогоне)."""
+    flag = (os.getenv("VTT_PAGE_CACHE", "1") or "1").strip().lower()
+    if flag in ("0", "false", "no"):
+        return None
+    path = Path(os.getenv("VTT_PAGE_CACHE_FILE", "") or VTT_PAGE_CACHE_DIR / f"{name}.sqlite")
+    try:
+        return PageCache(path)
+    except sqlite3.Error:
+        # Кэш — только ускорение: при битом/недоступном файле качаем всё заново
+        return None
+
+
+__all__ = [
+    "CachedPage",
+    "PageCache",
+    "PageCacheStats",
+    "StaleNotModified",
+    "open_page_cache",
+]
@@ -19,13 +19,14 @@ from dataclasses import dataclass
 from html import unescape
 from pathlib import Path
 import re
-import xml.etree.ElementTree as ET
+from typing import Any, Sequence
 
 try:
     import yaml
 except Exception:  # pragma: no cover
     yaml = None  # type: ignore
 
+from cs.qg_engine import GateOffer, QualityIssue, QualityRuleEngine
 from cs.qg_report import QualityGateResult, write_quality_gate_report
 
 PLACEHOLDER_URL = "https://placehold.co/800x800/png?text=No+Photo"
@@ -36,14 +37,6 @@ _WS_RE = re.compile(r"\s+")
 _RULES_EXCLUDED_FROM_ENFORCE = {"placeholder_picture"}
 _RULES_TREATED_AS_ALLOWED_KNOWN = {"placeholder_picture"}
 
-@dataclass(frozen=True)
-class QualityIssue:
-    severity: str
-    rule: str
-    oid: str
-    name: str
-    details: str
-
 def _norm_ws(s: str) -> str:
     s2 = unescape(s or "")
     s2 = s2.replace("\u00a0", " ").strip()
@@ -68,11 +61,11 @@ def _write_yaml(path: str | None, data: dict) -> None:
     p.parent.mkdir(parents=True, exist_ok=True)
     p.write_text(yaml.safe_dump(data, allow_unicode=True, sort_keys=False), encoding="utf-8")
 
-def _offer_params(offer_el: ET.Element) -> dict[str, list[str]]:
+def _offer_params(offer: GateOffer) -> dict[str, list[str]]:
     out: dict[str, list[str]] = defaultdict(list)
-    for p in offer_el.findall("param"):
-        k = _norm_ws(p.get("name") or "")
-        v = _norm_ws("".join(p.itertext()))
+    for raw_key, raw_val in offer.params:
+        k = _norm_ws(raw_key)
+        v = _norm_ws(raw_val)
         if k and v:
             out[k].append(v)
     return dict(out)
@@ -86,42 +79,64 @@ def _make_issue(severity: str, rule: str, oid: str, name: str, details: str) ->
         details=_norm_ws(details),
     )
 
-def _detect_issues(feed_path: str) -> tuple[list[QualityIssue], int]:
-    xml_path = Path(feed_path)
-    xml_text = xml_path.read_text(encoding="utf-8", errors="ignore")
-    root = ET.fromstring(xml_text)
-
-    issues: list[QualityIssue] = []
-    offers = root.findall(".//offer")
-    offer_count = len(offers)
-
-    for offer in offers:
-        oid = _norm_ws(offer.get("id") or "")
-        name = _norm_ws(offer.findtext("name") or "")
-        vendor = _norm_ws(offer.findtext("vendor") or "")
-        desc_html = offer.findtext("description") or ""
-        params = _offer_params(offer)
-
-        if not vendor:
-            issues.append(_make_issue("critical", "empty_vendor", oid, name, ""))
+@dataclass(frozen=True)
+class _OfferCtx:
+    oid: str
+    name: str
+    vendor: str
+    desc_html: str
+    pictures: tuple[str, ...]
+    params: dict[str, list[str]]
+
+def _prepare(offer: GateOffer) -> _OfferCtx:
+    return _OfferCtx(
+        oid=_norm_ws(offer.oid),
+        name=_norm_ws(offer.name),
+        vendor=_norm_ws(offer.vendor),
+        desc_html=offer.description,
+        pictures=offer.pictures,
+        params=_offer_params(offer),
+    )
 
-        for pic in offer.findall("picture"):
-            url = _norm_ws("".join(pic.itertext()))
-            if url == PLACEHOLDER_URL:
-                issues.append(_make_issue("cosmetic", "placeholder_picture", oid, name, url))
+RULES = QualityRuleEngine("VTT", prepare=_prepare)
 
-        for resource in params.get("Ресурс", []):
-            if _DECIMAL_K_RE.match(resource):
-                issues.append(_make_issue("cosmetic", "decimal_k_resource", oid, name, resource))
+@RULES.rule("vendor")
+def _check_vendor(o: _OfferCtx) -> list[QualityIssue] | None:
+    if not o.vendor:
+        return [_make_issue("critical", "empty_vendor", o.oid, o.name, "")]
+    return None
 
-        if "oaicite" in desc_html or "contentReference" in desc_html:
-            issues.append(_make_issue("critical", "desc_oaicite_leak", oid, name, "oaicite/contentReference"))
+@RULES.rule("pictures")
+def _check_pictures(o: _OfferCtx) -> list[QualityIssue]:
+    issues: list[QualityIssue] = []
+    for pic in o.pictures:
+        url = _norm_ws(pic)
+        if url == PLACEHOLDER_URL:
+            issues.append(_make_issue("cosmetic", "placeholder_picture", o.oid, o.name, url))
+    return issues
+
+@RULES.rule("resource")
+def _check_resource(o: _OfferCtx) -> list[QualityIssue]:
+    return [
+        _make_issue("cosmetic", "decimal_k_resource", o.oid, o.name, resource)
+        for resource in o.params.get("Ресурс", [])
+        if _DECIMAL_K_RE.match(resource)
+    ]
+
+@RULES.rule("description")
+def _check_description(o: _OfferCtx) -> list[QualityIssue] | None:
+    if "oaicite" in o.desc_html or "contentReference" in o.desc_html:
+        return [_make_issue("critical", "desc_oaicite_leak", o.oid, o.name, "oaicite/contentReference")]
+    return None
+
+def _detect_issues(feed_path: str, offers: Sequence[Any] | None = None) -> tuple[list[QualityIssue], int]:
+    run = RULES.run_feed(feed_path, offers)
 
     deduped: dict[tuple[str, str, str, str], QualityIssue] = {}
-    for issue in issues:
+    for issue in run.issues:
         deduped[(issue.severity, issue.rule, issue.oid, issue.details)] = issue
 
-    return sorted(deduped.values(), key=lambda x: (x.severity, x.rule, x.oid, x.details)), offer_count
+    return sorted(deduped.values(), key=lambda x: (x.severity, x.rule, x.oid, x.details)), run.offer_count
 
 def _load_cosmetic_baseline(baseline_path: str | None) -> dict[str, set[str]]:
     data = _read_yaml(baseline_path)
@@ -181,11 +196,12 @@ def run_quality_gate(
     max_new_cosmetic_issues: int = 5,
     enforce: bool = True,
     freeze_current_as_baseline: bool = False,
+    offers: Sequence[Any] | None = None,
 ) -> QualityGateResult:
     report_path = str(report_path or QUALITY_REPORT_DEFAULT)
     baseline_path = str(baseline_path or QUALITY_BASELINE_DEFAULT)
 
-    issues, _offer_count = _detect_issues(feed_path)
+    issues, _offer_count = _detect_issues(feed_path, offers)
     critical = [x for x in issues if x.severity == "critical"]
     cosmetic = [x for x in issues if x.severity == "cosmetic"]
 
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Path: scripts/suppliers/vtt/rate_limit.py
+
+VTT Rate Limit — общий для процессов одной машины token bucket и cooldown-окно после 429.
+
+Что делает:
+- держит состояние бюджета запросов в маленьком файле (docs/debug/vtt_shards/rate_limiter.state)
+  под fcntl.flock: все шарды, запущенные на одной машине, берут токены из одного ведра;
+- растягивает 429-cooldown одного шарда на все остальные;
+- считает для процесса число запросов, время ожидания и фактический темп (для shard summary).
+
+Что не делает:
+- не делает HTTP-запросов и не решает, что такое 429 (это source.py / crawler.py);
+- не координирует шарды на разных машинах (CI matrix: у каждого runner свой файл и свой бюджет).
+"""
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Iterator
+
+try:  # pragma: no cover - POSIX
+    import fcntl
+except ImportError:  # pragma: no cover - Windows: лимит остаётся общим только для потоков процесса
+    fcntl = None
+
+VTT_SHARED_RATE_PER_S_DEFAULT = 5.0
+_MAX_SLEEP_S = 1.0
+
+
+@dataclass(slots=True)
+class RateLimitStats:
+    requests: int = 0
+    waited_s: float = 0.0
+    cooldowns: int = 0
+    first_at: float = 0.0
+    last_at: float = 0.0
+
+    @property
+    def elapsed_s(self) -> float:
+        return max(0.0, self.last_at - self.first_at)
+
+    @property
+    def effective_rps(self) -> float:
+        elapsed = self.elapsed_s
+        return (self.requests / elapsed) if elapsed > 0 else 0.0
+
+    def describe(self) -> str:
+        return (
+            f"requests={self.requests} elapsed={self.elapsed_s:.1f}s rate={self.effective_rps:.2f}req/s "
+            f"waited={self.waited_s:.1f}s cooldowns={self.cooldowns}"
+        )
+
+
+class SharedRateLimiter:
+    """
+    Token bucket: rate_per_s токенов в секунду, не больше burst в запасе; один запрос — один токен.
+    429 в любом процессе ставит cooldown_until и обнуляет ведро: до конца окна никто не стартует,
+    после — темп набирается с нуля, а не пачкой из burst запросов.
+    Время в файле — time.time(), чтобы его одинаково читали все процессы.
+    """
+
+    def __init__(self, path: Path, *, rate_per_s: float, burst: int) -> None:
+        self.path = path
+        self.rate_per_s = max(0.01, float(rate_per_s))
+        self.burst = max(1, int(burst))
+        self.stats = RateLimitStats()
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.touch(exist_ok=True)
+
+    @contextmanager
+    def _state(self) -> Iterator[dict[str, Any]]:
+        """Читает и перезаписывает файл состояния под эксклюзивной блокировкой."""
+        with self._lock, open(self.path, "a+", encoding="utf-8") as fh:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                raw = fh.read()
+                try:
+                    state = json.loads(raw) if raw.strip() else {}
+                except ValueError:
+                    state = {}
+                yield state
+                fh.seek(0)
+                fh.truncate()
+                fh.write(json.dumps(state))
+                fh.flush()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+    def acquire(self) -> float:
+        """Блокирует до свободного токена вне cooldown-окна; возвращает время ожидания в секундах."""
+        started = time.monotonic()
+        while True:
+            with self._state() as state:
+                now = time.time()
+                cooldown_until = float(state.get("cooldown_until") or 0.0)
+                if cooldown_until > now:
+                    wait_s = cooldown_until - now
+                else:
+                    updated = float(state.get("updated") or now)
+                    tokens = float(state.get("tokens", self.burst))
+                    tokens = min(float(self.burst), tokens + max(0.0, now - updated) * self.rate_per_s)
+                    if tokens >= 1.0:
+                        tokens -= 1.0
+                        wait_s = 0.0
+                    else:
+                        wait_s = (1.0 - tokens) / self.rate_per_s
+                    state["tokens"] = tokens
+                    state["updated"] = now
+            if wait_s <= 0:
+                break
+            time.sleep(min(wait_s, _MAX_SLEEP_S))
+
+        waited_s = time.monotonic() - started
+        with self._lock:
+            now = time.monotonic()
+            if not self.stats.requests:
+                self.stats.first_at = now
+            self.stats.last_at = now
+            self.stats.requests += 1
+            self.stats.waited_s += waited_s
+        return waited_s
+
+    def set_cooldown(self, seconds: float) -> None:
+        if seconds <= 0:
+            return
+        with self._state() as state:
+            until = time.time() + seconds
+            if until > float(state.get("cooldown_until") or 0.0):
+                state["cooldown_until"] = until
+                state["tokens"] = 0.0
+                state["updated"] = until
+        with self._lock:
+            self.stats.cooldowns += 1
+
+    def summary(self) -> dict[str, Any]:
+        """Телеметрия процесса для shard summary JSON."""
+        return {
+            "requests": self.stats.requests,
+            "elapsed_s": round(self.stats.elapsed_s, 3),
+            "effective_rps": round(self.stats.effective_rps, 3),
+            "waited_s": round(self.stats.waited_s, 3),
+            "cooldowns": self.stats.cooldowns,
+            "budget_rps": self.rate_per_s,
+            "burst": self.burst,
+            "shared_file": self.path.as_posix(),
+        }
+
+
+def open_shared_rate_limiter(shards_dir: Path) -> SharedRateLimiter | None:
+    flag = (os.getenv("VTT_SHARED_RATE_LIMIT", "1") or "1").strip().lower()
+    if flag in ("0", "false", "no"):
+        return None
+    try:
+        rate = float((os.getenv("VTT_SHARED_RATE_PER_S") or "").strip() or VTT_SHARED_RATE_PER_S_DEFAULT)
+    except Exception:
+        rate = VTT_SHARED_RATE_PER_S_DEFAULT
+    try:
+        burst = int((os.getenv("VTT_SHARED_RATE_BURST") or "").strip() or max(1, int(rate)))
+    except Exception:
+        burst = max(1, int(rate))
+    if rate <= 0:
+        return None
+    path = Path(os.getenv("VTT_SHARED_RATE_FILE", "") or shards_dir / "rate_limiter.state")
+    try:
+        return SharedRateLimiter(path, rate_per_s=rate, burst=burst)
+    except OSError:
+        # Без файла состояния остаётся прежний per-process cooldown в source.py
+        return None
+
+
+__all__ = [
+    "RateLimitStats",
+    "SharedRateLimiter",
+    "open_shared_rate_limiter",
+]
@@ -16,25 +16,31 @@ VTT Source — source-слой supplier-layer.
 """
 from __future__ import annotations
 
+import hashlib
+import json
 import os
 import random
 import re
 import threading
 import time
 from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 from datetime import datetime
 from email.utils import parsedate_to_datetime
-from html import unescape
 from pathlib import Path
-from typing import Any
-from urllib.parse import parse_qs, urljoin, urlparse
+from typing import Any, Callable
+from urllib.parse import urljoin, urlparse
 
 import requests
 from requests import exceptions as req_exc
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
+from .crawler import FetchNetworkError, FetchResponse
+from .listing import ListingScan, scan_listing, url_cache_info
 from .models import VTTConfig
+from .page_cache import PageCache, StaleNotModified
+from .rate_limit import SharedRateLimiter
 from .normalize import canon_vendor, norm_ws
 from .params import (
     extract_images_from_html,
@@ -51,7 +57,6 @@ from .filtering import (
     mk_category_url,
     normalize_listing_title,
     normalize_listing_url,
-    product_path_re,
 )
 
 try:  # pragma: no cover - новый filtering.py
@@ -87,13 +92,14 @@ UA = (
     "Chrome/124.0.0.0 Safari/537.36"
 )
 
-_HREF_RE = re.compile(r'''href=["\']([^"\']+)["\']''', re.I)
-_ANCHOR_RE = re.compile(r'''<a\b[^>]*href=["\']([^"\']+)["\'][^>]*>(.*?)</a>''', re.I | re.S)
 _META_CSRF_RE = re.compile(r'''<meta[^>]+name=["\']csrf-token["\'][^>]+content=["\']([^"\']+)["\']''', re.I)
 _VENDOR_TOKEN_RE = re.compile(r"\b(?:HP|CANON|XEROX|BROTHER|KYOCERA|SAMSUNG|EPSON|RICOH|KONICA\s+MINOLTA|PANTUM|LEXMARK|OKI|SHARP|PANASONIC|TOSHIBA|DEVELOP|GESTETNER|RISO)\b", re.I)
 
 _RATE_LIMIT_LOCK = threading.Lock()
+_FIXTURES_LOCK = threading.Lock()
 _RATE_LIMIT_UNTIL_MONOTONIC = 0.0
+# Общий для процессов этой машины бюджет запросов (rate_limit.py); None — только per-process cooldown
+_SHARED_LIMITER: SharedRateLimiter | None = None
 
 def log(msg: str) -> None:
     print(msg, flush=True)
@@ -136,7 +142,7 @@ def _rate_limit_base_cooldown_s() -> float:
 def _rate_limit_max_cooldown_s() -> float:
     return max(_rate_limit_base_cooldown_s(), _safe_float(os.getenv("VTT_429_MAX_COOLDOWN_S") or "180", 180.0))
 
-def _parse_retry_after_seconds(resp: requests.Response) -> float | None:
+def _parse_retry_after_seconds(resp: requests.Response | FetchResponse) -> float | None:
     raw = (resp.headers.get("Retry-After") or "").strip()
     if not raw:
         return None
@@ -152,6 +158,11 @@ def _parse_retry_after_seconds(resp: requests.Response) -> float | None:
     except Exception:
         return None
 
+def use_shared_rate_limiter(limiter: SharedRateLimiter | None) -> None:
+    """Подключает общий token bucket: через него идут все запросы login/listing/карточек."""
+    global _SHARED_LIMITER
+    _SHARED_LIMITER = limiter
+
 def _set_global_rate_limit_cooldown(seconds: float) -> None:
     if seconds <= 0:
         return
@@ -160,16 +171,20 @@ def _set_global_rate_limit_cooldown(seconds: float) -> None:
     with _RATE_LIMIT_LOCK:
         if until > _RATE_LIMIT_UNTIL_MONOTONIC:
             _RATE_LIMIT_UNTIL_MONOTONIC = until
+    if _SHARED_LIMITER is not None:
+        _SHARED_LIMITER.set_cooldown(seconds)
 
 def _wait_for_global_rate_limit_window() -> None:
     while True:
         with _RATE_LIMIT_LOCK:
             wait_s = _RATE_LIMIT_UNTIL_MONOTONIC - time.monotonic()
         if wait_s <= 0:
-            return
+            break
         time.sleep(min(wait_s, 5.0))
+    if _SHARED_LIMITER is not None:
+        _SHARED_LIMITER.acquire()
 
-def _rate_limit_backoff_s(resp: requests.Response, attempt_no: int) -> float:
+def _rate_limit_backoff_s(resp: requests.Response | FetchResponse, attempt_no: int) -> float:
     retry_after_s = _parse_retry_after_seconds(resp)
     if retry_after_s is not None:
         return min(_rate_limit_max_cooldown_s(), max(_rate_limit_min_cooldown_s(), retry_after_s))
@@ -178,13 +193,19 @@ def _rate_limit_backoff_s(resp: requests.Response, attempt_no: int) -> float:
     fallback = _rate_limit_base_cooldown_s() + max(0, attempt_no - 1) * step
     return min(_rate_limit_max_cooldown_s(), max(_rate_limit_min_cooldown_s(), fallback))
 
-def _configure_session(sess: requests.Session, cfg: VTTConfig) -> requests.Session:
+def rate_limit_cooldown_s(resp: requests.Response | FetchResponse, attempt_no: int) -> float:
+    """Пауза после 429: Retry-After или ступенчатый backoff, в рамках VTT_429_MIN/MAX_COOLDOWN_S."""
+    return _rate_limit_backoff_s(resp, attempt_no)
+
+def _configure_session(sess: requests.Session, cfg: VTTConfig, *, status_retries: bool = True) -> requests.Session:
+    # status_retries=False: 429/5xx отдаются вызывающему как есть (их обрабатывает AIMD-движок crawler.py),
+    # а не пересыпаются внутри urllib3 со sleep по Retry-After.
     retry = Retry(
         total=3,
         connect=3,
         read=3,
         backoff_factor=0.6,
-        status_forcelist=(429, 500, 502, 503, 504),
+        status_forcelist=(429, 500, 502, 503, 504) if status_retries else (),
         allowed_methods=("GET", "POST"),
         raise_on_status=False,
     )
@@ -201,14 +222,51 @@ def _configure_session(sess: requests.Session, cfg: VTTConfig) -> requests.Sessi
     )
     return sess
 
-def make_session(cfg: VTTConfig) -> requests.Session:
-    return _configure_session(requests.Session(), cfg)
+def make_session(cfg: VTTConfig, *, status_retries: bool = True) -> requests.Session:
+    return _configure_session(requests.Session(), cfg, status_retries=status_retries)
 
-def clone_session_with_cookies(master: requests.Session, cfg: VTTConfig) -> requests.Session:
-    sess = make_session(cfg)
+def clone_session_with_cookies(master: requests.Session, cfg: VTTConfig, *, status_retries: bool = True) -> requests.Session:
+    sess = make_session(cfg, status_retries=status_retries)
     sess.cookies.update(master.cookies)
     return sess
 
+def make_page_fetcher(
+    master: requests.Session,
+    cfg: VTTConfig,
+    cache: PageCache | None = None,
+) -> Callable[[str], FetchResponse]:
+    """
+    Одиночный GET для crawler.py: без outer retry, фиксированных пауз и глобального 429-cooldown —
+    повторы и темп решает AIMD-движок. Сессия на поток клонируется с cookies после login().
+    С cache запрос условный (If-None-Match / If-Modified-Since), 304 отдаётся как есть.
+    Токен общего бюджета берётся перед каждым GET; 429 растягивает cooldown на другие шарды,
+    а ожидание токена (queued_s) не засчитывается AIMD-движком в латентность сервера.
+    """
+    thread_state = threading.local()
+
+    def fetch(url: str) -> FetchResponse:
+        sess = getattr(thread_state, "sess", None)
+        if sess is None:
+            sess = clone_session_with_cookies(master, cfg, status_retries=False)
+            thread_state.sess = sess
+        queued_s = _SHARED_LIMITER.acquire() if _SHARED_LIMITER is not None else 0.0
+        try:
+            headers = cache.conditional_headers(url) if cache is not None else None
+            resp = sess.get(url, timeout=cfg.timeout_s, allow_redirects=True, headers=headers)
+        except (req_exc.ConnectionError, req_exc.Timeout) as exc:
+            raise FetchNetworkError(str(exc)) from exc
+        if resp.status_code == 429 and _SHARED_LIMITER is not None:
+            _SHARED_LIMITER.set_cooldown(_rate_limit_backoff_s(resp, 1))
+        return FetchResponse(
+            status=int(resp.status_code),
+            url=resp.url or url,
+            text=(resp.text or "") if resp.status_code < 400 else "",
+            headers=resp.headers,
+            queued_s=queued_s,
+        )
+
+    return fetch
+
 def cfg_from_env() -> VTTConfig:
     base_url = (os.getenv("VTT_BASE_URL") or "https://b2b.vtt.ru/").strip()
     base_url = base_url.rstrip("/") + "/"
@@ -318,8 +376,8 @@ def _request_with_outer_retry(
     assert last_exc is not None
     raise last_exc
 
-def _get(sess: requests.Session, cfg: VTTConfig, url: str, *, delay_ms: int) -> requests.Response:
-    return _request_with_outer_retry(sess, "GET", cfg, url, delay_ms=delay_ms)
+def _get(sess: requests.Session, cfg: VTTConfig, url: str, *, delay_ms: int, **kwargs) -> requests.Response:
+    return _request_with_outer_retry(sess, "GET", cfg, url, delay_ms=delay_ms, **kwargs)
 
 def _post(sess: requests.Session, cfg: VTTConfig, url: str, *, delay_ms: int, **kwargs) -> requests.Response:
     return _request_with_outer_retry(sess, "POST", cfg, url, delay_ms=delay_ms, **kwargs)
@@ -355,71 +413,90 @@ def _extract_vendor_from_title(title: str) -> str:
         return ""
     return canon_vendor(norm_ws(m.group(0)))
 
+def _listing_workers() -> int:
+    return max(1, min(16, _safe_int(os.getenv("VTT_LISTING_WORKERS") or "4", 4)))
+
+def _save_listing_fixture(fixtures_dir: Path, url: str, html: str) -> None:
+    """VTT_LISTING_FIXTURES_DIR: копия listing-страниц для scripts/bench_vtt_listing.py."""
+    name = hashlib.sha1(url.encode("utf-8")).hexdigest()[:16] + ".html"
+    fixtures_dir.mkdir(parents=True, exist_ok=True)
+    (fixtures_dir / name).write_text(html, encoding="utf-8")
+    with _FIXTURES_LOCK, open(fixtures_dir / "manifest.jsonl", "a", encoding="utf-8") as fh:
+        fh.write(json.dumps({"file": name, "url": url}, ensure_ascii=False) + "\n")
+
 def collect_product_index(
     sess: requests.Session,
     cfg: VTTConfig,
     categories: list[str],
     deadline: datetime,
 ) -> list[dict[str, Any]]:
+    """
+    BFS по listing-страницам разрешённых категорий, до VTT_LISTING_WORKERS страниц одновременно.
+    Загрузка и разбор ссылок (listing.scan_listing) идут в рабочих потоках, очередь и слияние — здесь.
+    """
     allowed_categories = {x.strip() for x in categories if x and x.strip()}
     allowed_prefixes = list(cfg.allowed_title_prefixes or [])
     base_netloc = urlparse(cfg.base_url).netloc
     queue = deque(normalize_listing_url(mk_category_url(cfg.base_url, code)) for code in categories if code)
     seen_listings: set[str] = set()
     product_candidates: dict[str, dict[str, Any]] = {}
-
-    while queue and len(seen_listings) < int(cfg.max_listing_pages) and datetime.utcnow() < deadline:
-        url = queue.popleft()
-        if not url or url in seen_listings:
-            continue
-        seen_listings.add(url)
-
-        try:
-            resp = _get(sess, cfg, url, delay_ms=cfg.listing_request_delay_ms)
-            html = resp.text or ""
-        except Exception as exc:
-            log(f"[VTT] listing error: {url} :: {exc}")
-            continue
-
-        current_cats = {x.strip() for x in parse_qs(urlparse(resp.url).query).get("category", []) if x.strip()}
-
-        for href, inner in _ANCHOR_RE.findall(html):
-            href = unescape((href or "").strip())
-            if not href or href.startswith("#") or href.startswith("javascript:"):
-                continue
-            abs_url = urljoin(resp.url, href)
-            parsed = urlparse(abs_url)
-            if parsed.netloc != base_netloc:
-                continue
-
-            if parsed.path.lower().startswith("/catalog/") and not parsed.query and product_path_re(parsed.path):
-                rec = product_candidates.setdefault(abs_url, {"source_categories": set(), "listing_titles": set()})
-                rec["source_categories"].update(current_cats)
-                title_text = normalize_listing_title(inner)
-                if title_text:
-                    rec["listing_titles"].add(title_text)
-                continue
-
-            if parsed.path.lower().startswith("/catalog"):
-                qs = parse_qs(parsed.query)
-                cat_values = {x.strip() for x in qs.get("category", []) if x.strip()}
-                if cat_values and cat_values.issubset(allowed_categories):
-                    norm = normalize_listing_url(abs_url)
-                    if norm not in seen_listings:
-                        queue.append(norm)
-
-        # fallback: ссылки без anchor-text
-        for href in _HREF_RE.findall(html):
-            href = unescape((href or "").strip())
-            if not href or href.startswith("#") or href.startswith("javascript:"):
-                continue
-            abs_url = urljoin(resp.url, href)
-            parsed = urlparse(abs_url)
-            if parsed.netloc != base_netloc:
-                continue
-            if parsed.path.lower().startswith("/catalog/") and not parsed.query and product_path_re(parsed.path):
-                rec = product_candidates.setdefault(abs_url, {"source_categories": set(), "listing_titles": set()})
-                rec["source_categories"].update(current_cats)
+    fixtures_dir = Path(os.environ["VTT_LISTING_FIXTURES_DIR"]) if os.getenv("VTT_LISTING_FIXTURES_DIR") else None
+
+    workers = _listing_workers()
+    thread_state = threading.local()
+
+    def scan(url: str) -> ListingScan:
+        worker_sess = getattr(thread_state, "sess", None)
+        if worker_sess is None:
+            worker_sess = clone_session_with_cookies(sess, cfg)
+            thread_state.sess = worker_sess
+        resp = _get(worker_sess, cfg, url, delay_ms=cfg.listing_request_delay_ms)
+        html = resp.text or ""
+        if fixtures_dir is not None:
+            _save_listing_fixture(fixtures_dir, resp.url or url, html)
+        return scan_listing(resp.url or url, html, base_netloc)
+
+    started = time.monotonic()
+    in_flight: dict[Future, str] = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="vtt-listing") as pool:
+        while queue or in_flight:
+            while (
+                queue
+                and len(in_flight) < workers
+                and len(seen_listings) < int(cfg.max_listing_pages)
+                and datetime.utcnow() < deadline
+            ):
+                url = queue.popleft()
+                if not url or url in seen_listings:
+                    continue
+                seen_listings.add(url)
+                in_flight[pool.submit(scan, url)] = url
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                url = in_flight.pop(fut)
+                try:
+                    page = fut.result()
+                except Exception as exc:
+                    log(f"[VTT] listing error: {url} :: {exc}")
+                    continue
+
+                for product_url, title_text in page.products:
+                    rec = product_candidates.setdefault(product_url, {"source_categories": set(), "listing_titles": set()})
+                    rec["source_categories"].update(page.categories)
+                    if title_text:
+                        rec["listing_titles"].add(title_text)
+                for listing_url, cat_values in page.listings:
+                    if allowed_categories.issuperset(cat_values) and listing_url not in seen_listings:
+                        queue.append(listing_url)
+
+    elapsed_s = time.monotonic() - started
+    log(
+        f"[VTT] listing crawl: workers={workers} pages={len(seen_listings)} elapsed={elapsed_s:.1f}s "
+        f"rate={(len(seen_listings) / elapsed_s) if elapsed_s > 0 else 0.0:.2f}listings/s {url_cache_info()}"
+    )
 
     out: list[dict[str, Any]] = []
     soft_prefix_mismatch = 0
@@ -442,49 +519,94 @@ def collect_product_index(
     )
     return out
 
-def parse_product_page_from_index(
-    sess: requests.Session,
-    cfg: VTTConfig,
-    item: dict[str, Any],
-) -> dict[str, Any] | None:
-    url = norm_ws(item.get("url"))
-    if not url:
-        return None
-
-    resp = _get(sess, cfg, url, delay_ms=cfg.product_request_delay_ms)
-    html = resp.text or ""
-
+def parse_product_page(url: str, html: str) -> dict[str, Any] | None:
+    """Поля, которые зависят только от HTML карточки (url — итоговый адрес после редиректов)."""
     title = extract_title(html)
     if not title:
         return None
 
     params, desc_body = extract_params_and_desc(html)
-    source_categories = [norm_ws(x) for x in (item.get("source_categories") or []) if norm_ws(x)]
-    listing_titles = [norm_ws(x) for x in (item.get("listing_titles") or []) if norm_ws(x)]
-
     return {
-        "url": resp.url,
+        "url": url,
         "name": title,
         "vendor": _extract_vendor_from_title(title),
         "sku": extract_sku(html),
         "price_rub_raw": extract_price_rub(html),
-        "pictures": extract_images_from_html(resp.url, html),
+        "pictures": extract_images_from_html(url, html),
         "params": params,
         "description_meta": extract_meta_desc(html),
         "description_body": desc_body,
         "title_codes": extract_title_codes(title),
+    }
+
+def attach_index_item(page: dict[str, Any] | None, item: dict[str, Any]) -> dict[str, Any] | None:
+    """Добавляет к разобранной карточке категории и listing-заголовки из index (они не из HTML)."""
+    if page is None:
+        return None
+    source_categories = [norm_ws(x) for x in (item.get("source_categories") or []) if norm_ws(x)]
+    listing_titles = [norm_ws(x) for x in (item.get("listing_titles") or []) if norm_ws(x)]
+    return {
+        **page,
         "source_categories": source_categories,
         "category_code": ",".join(source_categories),
         "listing_titles": listing_titles,
     }
 
+def parse_product_html(item: dict[str, Any], url: str, html: str) -> dict[str, Any] | None:
+    """Разбор уже скачанной карточки товара (url — итоговый адрес после редиректов)."""
+    return attach_index_item(parse_product_page(url, html), item)
+
+def fetch_product_page(
+    sess: requests.Session,
+    cfg: VTTConfig,
+    url: str,
+    cache: PageCache | None = None,
+) -> dict[str, Any] | None:
+    """GET карточки с outer retry и разбор полей HTML (без полей index)."""
+    if cache is None:
+        resp = _get(sess, cfg, url, delay_ms=cfg.product_request_delay_ms)
+        return parse_product_page(resp.url or url, resp.text or "")
+
+    for _ in range(2):
+        resp = _get(sess, cfg, url, delay_ms=cfg.product_request_delay_ms, headers=cache.conditional_headers(url))
+        fetched = FetchResponse(
+            status=int(resp.status_code),
+            url=resp.url or url,
+            text=resp.text or "",
+            headers=resp.headers,
+        )
+        try:
+            return cache.resolve(url, fetched, parse_product_page)
+        except StaleNotModified:
+            # Строка уже удалена: второй запрос уйдёт без валидаторов
+            continue
+    raise StaleNotModified(url)
+
+def parse_product_page_from_index(
+    sess: requests.Session,
+    cfg: VTTConfig,
+    item: dict[str, Any],
+    cache: PageCache | None = None,
+) -> dict[str, Any] | None:
+    url = norm_ws(item.get("url"))
+    if not url:
+        return None
+    return attach_index_item(fetch_product_page(sess, cfg, url, cache), item)
+
 __all__ = [
     "VTTConfig",
     "cfg_from_env",
     "make_session",
     "clone_session_with_cookies",
     "login",
+    "make_page_fetcher",
+    "use_shared_rate_limiter",
+    "rate_limit_cooldown_s",
     "collect_product_index",
+    "parse_product_page",
+    "attach_index_item",
+    "fetch_product_page",
+    "parse_product_html",
     "parse_product_page_from_index",
     "log",
 ]